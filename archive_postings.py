@@ -0,0 +1,173 @@
+import argparse
+import hashlib
+import json
+import os
+
+from archive_stats import NON_DAY_FILES
+from json_stream import load_items
+
+# === 存档二级索引（按媒体 / 分类） ===
+# 倒排表：每个 媒体(origin) / 分类(category) 对应 {日期: [该条在日存档数组中的下标, ...]}
+# 按键分片发布，筛选视图只需取一个小分片，再按日期取对应的日存档条目：
+#   archive/postings/index.json                 {"version", "category": {名称: {"shard", "count"}}, "origin": {...}}
+#   archive/postings/<维度>/<名称哈希>.json      {"dimension", "name", "count", "dates": {"YYYY-MM-DD": [下标, ...]}}
+# 下标对应日存档按 timestamp 倒序排列后的位置；某天的文件重写后，该天的倒排项整体替换
+# 完整倒排表保存在 cache/archive_postings.json（按日期组织），每次只重写受影响的分片
+
+STATE_FILE = os.path.join("cache", "archive_postings.json")
+STATE_R2_KEY = "cache/archive_postings.json"
+PUBLIC_DIR = os.path.join("public", "archive", "postings")
+R2_PREFIX = "archive/postings/"
+DIMENSIONS = ("category", "origin")
+STATE_VERSION = 1
+
+
+def shard_path(dimension, name):
+    """分片相对路径；名称含中日文，用哈希作文件名"""
+    digest = hashlib.sha1(name.encode("utf-8")).hexdigest()[:12]
+    return f"{dimension}/{digest}.json"
+
+
+def day_postings(items):
+    """{维度: {名称: [下标, ...]}}"""
+    postings = {dim: {} for dim in DIMENSIONS}
+    for pos, item in enumerate(items):
+        for dim in DIMENSIONS:
+            name = item.get(dim) or ("其他" if dim == "category" else "")
+            if name:
+                postings[dim].setdefault(name, []).append(pos)
+    return postings
+
+
+def day_count(postings):
+    """某天的条数：每条都有分类（缺省为 "其他"），分类倒排项的下标总数即条数"""
+    return sum(len(positions) for positions in postings.get("category", {}).values())
+
+
+def file_postings(path):
+    return day_postings(load_items(path))
+
+
+class PostingsIndex:
+    """
+    days[日期][维度][名称] = [下标, ...]
+    update() 记录受影响的 (维度, 名称)，write() 只重写这些分片
+    """
+
+    def __init__(self):
+        self.days = {}
+        self.dirty = set()
+
+    def load(self, path=STATE_FILE):
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️ 二级索引读取失败，将重建: {e}")
+            return
+        if data.get("version") == STATE_VERSION:
+            self.days = data.get("days", {})
+
+    def save(self, path=STATE_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": STATE_VERSION, "days": self.days}, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def update(self, date_str, postings):
+        old = self.days.get(date_str, {})
+        for dim in DIMENSIONS:
+            before = old.get(dim, {})
+            after = postings.get(dim, {})
+            for name in set(before) | set(after):
+                if before.get(name) != after.get(name):
+                    self.dirty.add((dim, name))
+        self.days[date_str] = postings
+
+    def missing(self, archive_index):
+        """index.json 中有、但未索引或条数不一致（日存档被重写过）的日期"""
+        return [d for d, count in archive_index.items()
+                if d not in self.days or day_count(self.days[d]) != count]
+
+    def shard(self, dimension, name):
+        dates = {}
+        for date_str in sorted(self.days, reverse=True):
+            positions = self.days[date_str].get(dimension, {}).get(name)
+            if positions:
+                dates[date_str] = positions
+        return {
+            "dimension": dimension,
+            "name": name,
+            "count": sum(len(p) for p in dates.values()),
+            "dates": dates
+        }
+
+    def directory(self):
+        out = {"version": STATE_VERSION}
+        for dim in DIMENSIONS:
+            counts = {}
+            for day in self.days.values():
+                for name, positions in day.get(dim, {}).items():
+                    counts[name] = counts.get(name, 0) + len(positions)
+            out[dim] = {
+                name: {"shard": shard_path(dim, name), "count": count}
+                for name, count in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))
+            }
+        return out
+
+    def write(self, public_dir=PUBLIC_DIR):
+        """
+        写出受影响的分片与目录文件，清空 dirty
+        返回 (写入的相对路径列表, 已删除的相对路径列表)；目录文件 index.json 总在写入列表末尾
+        """
+        written = []
+        removed = []
+        for dim, name in sorted(self.dirty):
+            rel = shard_path(dim, name)
+            path = os.path.join(public_dir, rel)
+            shard = self.shard(dim, name)
+            if not shard["count"]:
+                if os.path.exists(path):
+                    os.remove(path)
+                removed.append(rel)
+                continue
+            _write_json(path, shard)
+            written.append(rel)
+        _write_json(os.path.join(public_dir, "index.json"), self.directory())
+        written.append("index.json")
+        self.dirty = set()
+        return written, removed
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def rebuild(archive_dir, state_path=STATE_FILE, public_dir=PUBLIC_DIR):
+    """从本地全部日存档重建倒排表并写出全部分片"""
+    index = PostingsIndex()
+    for filename in sorted(os.listdir(archive_dir)):
+        if not filename.endswith(".json") or filename in NON_DAY_FILES:
+            continue
+        try:
+            index.update(filename[:-5], file_postings(os.path.join(archive_dir, filename)))
+        except Exception as e:
+            print(f"⚠️ 索引 {filename} 失败: {e}")
+    index.save(state_path)
+    written, _ = index.write(public_dir)
+    return index, written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="从本地存档重建媒体 / 分类二级索引")
+    parser.add_argument("--dir", default=os.path.join("public", "archive"), help="存档目录")
+    args = parser.parse_args()
+    result, shards = rebuild(args.dir)
+    print(f"✅ 已索引 {len(result.days)} 天，写出 {len(shards)} 个文件")
@@ -0,0 +1,277 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import struct
+
+from json_stream import count_items, load_items
+
+# === 月度归档合并 ===
+# 把一个月的日存档合并成一个文件 archive/monthly/YYYY-MM.ndjson，每天一行（一个紧凑的 JSON 数组），
+# 并生成二进制偏移索引 archive/monthly/YYYY-MM.idx：
+# 客户端一次请求即可取整月，或按索引中的字节范围用 Range 请求只取某一天
+#
+# .idx 格式（小端）：
+#   8s  魔数 b"CNJPIDX1"
+#   B   分类数 C，随后 C 个分类名：B 字节长度 + UTF-8
+#   B   天数 D，随后 D 条记录：
+#       B 日   I 字节偏移   I 字节长度（不含换行）   H 条数   C 个 H 各分类条数
+# archive/index.json ({日期: 条数}) 保持不变
+# archive/monthly/YYYY-MM.etags.json 记录合并时各日存档在 R2 上的 ETag：
+# 条数不变的改写（r2_rewrite 修正标题、clean_tver 替换条目）也会改变 ETag，据此判断是否需要重建
+
+ARCHIVE_DIR = os.path.join("public", "archive")
+ROLLUP_DIR = os.path.join(ARCHIVE_DIR, "monthly")
+ROLLUP_R2_PREFIX = "archive/monthly/"
+INDEX_MAGIC = b"CNJPIDX1"
+_DAY_HEAD = struct.Struct("<BIIH")
+_MAX_COUNT = 0xFFFF
+
+
+def rollup_paths(month):
+    return (os.path.join(ROLLUP_DIR, f"{month}.ndjson"), os.path.join(ROLLUP_DIR, f"{month}.idx"))
+
+
+def etags_path(month):
+    return os.path.join(ROLLUP_DIR, f"{month}.etags.json")
+
+
+def list_day_etags(client, bucket):
+    """一次列举 archive/ 下的日存档，返回 {日期: ETag}"""
+    etags = {}
+    paginator = client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix="archive/", Delimiter="/"):
+        for obj in page.get('Contents', []):
+            name = obj['Key'][len("archive/"):]
+            if len(name) == len("YYYY-MM-DD.json") and name.endswith(".json") and name[:4].isdigit():
+                etags[name[:-5]] = obj['ETag'].strip('"')
+    return etags
+
+
+def file_md5(path):
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_etags_file(month):
+    path = etags_path(month)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def encode_index(categories, days):
+    """days: [(日, 偏移, 长度, 条数, {分类: 条数}), ...]"""
+    out = bytearray(INDEX_MAGIC)
+    out += struct.pack("<B", len(categories))
+    for name in categories:
+        raw = name.encode("utf-8")
+        out += struct.pack("<B", len(raw)) + raw
+    out += struct.pack("<B", len(days))
+    for day, offset, length, count, cat_counts in days:
+        out += _DAY_HEAD.pack(day, offset, length, min(count, _MAX_COUNT))
+        out += struct.pack(f"<{len(categories)}H", *(min(cat_counts.get(c, 0), _MAX_COUNT) for c in categories))
+    return bytes(out)
+
+
+def decode_index(data):
+    """返回 {"categories": [...], "days": {日: {"offset", "length", "count", "categories": {...}}}}"""
+    if data[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+        raise ValueError("不是月度索引文件")
+    pos = len(INDEX_MAGIC)
+    (n_cats,) = struct.unpack_from("<B", data, pos)
+    pos += 1
+    categories = []
+    for _ in range(n_cats):
+        (size,) = struct.unpack_from("<B", data, pos)
+        categories.append(data[pos + 1:pos + 1 + size].decode("utf-8"))
+        pos += 1 + size
+    (n_days,) = struct.unpack_from("<B", data, pos)
+    pos += 1
+    cat_struct = struct.Struct(f"<{n_cats}H")
+    days = {}
+    for _ in range(n_days):
+        day, offset, length, count = _DAY_HEAD.unpack_from(data, pos)
+        pos += _DAY_HEAD.size
+        counts = cat_struct.unpack_from(data, pos)
+        pos += cat_struct.size
+        days[day] = {
+            "offset": offset,
+            "length": length,
+            "count": count,
+            "categories": {c: n for c, n in zip(categories, counts) if n}
+        }
+    return {"categories": categories, "days": days}
+
+
+def read_day(rollup_path, entry):
+    """按索引记录读取某一天（与 HTTP Range 请求 bytes=offset-(offset+length-1) 等价）"""
+    with open(rollup_path, "rb") as f:
+        f.seek(entry["offset"])
+        return json.loads(f.read(entry["length"]).decode("utf-8"))
+
+
+def load_index_file(month):
+    _, idx_path = rollup_paths(month)
+    if not os.path.exists(idx_path):
+        return None
+    try:
+        with open(idx_path, "rb") as f:
+            return decode_index(f.read())
+    except Exception as e:
+        print(f"⚠️ 月度索引 {month} 读取失败，将重建: {e}")
+        return None
+
+
+def build_month(month, dates):
+    """
+    流式合并 dates 对应的本地日存档，写出 .ndjson 与 .idx（原子替换）
+    返回 (ndjson 路径, idx 路径, 天数)
+    """
+    os.makedirs(ROLLUP_DIR, exist_ok=True)
+    rollup_path, idx_path = rollup_paths(month)
+    tmp_path = f"{rollup_path}.{os.getpid()}.tmp"
+    days = []
+    category_order = {}
+    offset = 0
+    with open(tmp_path, "wb") as out:
+        for date_str in sorted(dates):
+            start = offset
+            count = 0
+            cat_counts = {}
+            out.write(b"[")
+            offset += 1
+            for item in load_items(os.path.join(ARCHIVE_DIR, f"{date_str}.json")):
+                raw = json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                if count:
+                    out.write(b",")
+                    offset += 1
+                out.write(raw)
+                offset += len(raw)
+                count += 1
+                category = item.get("category") or "其他"
+                cat_counts[category] = cat_counts.get(category, 0) + 1
+                category_order[category] = category_order.get(category, 0) + 1
+            out.write(b"]\n")
+            offset += 2
+            days.append((int(date_str[-2:]), start, offset - 1 - start, count, cat_counts))
+    categories = sorted(category_order, key=category_order.get, reverse=True)
+    os.replace(tmp_path, rollup_path)
+    with open(f"{idx_path}.tmp", "wb") as f:
+        f.write(encode_index(categories, days))
+    os.replace(f"{idx_path}.tmp", idx_path)
+    return rollup_path, idx_path, len(days)
+
+
+def months_to_build(archive_index, until_date, months=None):
+    """{月份: [日期, ...]}，只包含 until_date 之前（已结束）的日期"""
+    grouped = {}
+    for date_str in sorted(archive_index):
+        if date_str >= until_date:
+            continue
+        month = date_str[:7]
+        if months and month not in months:
+            continue
+        grouped.setdefault(month, []).append(date_str)
+    return grouped
+
+
+def is_current(month, dates, archive_index, etags=None):
+    """
+    已有索引中的日期与条数都和 index.json 一致时无需重建
+    给出 etags（R2 上各日存档的 ETag）时，还要求与上次合并时记录的 ETag 一致
+    """
+    existing = load_index_file(month)
+    if not existing:
+        return False
+    expected = {int(d[-2:]): min(archive_index[d], _MAX_COUNT) for d in dates}
+    if {day: entry["count"] for day, entry in existing["days"].items()} != expected:
+        return False
+    if etags is None:
+        return True
+    recorded = load_etags_file(month)
+    return all(recorded.get(d) == etags.get(d) for d in dates)
+
+
+def is_stale(path, expected_count, etag=None):
+    """本地日存档是否需要重新下载：单次上传的对象 ETag 即内容 MD5，否则退回比较条数"""
+    if not os.path.exists(path):
+        return True
+    try:
+        if etag and "-" not in etag:
+            return file_md5(path) != etag
+        return count_items(path) != expected_count
+    except Exception:
+        return True
+
+
+def run_rollups(months=None, force=False):
+    # 复用 main.py 中的 R2 工具函数
+    from main import get_r2_client, download_file_from_r2, upload_bytes_to_r2, JST, R2_BUCKET_NAME
+
+    r2_client = get_r2_client()
+    index_path = os.path.join(ARCHIVE_DIR, "index.json")
+    if r2_client:
+        download_file_from_r2(r2_client, "archive/index.json", index_path)
+    if not os.path.exists(index_path):
+        print("未找到 archive/index.json")
+        return
+    with open(index_path, "r", encoding="utf-8") as f:
+        archive_index = json.load(f)
+
+    etags = None
+    if r2_client:
+        try:
+            etags = list_day_etags(r2_client, R2_BUCKET_NAME)
+        except Exception as e:
+            print(f"⚠️ 日存档 ETag 列举失败，仅按条数判断: {e}")
+
+    today = datetime.datetime.now(JST).strftime("%Y-%m-%d")
+    for month, dates in months_to_build(archive_index, today, months).items():
+        # 只需下载几百字节的索引与 ETag 记录即可判断是否过期
+        if r2_client and not force:
+            download_file_from_r2(r2_client, f"{ROLLUP_R2_PREFIX}{month}.idx", rollup_paths(month)[1])
+            if etags is not None:
+                download_file_from_r2(r2_client, f"{ROLLUP_R2_PREFIX}{month}.etags.json", etags_path(month))
+        if not force and is_current(month, dates, archive_index, etags):
+            print(f"跳过 {month}: 月度合并已是最新")
+            continue
+
+        # 只下载本地缺失或内容与 R2 不一致的日存档
+        for date_str in dates:
+            path = os.path.join(ARCHIVE_DIR, f"{date_str}.json")
+            if r2_client and is_stale(path, archive_index[date_str], (etags or {}).get(date_str)):
+                download_file_from_r2(r2_client, f"archive/{date_str}.json", path)
+        dates = [d for d in dates if os.path.exists(os.path.join(ARCHIVE_DIR, f"{d}.json"))]
+
+        rollup_path, idx_path, n_days = build_month(month, dates)
+        print(f"✅ {month}: 合并 {n_days} 天，{os.path.getsize(rollup_path) // 1024}KB")
+        if r2_client:
+            with open(rollup_path, "rb") as f:
+                upload_bytes_to_r2(r2_client, f, f"{ROLLUP_R2_PREFIX}{month}.ndjson", "application/x-ndjson")
+            with open(idx_path, "rb") as f:
+                upload_bytes_to_r2(r2_client, f.read(), f"{ROLLUP_R2_PREFIX}{month}.idx", "application/octet-stream")
+            if etags is not None:
+                recorded = {d: etags[d] for d in dates if d in etags}
+                with open(etags_path(month), "w", encoding="utf-8") as f:
+                    json.dump(recorded, f, indent=2)
+                upload_bytes_to_r2(
+                    r2_client, json.dumps(recorded, indent=2).encode("utf-8"),
+                    f"{ROLLUP_R2_PREFIX}{month}.etags.json", "application/json"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="合并日存档为月度文件并生成二进制偏移索引")
+    parser.add_argument("--month", action="append", help="只处理指定月份 YYYY-MM，可重复")
+    parser.add_argument("--force", action="store_true", help="忽略已有索引，强制重建")
+    args = parser.parse_args()
+    run_rollups(set(args.month) if args.month else None, args.force)
@@ -0,0 +1,120 @@
+import argparse
+import datetime
+import json
+import os
+
+from json_stream import load_items
+
+# === 存档每日统计 ===
+# archive/index.json 只有 {日期: 条数}，保持不变；更详细的统计单独放在 archive/stats.json：
+#   {"version": 1, "days": {"YYYY-MM-DD": {
+#       "count": 条数,
+#       "categories": {分类: 条数},
+#       "outlets": [[媒体, 条数], ...]   按条数倒序，最多 TOP_OUTLETS 个
+#       "hours": [24 个整数]             按发布时间（JST）的小时分布
+#       "first": 最早时间戳, "last": 最晚时间戳
+#   }}}
+# 每次运行只重新统计本次合并过的日期，其余日期沿用已有结果
+
+ARCHIVE_DIR = os.path.join("public", "archive")
+STATS_FILE = os.path.join(ARCHIVE_DIR, "stats.json")
+STATS_R2_KEY = "archive/stats.json"
+STATS_VERSION = 1
+# 存档目录下不是日存档的文件
+NON_DAY_FILES = ("index.json", "stats.json")
+TOP_OUTLETS = 10
+
+JST = datetime.timezone(datetime.timedelta(hours=9))
+
+
+def day_stats(items):
+    """单次遍历统计一天的条目，同时返回条数，可替代 count_items"""
+    count = 0
+    categories = {}
+    outlets = {}
+    hours = [0] * 24
+    first = last = None
+    for item in items:
+        count += 1
+        category = item.get('category') or "其他"
+        categories[category] = categories.get(category, 0) + 1
+        origin = item.get('origin')
+        if origin:
+            outlets[origin] = outlets.get(origin, 0) + 1
+        ts = item.get('timestamp')
+        if ts:
+            hours[datetime.datetime.fromtimestamp(ts, JST).hour] += 1
+            first = ts if first is None else min(first, ts)
+            last = ts if last is None else max(last, ts)
+    top = sorted(outlets.items(), key=lambda kv: (-kv[1], kv[0]))[:TOP_OUTLETS]
+    return {
+        "count": count,
+        "categories": dict(sorted(categories.items(), key=lambda kv: (-kv[1], kv[0]))),
+        "outlets": [list(kv) for kv in top],
+        "hours": hours,
+        "first": first,
+        "last": last
+    }
+
+
+def file_stats(path):
+    return day_stats(load_items(path))
+
+
+class ArchiveStats:
+    def __init__(self):
+        self.days = {}
+        self.changed = False
+
+    def load(self, path=STATS_FILE):
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️ 存档统计读取失败，将重建: {e}")
+            return
+        if data.get("version") == STATS_VERSION:
+            self.days = data.get("days", {})
+
+    def update(self, date_str, stats):
+        if self.days.get(date_str) != stats:
+            self.days[date_str] = stats
+            self.changed = True
+
+    def missing(self, archive_index):
+        """index.json 中有、但统计缺失或条数不一致的日期"""
+        return [d for d, count in archive_index.items()
+                if self.days.get(d, {}).get("count") != count]
+
+    def save(self, path=STATS_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": STATS_VERSION, "days": dict(sorted(self.days.items()))},
+                      f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+
+def rebuild(archive_dir=ARCHIVE_DIR, path=STATS_FILE):
+    """从本地全部日存档重建统计"""
+    stats = ArchiveStats()
+    stats.load(path)
+    for filename in sorted(os.listdir(archive_dir)):
+        if not filename.endswith(".json") or filename in NON_DAY_FILES:
+            continue
+        try:
+            stats.update(filename[:-5], file_stats(os.path.join(archive_dir, filename)))
+        except Exception as e:
+            print(f"⚠️ 统计 {filename} 失败: {e}")
+    stats.save(path)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="从本地存档重建 archive/stats.json")
+    parser.add_argument("--dir", default=ARCHIVE_DIR, help="存档目录")
+    args = parser.parse_args()
+    result = rebuild(args.dir, os.path.join(args.dir, "stats.json"))
+    print(f"✅ 已统计 {len(result.days)} 天")
@@ -0,0 +1,162 @@
+import datetime
+import json
+import os
+
+from json_stream import dumps, iter_array
+
+# === 当天存档的追加式分段 ===
+# 当天的存档不再每小时整体重写上传，而是每次运行只上传新增 / 变化的条目：
+#   archive/segments/YYYY-MM-DD/manifest.json   {"date", "segments": [{"key", "count", "created"}]}
+#   archive/segments/YYYY-MM-DD/<HHMMSS>.json    该次运行新增 / 变化的条目
+# 当天完整内容 = archive/YYYY-MM-DD.json（若存在）叠加各分段（同一 link 取 fetched_at / timestamp 较新的版本，相同时以后写入的为准）
+# 日期结束后由 compact_day 合并回 archive/YYYY-MM-DD.json 并删除分段
+# 直接改写日文件的工具（r2_rewrite、clean_tver、maintenance）须先用 compact_pending 合并分段，
+# 否则之后的合并会用分段中的旧版本覆盖改写结果
+
+SEGMENTS_R2_PREFIX = "archive/segments/"
+SEGMENT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MANIFEST_CACHE_CONTROL = "no-cache"
+
+
+def manifest_key(date_str):
+    return f"{SEGMENTS_R2_PREFIX}{date_str}/manifest.json"
+
+
+def _get_json(client, bucket, key, default=None):
+    try:
+        obj = client.get_object(Bucket=bucket, Key=key)
+    except client.exceptions.NoSuchKey:
+        return default
+    return json.loads(obj['Body'].read().decode('utf-8'))
+
+
+def _get_items(client, bucket, key):
+    try:
+        obj = client.get_object(Bucket=bucket, Key=key)
+    except client.exceptions.NoSuchKey:
+        return []
+    return list(iter_array(obj['Body']))
+
+
+def load_manifest(client, bucket, date_str):
+    return _get_json(client, bucket, manifest_key(date_str), {"date": date_str, "segments": []})
+
+
+def _version(item):
+    return item.get('fetched_at') or 0, item.get('timestamp') or 0
+
+
+def merge_items(base, segments):
+    """
+    base 与各分段按 link 叠加，返回按时间倒序的完整列表
+    同一 link 取 (fetched_at, timestamp) 较新的版本；相同时（main.py 更新条目时保留原 fetched_at）以后写入的为准
+    """
+    merged = {}
+    for items in [base] + list(segments):
+        for item in items:
+            link = item.get('link')
+            current = merged.get(link)
+            if current is None or _version(item) >= _version(current):
+                merged[link] = item
+    return sorted(merged.values(), key=lambda x: x.get('timestamp', 0), reverse=True)
+
+
+def load_day(client, bucket, date_str, day_prefix="archive/"):
+    """读取某天的完整存档（日文件 + 未合并的分段），返回 (条目列表, manifest)"""
+    manifest = load_manifest(client, bucket, date_str)
+    base = _get_items(client, bucket, f"{day_prefix}{date_str}.json")
+    if not manifest["segments"]:
+        return base, manifest
+    segments = [_get_items(client, bucket, seg["key"]) for seg in manifest["segments"]]
+    return merge_items(base, segments), manifest
+
+
+def append_segment(client, bucket, date_str, items, manifest, now=None):
+    """上传一个只含新增 / 变化条目的分段，再更新 manifest（先分段后 manifest，读者不会看到缺失的分段）"""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    key = f"{SEGMENTS_R2_PREFIX}{date_str}/{now.strftime('%H%M%S')}.json"
+    client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=dumps(items, indent=None),
+        ContentType='application/json',
+        CacheControl=SEGMENT_CACHE_CONTROL
+    )
+    manifest["segments"].append({"key": key, "count": len(items), "created": int(now.timestamp())})
+    client.put_object(
+        Bucket=bucket,
+        Key=manifest_key(date_str),
+        Body=json.dumps(manifest, ensure_ascii=False).encode('utf-8'),
+        ContentType='application/json',
+        CacheControl=MANIFEST_CACHE_CONTROL
+    )
+    return key
+
+
+def pending_dates(client, bucket):
+    """仍有未合并分段的日期"""
+    paginator = client.get_paginator('list_objects_v2')
+    dates = []
+    for page in paginator.paginate(Bucket=bucket, Prefix=SEGMENTS_R2_PREFIX, Delimiter='/'):
+        for prefix in page.get('CommonPrefixes', []):
+            dates.append(prefix['Prefix'][len(SEGMENTS_R2_PREFIX):].rstrip('/'))
+    return sorted(dates)
+
+
+def _segment_keys(client, bucket, date_str):
+    paginator = client.get_paginator('list_objects_v2')
+    keys = []
+    for page in paginator.paginate(Bucket=bucket, Prefix=f"{SEGMENTS_R2_PREFIX}{date_str}/"):
+        keys.extend(obj['Key'] for obj in page.get('Contents', []))
+    return keys
+
+
+def _delete_keys(client, bucket, keys):
+    for i in range(0, len(keys), 1000):
+        client.delete_objects(
+            Bucket=bucket,
+            Delete={"Objects": [{"Key": k} for k in keys[i:i + 1000]], "Quiet": True}
+        )
+
+
+def compact_day(client, bucket, date_str, local_path=None, day_prefix="archive/"):
+    """
+    把某天的分段合并进日文件：写本地（local_path 为 None 时跳过）、上传完整日文件，
+    先删除 manifest 再删除分段，中途失败时读者只会看到已合并的日文件，不会再叠加旧分段
+    返回合并后的条数
+    """
+    items, manifest = load_day(client, bucket, date_str, day_prefix)
+    body = dumps(items)
+    if local_path:
+        with open(local_path, 'wb') as f:
+            f.write(body)
+    client.put_object(
+        Bucket=bucket,
+        Key=f"{day_prefix}{date_str}.json",
+        Body=body,
+        ContentType='application/json'
+    )
+    _delete_keys(client, bucket, [manifest_key(date_str)])
+    if manifest["segments"]:
+        keys = [seg["key"] for seg in manifest["segments"]]
+    else:
+        # 上次合并删掉 manifest 后中断，残留的分段已合并进日文件
+        keys = _segment_keys(client, bucket, date_str)
+    _delete_keys(client, bucket, keys)
+    return len(items)
+
+
+def compact_pending(client, bucket, since=None, until=None, local_dir=None, day_prefix="archive/"):
+    """
+    合并 [since, until] 内所有仍有分段的日期（包括当天），返回已合并的日期
+    改写日文件前调用；当天之后的运行会在合并后的日文件上重新开始追加分段
+    """
+    compacted = []
+    for date_str in pending_dates(client, bucket):
+        if (since and date_str < since) or (until and date_str > until):
+            continue
+        local_path = os.path.join(local_dir, f"{date_str}.json") if local_dir else None
+        count = compact_day(client, bucket, date_str, local_path, day_prefix)
+        compacted.append(date_str)
+        print(f"✅ 已合并 {date_str} 的分段：共 {count} 条")
+    return compacted
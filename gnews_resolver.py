@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+try:
+    from googlenewsdecoder import gnewsdecoder
+except ImportError:
+    gnewsdecoder = None
+
+# === Google News 跳转链接解析缓存 ===
+# 本地缓存文件（紧凑 JSON），同时镜像到 R2，跨小时任务复用
+CACHE_DIR = "cache"
+CACHE_FILE = os.path.join(CACHE_DIR, "gnews_links.json")
+CACHE_R2_KEY = "cache/gnews_links.json"
+
+# 成功解析的条目：超过 30 天未再出现则清理
+POSITIVE_TTL = 30 * 24 * 3600
+# 解析失败的条目（负缓存）：6 小时内不再重试
+NEGATIVE_TTL = 6 * 3600
+MAX_WORKERS = 8
+
+
+def article_id(link):
+    """从 news.google.com/rss/articles/<ID>?oc=5 中提取文章 ID，作为缓存键"""
+    if not link:
+        return ""
+    parsed = urlparse(link)
+    if "news.google.com" not in parsed.netloc or "/articles/" not in parsed.path:
+        return ""
+    return parsed.path.rsplit("/articles/", 1)[1].strip("/")
+
+
+class LinkCache:
+    """
+    文章 ID -> [原文 URL, 最近确认时间]
+    原文 URL 为空字符串表示解析失败（负缓存）
+    """
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except Exception as e:
+            print(f"⚠️ 链接缓存读取失败，将重建: {e}")
+            self.entries = {}
+
+    def save(self):
+        self.prune()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def prune(self, now=None):
+        now = now or int(time.time())
+        with self._lock:
+            self.entries = {
+                k: v for k, v in self.entries.items()
+                if now - v[1] < (POSITIVE_TTL if v[0] else NEGATIVE_TTL)
+            }
+
+    def lookup(self, link, now=None):
+        """
+        返回 (是否命中, 原文 URL)
+        命中负缓存时返回 (True, "")，调用方不应再次解析
+        """
+        key = article_id(link)
+        if not key:
+            return True, ""
+        now = now or int(time.time())
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry:
+                url, checked_at = entry
+                if url:
+                    entry[1] = now
+                    self.hits += 1
+                    return True, url
+                if now - checked_at < NEGATIVE_TTL:
+                    self.hits += 1
+                    return True, ""
+            self.misses += 1
+            return False, ""
+
+    def store(self, link, url, now=None):
+        key = article_id(link)
+        if not key:
+            return
+        with self._lock:
+            self.entries[key] = [url or "", now or int(time.time())]
+
+
+def decode_link(link):
+    """对单条 Google News 链接发起解析（含网络请求），失败返回空字符串"""
+    if gnewsdecoder is None:
+        return ""
+    try:
+        result = gnewsdecoder(link)
+        if result and result.get("status"):
+            return result.get("decoded_url") or ""
+    except Exception as e:
+        print(f"  [解析失败] {link[:60]}...: {e}")
+    return ""
+
+
+def resolve_links(links, cache, max_workers=MAX_WORKERS):
+    """
+    批量解析链接，返回 {link: 原文 URL}
+    已缓存的直接返回，未命中的并发解析，失败结果写入负缓存
+    """
+    resolved = {}
+    pending = []
+    for link in dict.fromkeys(links):
+        hit, url = cache.lookup(link)
+        if hit:
+            resolved[link] = url
+        else:
+            pending.append(link)
+
+    if pending and gnewsdecoder is None:
+        print("⚠️ 未安装 googlenewsdecoder，跳过原文链接解析")
+        pending = []
+
+    if pending:
+        print(f"正在解析 {len(pending)} 条新链接 (缓存命中 {cache.hits} 条)...")
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for link, url in zip(pending, pool.map(decode_link, pending)):
+                cache.store(link, url)
+                resolved[link] = url
+        failed = sum(1 for link in pending if not resolved[link])
+        print(f"链接解析完成：成功 {len(pending) - failed} 条，失败 {failed} 条")
+
+    return resolved
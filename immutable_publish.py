@@ -0,0 +1,147 @@
+import hashlib
+import json
+import time
+
+# === 内容寻址的不可变发布 ===
+# 固定 key（data.json、archive/*.json）每次原地覆盖，客户端只能加 ?t= 绕过缓存。
+# 此模式额外把每个文件按内容哈希写成不可变对象，并发布一个短 TTL 的 manifest 指向当前版本：
+#   v/data.<哈希>.json、v/archive/2025-12-03.<哈希>.json   Cache-Control: immutable，可长期缓存
+#   manifest.json  {"version", "generated", "files": {逻辑路径: 对象 key}, "retired": {对象 key: 退役时间}}
+# 内容未变时哈希相同，不重复上传；被替换的旧对象先记入 retired，
+# 超过 GC_GRACE_SECONDS（仍持有旧 manifest 的客户端足够用完）后删除
+# 固定 key 照常更新，不读 manifest 的旧客户端不受影响
+# manifest 以读取时的 ETag 条件写入（If-Match），其他运行（每小时更新、r2_rewrite）在此期间写过时返回 412，
+# 重新读取 manifest、叠加本次的改动后重试，不会丢失对方的 files / retired 条目
+
+MANIFEST_KEY = "manifest.json"
+OBJECT_PREFIX = "v/"
+OBJECT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MANIFEST_CACHE_CONTROL = "public, max-age=60"
+GC_GRACE_SECONDS = 24 * 3600
+MANIFEST_VERSION = 1
+COMMIT_ATTEMPTS = 5
+
+
+def content_key(logical_key, body):
+    """archive/2025-12-03.json -> v/archive/2025-12-03.<sha256 前 16 位>.json"""
+    digest = hashlib.sha256(body).hexdigest()[:16]
+    stem, dot, ext = logical_key.rpartition(".")
+    if not dot:
+        stem, ext = logical_key, "bin"
+    return f"{OBJECT_PREFIX}{stem}.{digest}.{ext}"
+
+
+class ImmutablePublisher:
+    def __init__(self, client, bucket):
+        self.client = client
+        self.bucket = bucket
+        self.files = {}
+        self.retired = {}
+        self.etag = None
+        self.changed = False
+        self.uploaded = 0
+        # 本次运行的改动，manifest 被其他运行更新时叠加到新读取的内容上
+        self._published = {}
+        self._deleted = set()
+
+    def load(self):
+        self.files, self.retired, self.etag = {}, {}, None
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=MANIFEST_KEY)
+        except self.client.exceptions.NoSuchKey:
+            return
+        self.etag = obj.get('ETag')
+        data = json.loads(obj['Body'].read().decode('utf-8'))
+        if data.get("version") == MANIFEST_VERSION:
+            self.files = data.get("files", {})
+            self.retired = data.get("retired", {})
+
+    def _point(self, logical_key, key, now):
+        """manifest 条目指向 key，原对象记入 retired"""
+        current = self.files.get(logical_key)
+        if current == key:
+            return False
+        if current:
+            self.retired[current] = now
+        # 内容改回旧版本时，旧对象重新启用
+        self.retired.pop(key, None)
+        self.files[logical_key] = key
+        return True
+
+    def publish(self, logical_key, body, content_type='application/json'):
+        """内容变化时上传新的不可变对象并更新 manifest 条目，返回当前对象 key"""
+        key = content_key(logical_key, body)
+        current = self.files.get(logical_key)
+        if current == key:
+            return key
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=body,
+            ContentType=content_type,
+            CacheControl=OBJECT_CACHE_CONTROL
+        )
+        self._point(logical_key, key, int(time.time()))
+        self._published[logical_key] = key
+        self.changed = True
+        self.uploaded += 1
+        return key
+
+    def gc(self, grace=GC_GRACE_SECONDS, now=None):
+        """删除退役超过 grace 秒的旧对象，返回删除数量"""
+        now = now or time.time()
+        expired = sorted(key for key, retired_at in self.retired.items() if now - retired_at >= grace)
+        for i in range(0, len(expired), 1000):
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": k} for k in expired[i:i + 1000]], "Quiet": True}
+            )
+        for key in expired:
+            del self.retired[key]
+        self._deleted.update(expired)
+        if expired:
+            self.changed = True
+        return len(expired)
+
+    def _reload(self):
+        """重新读取 manifest，叠加本次发布的条目，去掉本次已删除的对象"""
+        self.load()
+        now = int(time.time())
+        for logical_key, key in self._published.items():
+            self._point(logical_key, key, now)
+        for key in self._deleted:
+            self.retired.pop(key, None)
+
+    def commit(self):
+        """
+        所有对象上传完成后最后写 manifest，读者不会拿到指向缺失对象的 manifest
+        以读取时的 ETag 条件写入，被其他运行抢先写入（412）时重新读取、叠加改动后重试
+        """
+        if not self.changed:
+            return False
+        for attempt in range(COMMIT_ATTEMPTS):
+            manifest = {
+                "version": MANIFEST_VERSION,
+                "generated": int(time.time()),
+                "files": dict(sorted(self.files.items())),
+                "retired": self.retired
+            }
+            condition = {"IfMatch": self.etag} if self.etag else {"IfNoneMatch": "*"}
+            try:
+                self.client.put_object(
+                    Bucket=self.bucket,
+                    Key=MANIFEST_KEY,
+                    Body=json.dumps(manifest, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+                    ContentType='application/json',
+                    CacheControl=MANIFEST_CACHE_CONTROL,
+                    **condition
+                )
+            except Exception as e:
+                status = getattr(e, "response", {}).get("ResponseMetadata", {}).get("HTTPStatusCode")
+                if status != 412 or attempt == COMMIT_ATTEMPTS - 1:
+                    raise
+                print(f"ℹ️ manifest 已被其他运行更新，重新读取后重试 ({attempt + 1}/{COMMIT_ATTEMPTS})")
+                self._reload()
+                continue
+            self.changed = False
+            return True
@@ -0,0 +1,175 @@
+import codecs
+import json
+import os
+
+# orjson 可选：未安装时退回标准库 json，输出格式一致
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# === 流式 JSON 读写 ===
+# 存档文件都是顶层数组：读取时逐条解析，写入时逐条追加，内存占用只与单条新闻有关，与文件大小无关
+
+CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\r\n"
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
+def dumps(obj, indent=2):
+    """
+    返回 UTF-8 字节；indent=2 时与 json.dumps(obj, ensure_ascii=False, indent=2) 一致，indent=None 时为紧凑格式
+    带 to_dict() 的记录对象（如 NewsItem）会自动展开
+    """
+    if orjson is not None and indent in (2, None):
+        try:
+            return orjson.dumps(obj, default=_to_dict, option=orjson.OPT_INDENT_2 if indent == 2 else 0)
+        except TypeError:
+            pass
+    text = json.dumps(obj, ensure_ascii=False, indent=indent, default=_to_dict,
+                      separators=(',', ':') if indent is None else None)
+    return text.encode('utf-8')
+
+
+def _to_dict(obj):
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    raise TypeError(f"无法序列化 {type(obj).__name__}")
+
+
+def iter_array(fp, chunk_size=CHUNK_SIZE):
+    """
+    逐条产出顶层 JSON 数组中的元素
+    fp 可以是文本或二进制文件对象（包括 boto3 的 StreamingBody）
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    eof = False
+
+    def read_more():
+        nonlocal eof
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            eof = True
+            return utf8.decode(b'', final=True)
+        return utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+
+    buf = read_more().lstrip('\ufeff')
+    pos = 0
+
+    def skip_ws():
+        nonlocal buf, pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            buf, pos = read_more(), 0
+
+    skip_ws()
+    if pos >= len(buf) or buf[pos] != '[':
+        raise ValueError("JSON 顶层不是数组")
+    pos += 1
+    expect_item = True
+    first = True
+
+    while True:
+        skip_ws()
+        if pos >= len(buf):
+            raise ValueError("JSON 数组不完整")
+        ch = buf[pos]
+        if ch == ']' and (first or not expect_item):
+            return
+        if not expect_item:
+            if ch != ',':
+                raise ValueError(f"JSON 数组在第 {pos} 个字符处缺少逗号")
+            pos += 1
+            expect_item = True
+            continue
+        # 解析一条元素；元素后面还没读到 "," 或 "]" 时，数字可能被截断（如 "-2" 之于 "-2.5"），继续读取
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                tail = end
+                while tail < len(buf) and buf[tail] in _WHITESPACE:
+                    tail += 1
+                if eof or (tail < len(buf) and buf[tail] in ',]'):
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            buf = buf[pos:] + read_more()
+            pos = 0
+        yield item
+        pos = end
+        expect_item = False
+        first = False
+        # 丢弃已解析的部分，避免缓冲区随文件增长
+        if pos > chunk_size:
+            buf, pos = buf[pos:], 0
+
+
+def load_items(path):
+    """逐条读取本地存档文件"""
+    with open(path, 'rb') as f:
+        yield from iter_array(f)
+
+
+def count_items(path):
+    return sum(1 for _ in load_items(path))
+
+
+class ArrayWriter:
+    """
+    逐条写入顶层 JSON 数组，输出与 json.dump(list, ensure_ascii=False, indent=indent) 逐字节一致
+    先写临时文件，正常退出时原子替换；出错或调用 discard() 时丢弃
+    """
+
+    def __init__(self, path, indent=2):
+        self.path = path
+        self.indent = indent
+        self.count = 0
+        self._tmp_path = f"{path}.{os.getpid()}.tmp"
+        self._file = None
+        self._discarded = False
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self._tmp_path, 'w', encoding='utf-8')
+        self._file.write('[')
+        return self
+
+    def write(self, item):
+        if self.indent == 2:
+            text = dumps(item).decode('utf-8')
+        else:
+            text = json.dumps(item, ensure_ascii=False, indent=self.indent, default=_to_dict)
+        if self.indent is None:
+            self._file.write(text if self.count == 0 else ', ' + text)
+        else:
+            pad = ' ' * self.indent
+            self._file.write(',\n' if self.count else '\n')
+            self._file.write(pad + text.replace('\n', '\n' + pad))
+        self.count += 1
+
+    def discard(self):
+        self._discarded = True
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and not self._discarded:
+            if self.count and self.indent is not None:
+                self._file.write('\n')
+            self._file.write(']')
+            self._file.close()
+            os.replace(self._tmp_path, self.path)
+        else:
+            self._file.close()
+            os.remove(self._tmp_path)
+        return False
@@ -0,0 +1,104 @@
+import os
+from urllib.parse import parse_qs, urlparse
+
+from json_stream import dumps
+
+# === 首页精简列表 ===
+# data.json 每条带全部字段，首页列表只渲染标题、来源、logo、分类和时间。
+# feed/list.json 只保留这些字段，每条存为一行数组，重复出现的字符串放进共享查找表 strings，行内只存下标：
+#   {"version", "last_updated", "columns": [...], "strings": [...], "rows": [[...], ...]}
+# 列（见 COLUMNS）：
+#   title / title_tc / title_ja 拆成 正文 + 末尾 " - 媒体名" 后缀（后缀查表）；title_ja 供日文标题搜索
+#   link 拆成 前缀（最后一个 / 之前）+ 中段 + 查询串（前缀、查询串查表）
+#   fetched_at 存为与 timestamp 的差值；origin / category / logo_key 查表
+#   logo_key 为媒体域名，客户端从 logos/outlets.json 合集取 Logo，不再逐条携带 favicon URL
+# 查表列的 -1 表示没有该值；time_str 由客户端按 timestamp 还原
+# 列表之外的字段（摘要、配图等）不在列表中，需要时从 archive/<日期>.json 读取
+
+FEED_FILE = os.path.join("public", "feed", "list.json")
+FEED_R2_KEY = "feed/list.json"
+FEED_VERSION = 3
+COLUMNS = (
+    "title", "title_suffix", "title_tc", "title_tc_suffix", "title_ja", "title_ja_suffix",
+    "link_prefix", "link_path", "link_query",
+    "timestamp", "fetched_delta", "origin", "category", "logo_key",
+)
+TITLE_SEPARATOR = " - "
+
+
+def split_title(title):
+    """"正文 - 媒体名" -> ("正文", "媒体名")；没有后缀时后缀为空"""
+    head, sep, tail = (title or "").rpartition(TITLE_SEPARATOR)
+    if not sep or not head or not tail:
+        return title or "", ""
+    return head, tail
+
+
+def split_link(link):
+    """https://a/b/c?x=1 -> ("https://a/b/", "c", "?x=1")"""
+    link = link or ""
+    path, sep, query = link.partition("?")
+    cut = path.rfind("/") + 1
+    return path[:cut], path[cut:], sep + query
+
+
+def logo_key(item):
+    """logo_key；早期条目只有 favicon URL，从其 domain 参数还原"""
+    if item.get('logo_key'):
+        return item['logo_key']
+    logo = item.get('logo')
+    if not logo:
+        return ""
+    return parse_qs(urlparse(logo).query).get("domain", [""])[0]
+
+
+class _Strings:
+    def __init__(self):
+        self.table = []
+        self.index = {}
+
+    def ref(self, value):
+        if not value:
+            return -1
+        i = self.index.get(value)
+        if i is None:
+            i = self.index[value] = len(self.table)
+            self.table.append(value)
+        return i
+
+
+def build_list_feed(news, last_updated):
+    strings = _Strings()
+    rows = []
+    for item in news:
+        title, title_suffix = split_title(item.get('title'))
+        title_tc, title_tc_suffix = split_title(item.get('title_tc'))
+        title_ja, title_ja_suffix = split_title(item.get('title_ja'))
+        link_prefix, link_path, link_query = split_link(item.get('link'))
+        timestamp = item.get('timestamp') or 0
+        fetched_at = item.get('fetched_at')
+        rows.append([
+            title, strings.ref(title_suffix), title_tc, strings.ref(title_tc_suffix),
+            title_ja, strings.ref(title_ja_suffix),
+            strings.ref(link_prefix), link_path, strings.ref(link_query),
+            timestamp, fetched_at - timestamp if fetched_at else None,
+            strings.ref(item.get('origin')), strings.ref(item.get('category')), strings.ref(logo_key(item)),
+        ])
+    return {
+        "version": FEED_VERSION,
+        "last_updated": last_updated,
+        "columns": list(COLUMNS),
+        "strings": strings.table,
+        "rows": rows
+    }
+
+
+def write_list_feed(news, last_updated, path=FEED_FILE):
+    """原子写入紧凑格式的列表，返回写入的字节数"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    body = dumps(build_list_feed(news, last_updated), indent=None)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(body)
+    os.replace(tmp_path, path)
+    return len(body)
@@ -2,15 +2,31 @@ import feedparser
 import calendar
 import json
 import os
+import sys
 import datetime
 import time
-import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
 import boto3
 from botocore.config import Config
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
+from thumbnails import ThumbCache, process_images, CACHE_FILE as THUMB_CACHE_FILE, CACHE_R2_KEY as THUMB_CACHE_R2_KEY
+from outlet_logos import LogoBundle, BUNDLE_FILE as LOGO_BUNDLE_FILE, BUNDLE_R2_KEY as LOGO_BUNDLE_R2_KEY
+from trend_series import HourlySeries, STATE_FILE as TREND_STATE_FILE, STATE_R2_KEY as TREND_STATE_R2_KEY, PUBLIC_FILE as TREND_PUBLIC_FILE, PUBLIC_R2_KEY as TREND_PUBLIC_R2_KEY
+from news_item import read_items, write_items
+from archive_stats import ArchiveStats, file_stats, STATS_FILE as ARCHIVE_STATS_FILE, STATS_R2_KEY as ARCHIVE_STATS_R2_KEY
+from archive_postings import PostingsIndex, file_postings, STATE_FILE as POSTINGS_STATE_FILE, STATE_R2_KEY as POSTINGS_STATE_R2_KEY, PUBLIC_DIR as POSTINGS_PUBLIC_DIR, R2_PREFIX as POSTINGS_R2_PREFIX
+from immutable_publish import ImmutablePublisher
+from translator import translator_from_env, LATENCY_FILE as TRANSLATE_LATENCY_FILE, LATENCY_R2_KEY as TRANSLATE_LATENCY_R2_KEY
+from list_feed import write_list_feed, FEED_FILE as LIST_FEED_FILE, FEED_R2_KEY as LIST_FEED_R2_KEY
+from day_segments import load_day, append_segment, compact_pending
+from gnews_resolver import LinkCache, resolve_links, CACHE_FILE as LINK_CACHE_FILE, CACHE_R2_KEY as LINK_CACHE_R2_KEY
+
+# 热词分词与日报热词引擎共用 scripts/trending.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from trending import candidate_terms, extract_terms
+
 # Load environment variables
 load_dotenv()
 try:
@@ -29,6 +45,10 @@ R2_ACCOUNT_ID = os.environ.get("R2_ACCOUNT_ID") or os.environ.get("CLOUDFLARE_AC
 R2_ACCESS_KEY = os.environ.get("R2_ACCESS_KEY_ID") or os.environ.get("CLOUDFLARE_R2_ACCESS_KEY_ID", "")
 R2_SECRET_KEY = os.environ.get("R2_SECRET_ACCESS_KEY") or os.environ.get("CLOUDFLARE_R2_SECRET_ACCESS_KEY", "")
 R2_BUCKET_NAME = os.environ.get("R2_BUCKET_NAME", "cnjp-data")
+# 额外发布内容哈希的不可变对象 + manifest.json（见 immutable_publish.py）
+IMMUTABLE_PUBLISH = os.environ.get("IMMUTABLE_PUBLISH", "0") == "1"
+# 配图转 WebP 缩略图并托管到 R2（见 thumbnails.py）；前端尚未展示配图，默认关闭
+THUMBNAILS = os.environ.get("THUMBNAILS", "0") == "1"
 
 def get_r2_client():
     """获取 R2 客户端"""
@@ -63,8 +83,26 @@ def upload_to_r2(client, local_path, r2_key):
         print(f"❌ R2 upload failed for {r2_key}: {e}")
         return False
 
+def upload_bytes_to_r2(client, body, r2_key, content_type, cache_control=None):
+    """上传内存中的二进制内容到 R2"""
+    if client is None:
+        return False
+    try:
+        extra = {"CacheControl": cache_control} if cache_control else {}
+        client.put_object(
+            Bucket=R2_BUCKET_NAME,
+            Key=r2_key,
+            Body=body,
+            ContentType=content_type,
+            **extra
+        )
+        return True
+    except Exception as e:
+        print(f"❌ R2 upload failed for {r2_key}: {e}")
+        return False
+
 def download_file_from_r2(client, r2_key, local_path):
-    """从 R2 下载文件到本地"""
+    """从 R2 下载文件到本地：成功返回 True，R2 上不存在返回 None，其他失败返回 False"""
     if client is None:
         return False
     try:
@@ -76,6 +114,7 @@ def download_file_from_r2(client, r2_key, local_path):
     except ClientError as e:
         if e.response['Error']['Code'] == "404":
             print(f"ℹ️ File not found in R2: {r2_key} (will create new)")
+            return None
         else:
             print(f"❌ R2 download failed for {r2_key}: {e}")
         return False
@@ -164,58 +203,62 @@ def is_false_positive(title, source_name):
     return False
 
 # === 2. 新的分类逻辑 (无科技，有军事) ===
+CATEGORY_KEYWORDS = {
+    "军事": [
+        "军事", "国防", "军", "军队", "解放军", "核武器", "导弹", "演习", "训练", 
+        "巡逻", "海警", "海警局", "钓鱼岛", "尖阁", "南海", "东海", "台海", 
+        "航母", "战斗机", "战机", "舰艇", "潜艇", "驱逐舰", "轰炸机", "侦察机",
+        "入侵", "领空", "领海", "雷达", "部队", "战备", "武力", "威慑"
+    ],
+    "经济": [
+        "经济", "贸易", "股市", "投资", "银行", "企业", "GDP", "市场", "消费", "产业", 
+        "汇率", "美元", "日元", "通胀", "物价", "工资", "就业", "失业", "房地产", "楼市", 
+        "央行", "利率", "加息", "降息", "关税", "出口", "进口", "供应链", "制造", "财报", 
+        "亏损", "盈利", "收购", "合并", "破产", "裁员",
+        # 原科技词汇并入经济
+        "科技", "技术", "研发", "AI", "人工智能", "芯片", "半导体", "电动车", "EV", "比亚迪", 
+        "宁德时代", "华为", "腾讯", "阿里", "字节", "TikTok", "百度", "丰田", "本田", "日产", 
+        "索尼", "松下", "软银", "5G", "6G", "互联网", "机器人", "无人机", "手机", "智能",
+        "太空", "宇宙", "卫星", "火箭", "嫦娥", "神舟", "空间站"
+    ],
+    "社会": [
+        "社会", "人口", "教育", "医疗", "犯罪", "事故", "灾害", "疫情", "感染", "新冠", 
+        "生活", "旅游", "签证", "移民", "少子化", "老龄化", "养老", "福利", "保险", 
+        "医院", "学校", "学生", "老师", "大学", "高考", "留学", "治安", "警察", "逮捕", 
+        "审判", "法院", "律师", "死刑", "地震", "台风", "暴雨", "洪水", "火灾", 
+        "交通", "铁路", "新干线", "航班", "机场", "地铁", "公交", "食品", "安全", 
+        "环境", "污染", "垃圾", "气候", "变暖", "碳中和", "核电", "核污水", "排海", "靖国神社", "熊猫"
+    ],
+    "体育": [
+        "体育", "奥运", "足球", "篮球", "棒球", "选手", "比赛", "冠军", "大谷", "翔平", 
+        "羽生", "结弦", "乒乓", "网球", "游泳", "田径", "マラソン", "相扑", "柔道", 
+        "世界杯", "亚洲杯", "亚运会", "联赛", "俱乐部", "球队", "金牌"
+    ],
+    "娱乐": [
+        "娱乐", "电影", "音乐", "动漫", "电视剧", "明星", "偶像", "演唱会", "综艺", 
+        "声优", "吉卜力", "鬼灭", "海贼王", "进击的巨人", "AKB", "乃木坂", "杰尼斯", 
+        "游戏", "黑神话", "原神", "任天堂"
+    ],
+    "时政": [
+        "政府", "政策", "习近平", "李强", "外交", "政治", "选举", "议员", "首相", "总统", 
+        "中共", "党", "人权", "制裁", "大使", "领事", "条约", "协定", "峰会", "会谈", 
+        "大臣", "内阁", "国会", "参议院", "众议院", "自民党", "拜登", "特朗普", "普京", 
+        "岸田", "石破", "高市", "关系", "互访"
+    ]
+}
+
+CATEGORY_PRIORITY = ["军事", "体育", "娱乐", "社会", "经济", "时政"]
+
 def classify_news(title):
-    keywords = {
-        "军事": [
-            "军事", "国防", "军", "军队", "解放军", "核武器", "导弹", "演习", "训练", 
-            "巡逻", "海警", "海警局", "钓鱼岛", "尖阁", "南海", "东海", "台海", 
-            "航母", "战斗机", "战机", "舰艇", "潜艇", "驱逐舰", "轰炸机", "侦察机",
-            "入侵", "领空", "领海", "雷达", "部队", "战备", "武力", "威慑"
-        ],
-        "经济": [
-            "经济", "贸易", "股市", "投资", "银行", "企业", "GDP", "市场", "消费", "产业", 
-            "汇率", "美元", "日元", "通胀", "物价", "工资", "就业", "失业", "房地产", "楼市", 
-            "央行", "利率", "加息", "降息", "关税", "出口", "进口", "供应链", "制造", "财报", 
-            "亏损", "盈利", "收购", "合并", "破产", "裁员",
-            # 原科技词汇并入经济
-            "科技", "技术", "研发", "AI", "人工智能", "芯片", "半导体", "电动车", "EV", "比亚迪", 
-            "宁德时代", "华为", "腾讯", "阿里", "字节", "TikTok", "百度", "丰田", "本田", "日产", 
-            "索尼", "松下", "软银", "5G", "6G", "互联网", "机器人", "无人机", "手机", "智能",
-            "太空", "宇宙", "卫星", "火箭", "嫦娥", "神舟", "空间站"
-        ],
-        "社会": [
-            "社会", "人口", "教育", "医疗", "犯罪", "事故", "灾害", "疫情", "感染", "新冠", 
-            "生活", "旅游", "签证", "移民", "少子化", "老龄化", "养老", "福利", "保险", 
-            "医院", "学校", "学生", "老师", "大学", "高考", "留学", "治安", "警察", "逮捕", 
-            "审判", "法院", "律师", "死刑", "地震", "台风", "暴雨", "洪水", "火灾", 
-            "交通", "铁路", "新干线", "航班", "机场", "地铁", "公交", "食品", "安全", 
-            "环境", "污染", "垃圾", "气候", "变暖", "碳中和", "核电", "核污水", "排海", "靖国神社", "熊猫"
-        ],
-        "体育": [
-            "体育", "奥运", "足球", "篮球", "棒球", "选手", "比赛", "冠军", "大谷", "翔平", 
-            "羽生", "结弦", "乒乓", "网球", "游泳", "田径", "マラソン", "相扑", "柔道", 
-            "世界杯", "亚洲杯", "亚运会", "联赛", "俱乐部", "球队", "金牌"
-        ],
-        "娱乐": [
-            "娱乐", "电影", "音乐", "动漫", "电视剧", "明星", "偶像", "演唱会", "综艺", 
-            "声优", "吉卜力", "鬼灭", "海贼王", "进击的巨人", "AKB", "乃木坂", "杰尼斯", 
-            "游戏", "黑神话", "原神", "任天堂"
-        ],
-        "时政": [
-            "政府", "政策", "习近平", "李强", "外交", "政治", "选举", "议员", "首相", "总统", 
-            "中共", "党", "人权", "制裁", "大使", "领事", "条约", "协定", "峰会", "会谈", 
-            "大臣", "内阁", "国会", "参议院", "众议院", "自民党", "拜登", "特朗普", "普京", 
-            "岸田", "石破", "高市", "关系", "互访"
-        ]
-    }
-    
-    priority_order = ["军事", "体育", "娱乐", "社会", "经济", "时政"]
-    
-    for cat in priority_order:
-        if any(w in title for w in keywords[cat]):
+    for cat in CATEGORY_PRIORITY:
+        if any(w in title for w in CATEGORY_KEYWORDS[cat]):
             return cat
     return "其他"
 
+def get_trend_terms(title, vocabulary):
+    """标题中属于当天候选词表的 n-gram（候选词表见 trending.candidate_terms）"""
+    return sorted(extract_terms(title) & vocabulary)
+
 def get_current_jst_time():
     return datetime.datetime.now(JST)
 
@@ -231,18 +274,27 @@ def extract_image(entry):
             pass
     return ""
 
-def get_source_logo(entry):
+# 媒体名 -> 域名 的查找结果缓存，同一媒体只扫描一次 MEDIA_DOMAIN_MAP
+_OUTLET_DOMAIN_CACHE = {}
+
+def resolve_outlet_domain(origin_name):
+    if origin_name not in _OUTLET_DOMAIN_CACHE:
+        _OUTLET_DOMAIN_CACHE[origin_name] = next(
+            (domain for key, domain in MEDIA_DOMAIN_MAP.items() if key in origin_name), ""
+        )
+    return _OUTLET_DOMAIN_CACHE[origin_name]
+
+def get_source_domain(entry):
+    """返回条目所属媒体的域名，作为 Logo 合集中的 logo_key"""
     if hasattr(entry, 'source') and 'title' in entry.source:
-        origin_name = entry.source['title']
-        for key, domain in MEDIA_DOMAIN_MAP.items():
-            if key in origin_name:
-                return f"https://www.google.com/s2/favicons?domain={domain}&sz=128"
+        domain = resolve_outlet_domain(entry.source['title'])
+        if domain:
+            return domain
     try:
         if hasattr(entry, 'source') and 'href' in entry.source:
-            domain_url = entry.source['href']
-            domain = urlparse(domain_url).netloc
+            domain = urlparse(entry.source['href']).netloc
             if "google" not in domain:
-                return f"https://www.google.com/s2/favicons?domain={domain}&sz=128"
+                return domain
     except:
         pass
     return ""
@@ -268,9 +320,19 @@ def get_clean_title_key(full_title):
         return full_title.rsplit(" - ", 1)[0].strip()
     return full_title.strip()
 
+# 翻译客户端：连接复用、按历史 p95 对冲、失败切换备用服务（见 translator.py）
+_translator = None
+
+def get_translator():
+    global _translator
+    if _translator is None:
+        _translator = translator_from_env()
+        _translator.tracker.load()
+    return _translator
+
 def google_translate_batch(texts, target_lang='zh-CN', source_lang='ja'):
     """
-    使用 Google Translate gtx 接口进行批量翻译
+    批量翻译标题（默认 Google Translate gtx 接口），失败时保留原文
     """
     if not texts:
         return []
@@ -288,48 +350,40 @@ def google_translate_batch(texts, target_lang='zh-CN', source_lang='ja'):
     if not valid_texts:
         return texts
 
-    # 将文本用换行符拼接。注意：gtx 接口建议通过 POST 发送，单次内容不宜超过 5000 字符
-    combined_text = "\n".join(valid_texts)
-    
-    url = "https://translate.googleapis.com/translate_a/single?client=gtx&sl=ja&tl={}&dt=t".format(target_lang)
-    data = {
-        "q": combined_text
-    }
-    
     # 构建最终结果数组，预填为原文本（作为回退）
     results = list(original_texts)
     
     try:
-        response = requests.post(url, data=data, timeout=15)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        # 谷歌翻译返回的结构中，data[0] 是翻译片段列表
-        full_translation = ""
-        if data and data[0]:
-            for segment in data[0]:
-                if segment[0]:
-                    full_translation += segment[0]
-        
-        # 将翻译后的全文按换行符拆分
-        translated_lines = full_translation.strip().split('\n')
-        
-        # 如果拆分后的行数和输入一致，则一一对应
-        if len(translated_lines) == len(valid_texts):
-            for i, line in enumerate(translated_lines):
-                results[text_map[i]] = line.strip()
-        else:
-            # 数量不匹配视为失败，触发 Ollama 回退
-            raise Exception(f"Batch mismatch: {len(translated_lines)} vs {len(valid_texts)}")
-                
+        translated = get_translator().translate(valid_texts, target_lang, source_lang)
+        for i, line in enumerate(translated):
+            results[text_map[i]] = line
     except Exception as e:
-        print(f"❌ Google Translate failed: {e}. Skipping batch...")
-        # Fallback removed as Ollama is deprecated
-        pass
+        print(f"❌ Translate failed: {e}. Skipping batch...")
 
     return results
 
+def publish_immutable(r2_client, archive_dir, dates):
+    """把本次涉及的文件发布为内容哈希的不可变对象，清理过期旧对象，最后更新 manifest"""
+    files = [
+        ('public/data.json', "data.json"),
+        (os.path.join(archive_dir, 'index.json'), "archive/index.json"),
+        (ARCHIVE_STATS_FILE, ARCHIVE_STATS_R2_KEY),
+        (LIST_FEED_FILE, LIST_FEED_R2_KEY),
+    ] + [(os.path.join(archive_dir, f"{d}.json"), f"archive/{d}.json") for d in dates]
+    try:
+        publisher = ImmutablePublisher(r2_client, R2_BUCKET_NAME)
+        publisher.load()
+        for local_path, logical_key in files:
+            if os.path.exists(local_path):
+                with open(local_path, 'rb') as f:
+                    publisher.publish(logical_key, f.read())
+        removed = publisher.gc()
+        publisher.commit()
+        print(f"✅ 不可变发布：上传 {publisher.uploaded} 个新版本，清理 {removed} 个旧版本")
+    except Exception as e:
+        # 固定 key 已经更新，manifest 失败不影响旧客户端
+        print(f"⚠️ 不可变发布失败，下次运行重试: {e}")
+
 def update_news():
     new_entries = fetch_all_china_news()
     
@@ -358,12 +412,30 @@ def update_news():
     
     print(f"过滤后剩余 {len(candidates)} 条新闻")
 
+    # 获取 R2 客户端
+    r2_client = get_r2_client()
+
+    # 解析 Google News 跳转链接为媒体原文 URL（带持久缓存）
+    link_cache = LinkCache()
+    if r2_client:
+        download_file_from_r2(r2_client, LINK_CACHE_R2_KEY, LINK_CACHE_FILE)
+    link_cache.load()
+    source_urls = resolve_links([e.link for e in candidates], link_cache)
+    link_cache.save()
+    upload_to_r2(r2_client, LINK_CACHE_FILE, LINK_CACHE_R2_KEY)
+
     # 2. 第二步：批量翻译标题
+    if r2_client:
+        download_file_from_r2(r2_client, TRANSLATE_LATENCY_R2_KEY, TRANSLATE_LATENCY_FILE)
     ja_titles = [e.title for e in candidates]
     print("正在进行批量翻译 (简体)...")
     zh_titles = google_translate_batch(ja_titles, target_lang='zh-CN')
     print("正在进行批量翻译 (繁体)...")
     tc_titles = google_translate_batch(ja_titles, target_lang='zh-TW')
+    translator = get_translator()
+    print(translator.report())
+    translator.tracker.save()
+    upload_to_r2(r2_client, TRANSLATE_LATENCY_FILE, TRANSLATE_LATENCY_R2_KEY)
 
     # 3. 第三步：组合数据
     for entry, title_zh, title_tc in zip(candidates, zh_titles, tc_titles):
@@ -375,15 +447,17 @@ def update_news():
         news_datetime = datetime.datetime.fromtimestamp(timestamp, JST)
         news_date_str = news_datetime.strftime("%Y-%m-%d")
         time_str = news_datetime.strftime("%m-%d %H:%M")
-        logo_url = get_source_logo(entry)
+        # Logo 由客户端按 logo_key 从 logos/outlets.json 合集中取，不再逐条附带 favicon URL
+        logo_key = get_source_domain(entry)
 
         news_item = {
             "title": title_zh,
             "title_tc": title_tc,
             "title_ja": title_ja,
             "link": link,
+            "source_url": source_urls.get(link, ""),
             "image": extract_image(entry),
-            "logo": logo_url,
+            "logo_key": logo_key,
             "summary": "",
             "category": classify_news(title_zh),
             "time_str": time_str,
@@ -399,12 +473,32 @@ def update_news():
 
     print(f"抓取处理结束：有效 {valid_count} 条，过滤 {filtered_count} 条。")
 
+    # 配图缩略图：下载一次，转为 WebP 后托管到 R2
+    if r2_client and THUMBNAILS:
+        thumb_cache = ThumbCache()
+        download_file_from_r2(r2_client, THUMB_CACHE_R2_KEY, THUMB_CACHE_FILE)
+        thumb_cache.load()
+        process_images(
+            [item for items in news_by_date.values() for item in items],
+            thumb_cache,
+            lambda body, key: upload_bytes_to_r2(r2_client, body, key, "image/webp", "public, max-age=31536000, immutable")
+        )
+        thumb_cache.save()
+        upload_to_r2(r2_client, THUMB_CACHE_FILE, THUMB_CACHE_R2_KEY)
+
+    # 媒体 Logo 合集：缺失或过期的才重新抓取，有刷新时才上传
+    logo_bundle = LogoBundle()
+    if r2_client:
+        download_file_from_r2(r2_client, LOGO_BUNDLE_R2_KEY, LOGO_BUNDLE_FILE)
+    logo_bundle.load()
+    logo_bundle.refresh(item['logo_key'] for items in news_by_date.values() for item in items)
+    logo_bundle.save()
+    if logo_bundle.changed:
+        upload_to_r2(r2_client, LOGO_BUNDLE_FILE, LOGO_BUNDLE_R2_KEY)
+
     # Archive 更新
     archive_dir = "public/archive"
     os.makedirs(archive_dir, exist_ok=True)
-    
-    # 获取 R2 客户端
-    r2_client = get_r2_client()
 
     today = get_current_jst_time()
     yesterday = today - datetime.timedelta(days=1)
@@ -415,32 +509,62 @@ def update_news():
     
     print(f"需同步日期: {dates_to_sync}")
 
+    # 当天的存档以追加分段的形式上传；已结束日期的分段先合并回日文件
+    today_key = today.strftime("%Y-%m-%d")
+    today_manifest = None
+    compacted_dates = []
+    # 已有存档未能读取的日期：合并时全部条目都会被当成新增，不计入趋势序列
+    unloaded_dates = set()
     if r2_client:
+        try:
+            compacted_dates = compact_pending(
+                r2_client, R2_BUCKET_NAME, until=yesterday.strftime("%Y-%m-%d"), local_dir=archive_dir
+            )
+        except Exception as e:
+            print(f"⚠️ 分段合并失败，下次运行重试: {e}")
+
         for date_str in dates_to_sync:
-            download_file_from_r2(r2_client, f"archive/{date_str}.json", os.path.join(archive_dir, f"{date_str}.json"))
+            local_path = os.path.join(archive_dir, f"{date_str}.json")
+            if date_str != today_key:
+                if download_file_from_r2(r2_client, f"archive/{date_str}.json", local_path) is False:
+                    unloaded_dates.add(date_str)
+                continue
+            try:
+                today_items, today_manifest = load_day(r2_client, R2_BUCKET_NAME, date_str)
+                with open(local_path, 'w', encoding='utf-8') as f:
+                    json.dump(today_items, f, ensure_ascii=False, indent=2)
+                print(f"✅ 已还原当天存档：{len(today_items)} 条，{len(today_manifest['segments'])} 个分段")
+            except Exception as e:
+                # 无法还原时退回整体上传，保证数据不丢
+                print(f"⚠️ 当天分段读取失败，改为整体上传: {e}")
+                today_manifest = None
+                if download_file_from_r2(r2_client, f"archive/{date_str}.json", local_path) is False:
+                    unloaded_dates.add(date_str)
     
     total_updated = 0
     total_added = 0
     total_ignored = 0
 
     uploaded_archives = []
+    added_items = []
+    trend_vocabulary = {}
 
     for date_key, items in news_by_date.items():
         file_path = os.path.join(archive_dir, f"{date_key}.json")
         existing_list = []
         if os.path.exists(file_path):
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    existing_list = json.load(f)
+                # NewsItem 在读取时已把 original_title 等旧字段归一化
+                existing_list = read_items(file_path)
             except:
                 existing_list = []
+                unloaded_dates.add(date_key)
         
+        # 记录合并前的内容，用于找出本次新增 / 变化的条目
+        before = {item.get('link'): item.to_dict() for item in existing_list}
         data_map = {}
         for item in existing_list:
-            raw_title = item.get('title_ja') or item.get('original_title') or item.get('title') or ""
-            clean_key = get_clean_title_key(raw_title)
-            if not item.get('title_ja') and item.get('original_title'):
-                item['title_ja'] = item['original_title']
+            clean_key = get_clean_title_key(item.get('title_ja') or item.get('title') or "")
             data_map[clean_key] = item
         
         for new_item in items:
@@ -457,19 +581,52 @@ def update_news():
                     total_ignored += 1
             else:
                 data_map[new_clean_key] = new_item
+                if date_key not in unloaded_dates:
+                    added_items.append((date_key, new_item))
                 total_added += 1
         
         final_list = list(data_map.values())
         final_list.sort(key=lambda x: x['timestamp'], reverse=True)
+        if date_key in unloaded_dates:
+            print(f"⚠️ [{date_key}] 已有存档未能读取，本次不更新趋势序列")
+        else:
+            trend_vocabulary[date_key] = set(candidate_terms(final_list))
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(final_list, f, ensure_ascii=False, indent=2)
+        write_items(file_path, final_list)
         
-        upload_to_r2(r2_client, file_path, f"archive/{date_key}.json")
-        uploaded_archives.append(date_key)
+        if date_key == today_key and today_manifest is not None:
+            changed = [item for item in final_list if before.get(item.get('link')) != item]
+            if changed:
+                try:
+                    segment_key = append_segment(r2_client, R2_BUCKET_NAME, date_key, changed, today_manifest)
+                    uploaded_archives.append(date_key)
+                    print(f"✅ Uploaded segment to R2: {segment_key} ({len(changed)} 条)")
+                except Exception as e:
+                    print(f"❌ 分段上传失败，改为整体上传: {e}")
+                    upload_to_r2(r2_client, file_path, f"archive/{date_key}.json")
+                    uploaded_archives.append(date_key)
+        else:
+            upload_to_r2(r2_client, file_path, f"archive/{date_key}.json")
+            uploaded_archives.append(date_key)
             
         print(f"[{date_key}] 存档更新: 总{len(final_list)}条")
 
+    # === 每小时趋势序列：只累加本次新增条目 ===
+    trend_series = HourlySeries()
+    if r2_client:
+        download_file_from_r2(r2_client, TREND_STATE_R2_KEY, TREND_STATE_FILE)
+    trend_series.load()
+    for date_key, item in added_items:
+        terms = get_trend_terms(item.get('title') or "", trend_vocabulary[date_key])
+        trend_series.add(item['timestamp'], item.get('category'), item.get('origin'), terms)
+    trend_series.save()
+    os.makedirs(os.path.dirname(TREND_PUBLIC_FILE), exist_ok=True)
+    with open(TREND_PUBLIC_FILE, 'w', encoding='utf-8') as f:
+        json.dump(trend_series.export(), f, ensure_ascii=False, separators=(',', ':'))
+    upload_to_r2(r2_client, TREND_STATE_FILE, TREND_STATE_R2_KEY)
+    upload_to_r2(r2_client, TREND_PUBLIC_FILE, TREND_PUBLIC_R2_KEY)
+    print(f"趋势序列已更新：新增 {len(added_items)} 条")
+
     # === 生成 archive/index.json ===
     print("正在更新归档索引...")
     
@@ -485,21 +642,60 @@ def update_news():
         except Exception as e:
             print(f"读取现有 index.json 失败: {e}, 将重建索引")
 
+    # 每日统计（分类 / 媒体 / 小时分布）与条数在同一次遍历中得到
+    archive_stats = ArchiveStats()
+    postings = PostingsIndex()
+    if r2_client:
+        download_file_from_r2(r2_client, ARCHIVE_STATS_R2_KEY, ARCHIVE_STATS_FILE)
+        download_file_from_r2(r2_client, POSTINGS_STATE_R2_KEY, POSTINGS_STATE_FILE)
+    archive_stats.load()
+    postings.load()
+
     for date_str in dates_to_sync:
         file_path = os.path.join(archive_dir, f"{date_str}.json")
         if os.path.exists(file_path):
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    archive_index[date_str] = len(data)
+                stats = file_stats(file_path)
+                archive_index[date_str] = stats["count"]
+                archive_stats.update(date_str, stats)
+                postings.update(date_str, file_postings(file_path))
             except Exception as e:
                 print(f"读取 {file_path} 计算索引失败: {e}")
 
+    # 补齐统计 / 二级索引缺失、但本地恰好有日存档的日期（例如首次启用时）
+    for date_str in sorted(set(archive_stats.missing(archive_index)) | set(postings.missing(archive_index))):
+        file_path = os.path.join(archive_dir, f"{date_str}.json")
+        if os.path.exists(file_path):
+            try:
+                archive_stats.update(date_str, file_stats(file_path))
+                postings.update(date_str, file_postings(file_path))
+            except Exception as e:
+                print(f"统计 {file_path} 失败: {e}")
+
     with open(index_path, 'w', encoding='utf-8') as f:
         json.dump(archive_index, f, ensure_ascii=False, indent=2)
+    archive_stats.save()
     print("归档索引更新完毕。")
     
     upload_to_r2(r2_client, index_path, "archive/index.json")
+    if archive_stats.changed:
+        upload_to_r2(r2_client, ARCHIVE_STATS_FILE, ARCHIVE_STATS_R2_KEY)
+
+    # 媒体 / 分类二级索引：只上传受影响的分片，目录文件最后上传
+    shards_written, shards_removed = postings.write()
+    postings.save()
+    for rel in shards_written:
+        upload_to_r2(r2_client, os.path.join(POSTINGS_PUBLIC_DIR, rel), f"{POSTINGS_R2_PREFIX}{rel}")
+    if r2_client and shards_removed:
+        try:
+            r2_client.delete_objects(
+                Bucket=R2_BUCKET_NAME,
+                Delete={"Objects": [{"Key": f"{POSTINGS_R2_PREFIX}{rel}"} for rel in shards_removed], "Quiet": True}
+            )
+        except Exception as e:
+            print(f"⚠️ 删除过期索引分片失败: {e}")
+    upload_to_r2(r2_client, POSTINGS_STATE_FILE, POSTINGS_STATE_R2_KEY)
+    print(f"二级索引已更新：{len(shards_written) - 1} 个分片")
 
     # data.json 更新
     homepage_news = []
@@ -532,6 +728,19 @@ def update_news():
         json.dump(output_data, f, ensure_ascii=False, indent=2)
     
     upload_to_r2(r2_client, data_json_path, "data.json")
+
+    # 首页精简列表：只含列表渲染所需字段，完整条目按需从日存档读取
+    feed_size = write_list_feed(homepage_news, output_data["last_updated"])
+    upload_to_r2(r2_client, LIST_FEED_FILE, LIST_FEED_R2_KEY)
+    print(f"精简列表 {LIST_FEED_R2_KEY}: {feed_size // 1024}KB（data.json {os.path.getsize(data_json_path) // 1024}KB）")
+
+    if r2_client and IMMUTABLE_PUBLISH:
+        # 当天按分段发布时不发布整天的不可变版本（否则每小时又整体上传一次），客户端读固定 key + 分段；
+        # 日期结束、分段合并后再随 compacted_dates 发布
+        immutable_dates = dates_to_sync | set(compacted_dates)
+        if today_manifest is not None:
+            immutable_dates.discard(today_key)
+        publish_immutable(r2_client, archive_dir, sorted(immutable_dates))
     
     print(f"全部完成！首页数据 data.json 已包含 {len(homepage_news)} 条新闻。")
     if r2_client:
@@ -1,8 +1,14 @@
-import json
 import os
+import json
 import datetime
 # 直接引用 main.py 里的函数，确保逻辑一致
-from main import is_false_positive, classify_news, get_clean_title_key, JST
+from main import is_false_positive, classify_news, get_clean_title_key, JST, get_r2_client, R2_BUCKET_NAME
+from day_segments import compact_pending
+from json_stream import ArrayWriter, dumps
+from news_item import iter_items
+from archive_stats import ArchiveStats, NON_DAY_FILES, file_stats
+from archive_postings import PostingsIndex, file_postings
+from list_feed import write_list_feed
 
 def run_maintenance():
     archive_dir = "public/archive"
@@ -11,8 +17,15 @@ def run_maintenance():
         return
 
     print("=== 开始全量数据维护 (清洗 + 重分类) ===")
+
+    # 仍有分段的日期先合并回日文件（同时写到本地），否则之后的合并会用分段里的旧版本覆盖本次清洗结果
+    r2_client = get_r2_client()
+    if r2_client:
+        compact_pending(r2_client, R2_BUCKET_NAME, local_dir=archive_dir)
     
-    files = sorted([f for f in os.listdir(archive_dir) if f.endswith(".json")])
+    # index.json / stats.json 是索引与统计，不是新闻列表
+    files = sorted([f for f in os.listdir(archive_dir) if f.endswith(".json") and f not in NON_DAY_FILES])
+    changed_dates = []
     
     total_deleted = 0
     total_reclassified = 0
@@ -21,46 +34,48 @@ def run_maintenance():
     for filename in files:
         filepath = os.path.join(archive_dir, filename)
         
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        original_count = len(data)
-        cleaned_data = []
-        
+        # 逐条读取、逐条写入临时文件，无变动时丢弃临时文件，内存占用与文件大小无关
+        original_count = 0
+        kept_count = 0
         file_reclassified_count = 0
         
-        for item in data:
-            # 兼容字段
-            title_ja = item.get('title_ja') or item.get('original_title') or item.get('title')
-            source = item.get('origin') or ""
-            title_zh = item.get('title')
+        with ArrayWriter(filepath) as writer:
+            for item in iter_items(filepath):
+                original_count += 1
+                # 旧字段 original_title 已在读取时归一化为 title_ja
+                title_ja = item.get('title_ja') or item.get('title')
+                source = item.get('origin') or ""
+                title_zh = item.get('title')
 
-            # --- A. 清洗逻辑 ---
-            if is_false_positive(title_ja, source):
-                print(f"  [删除] {title_ja}")
-                continue # 跳过这条，即删除
-            
-            # --- B. 重分类逻辑 ---
-            old_cat = item.get('category')
-            # 用新的规则计算分类
-            new_cat = classify_news(title_zh)
+                # --- A. 清洗逻辑 ---
+                if is_false_positive(title_ja, source):
+                    print(f"  [删除] {title_ja}")
+                    continue # 跳过这条，即删除
+                
+                # --- B. 重分类逻辑 ---
+                old_cat = item.get('category')
+                # 用新的规则计算分类
+                new_cat = classify_news(title_zh)
+                
+                if old_cat != new_cat:
+                    item['category'] = new_cat
+                    file_reclassified_count += 1
+                    # print(f"  [重分类] {old_cat} -> {new_cat}: {title_zh[:10]}...")
+                
+                writer.write(item)
+                kept_count += 1
             
-            if old_cat != new_cat:
-                item['category'] = new_cat
-                file_reclassified_count += 1
-                # print(f"  [重分类] {old_cat} -> {new_cat}: {title_zh[:10]}...")
+            # 统计
+            deleted_count = original_count - kept_count
             
-            cleaned_data.append(item)
+            # 只要有变动（删除了 或者 重分类了），就写入文件
+            if deleted_count == 0 and file_reclassified_count == 0:
+                writer.discard()
         
-        # 统计
-        deleted_count = original_count - len(cleaned_data)
         total_deleted += deleted_count
         total_reclassified += file_reclassified_count
-        
-        # 只要有变动（删除了 或者 重分类了），就写入文件
         if deleted_count > 0 or file_reclassified_count > 0:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(cleaned_data, f, ensure_ascii=False, indent=2)
+            changed_dates.append(filename[:-5])
             print(f"已处理 {filename}: 删除 {deleted_count} 条, 重分类 {file_reclassified_count} 条")
         else:
             print(f"跳过 {filename}: 无需变动")
@@ -69,6 +84,30 @@ def run_maintenance():
     print(f"共删除无效新闻: {total_deleted} 条")
     print(f"共重分类新闻: {total_reclassified} 条")
 
+    # 只重新统计有变动的日期，同步更新 index.json 中的条数
+    if changed_dates:
+        index_path = os.path.join(archive_dir, "index.json")
+        archive_index = {}
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                archive_index = json.load(f)
+        archive_stats = ArchiveStats()
+        archive_stats.load()
+        postings = PostingsIndex()
+        postings.load()
+        for date_str in changed_dates:
+            file_path = os.path.join(archive_dir, f"{date_str}.json")
+            stats = file_stats(file_path)
+            archive_stats.update(date_str, stats)
+            postings.update(date_str, file_postings(file_path))
+            archive_index[date_str] = stats["count"]
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(archive_index, f, ensure_ascii=False, indent=2)
+        archive_stats.save()
+        postings.write()
+        postings.save()
+        print(f"已更新 {len(changed_dates)} 天的索引、统计与二级索引")
+
     # 2. 强制重建首页 data.json
     print("\n正在重建首页 data.json ...")
     
@@ -84,14 +123,12 @@ def run_maintenance():
     for date_str in target_dates:
         path = os.path.join(archive_dir, f"{date_str}.json")
         if os.path.exists(path):
-            with open(path, 'r', encoding='utf-8') as f:
-                day_data = json.load(f)
-                for item in day_data:
-                    raw_title = item.get('title_ja') or item.get('original_title') or item.get('title') or ""
-                    clean_key = get_clean_title_key(raw_title)
-                    if clean_key not in seen_titles:
-                        homepage_news.append(item)
-                        seen_titles.add(clean_key)
+            for item in iter_items(path):
+                raw_title = item.get('title_ja') or item.get('title') or ""
+                clean_key = get_clean_title_key(raw_title)
+                if clean_key not in seen_titles:
+                    homepage_news.append(item)
+                    seen_titles.add(clean_key)
     
     homepage_news.sort(key=lambda x: x['timestamp'], reverse=True)
     
@@ -100,8 +137,9 @@ def run_maintenance():
         "news": homepage_news
     }
     
-    with open('public/data.json', 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    with open('public/data.json', 'wb') as f:
+        f.write(dumps(output_data))
+    write_list_feed(homepage_news, output_data["last_updated"])
         
     print(f"首页数据重建完成，包含 {len(homepage_news)} 条新闻。")
 
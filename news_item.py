@@ -0,0 +1,145 @@
+import os
+
+from json_stream import dumps, load_items, loads
+
+# === 新闻条目记录类型 ===
+# 用 __slots__ 固定字段，替代各处的 dict；旧字段别名只在读取时归一化一次：
+#   original_title -> title_ja，title_cn -> title
+# 序列化时保持字段的输入顺序（与 dict 相同），读写往返的输出与输入逐字节一致
+
+FIELDS = (
+    "title", "title_tc", "title_ja", "link", "source_url",
+    "image", "image_src", "image_srcset", "logo", "logo_key",
+    "summary", "category", "time_str", "timestamp", "fetched_at", "origin",
+)
+ALIASES = {"original_title": "title_ja", "title_cn": "title"}
+_FIELD_SET = frozenset(FIELDS)
+# 区分 "字段缺失" 与 "值为 null"，保证读写往返不改变内容
+_MISSING = object()
+# 字段顺序元组的驻留表：同一存档内的条目大多共用同一个顺序，每条只持有引用
+_ORDERS = {}
+
+
+def _intern_order(order):
+    return _ORDERS.setdefault(order, order)
+
+
+class NewsItem:
+    """
+    缺失的字段序列化时省略；未知字段保存在 extra 中原样写回
+    提供 get / [] / update，兼容原先按 dict 访问的代码
+    """
+
+    __slots__ = FIELDS + ("extra", "_order")
+
+    def __init__(self, **fields):
+        for name in FIELDS:
+            setattr(self, name, _MISSING)
+        self.extra = None
+        self._order = ()
+        self.update(fields)
+
+    @classmethod
+    def from_dict(cls, data):
+        item = cls.__new__(cls)
+        for name in FIELDS:
+            setattr(item, name, data.get(name, _MISSING))
+        extra = None
+        order = []
+        for key, value in data.items():
+            if key in _FIELD_SET:
+                order.append(key)
+                continue
+            target = ALIASES.get(key)
+            if target:
+                current = getattr(item, target)
+                if current is _MISSING or not current:
+                    setattr(item, target, value)
+                # 只有别名时，归一化后的字段占据别名原来的位置
+                if target not in data and target not in order:
+                    order.append(target)
+                continue
+            if extra is None:
+                extra = {}
+            extra[key] = value
+            order.append(key)
+        item.extra = extra
+        item._order = _intern_order(tuple(order))
+        return item
+
+    def to_dict(self):
+        out = {}
+        extra = self.extra or {}
+        for key in self._order:
+            value = getattr(self, key) if key in _FIELD_SET else extra.get(key, _MISSING)
+            if value is not _MISSING:
+                out[key] = value
+        return out
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        if key in ALIASES:
+            return self.get(ALIASES[key], default)
+        return (self.extra or {}).get(key, default)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        key = ALIASES.get(key, key)
+        if key in _FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+        # 新字段追加在末尾，已有字段保持原位置
+        if key not in self._order:
+            self._order = _intern_order(self._order + (key,))
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def update(self, other):
+        items = other.to_dict().items() if isinstance(other, NewsItem) else dict(other).items()
+        for key, value in items:
+            self[key] = value
+
+    def __eq__(self, other):
+        if isinstance(other, NewsItem):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __hash__(self):
+        # 定义了 __eq__ 需显式给出；相等的条目 link 必然相同，仍可放入 set / 作为 dict 键
+        return hash(self.get('link'))
+
+    def __repr__(self):
+        return f"NewsItem({self.get('title_ja') or self.get('title')!r}, {self.get('link')!r})"
+
+
+def read_items(path):
+    """读取整个日存档为 NewsItem 列表（小文件的快速路径）"""
+    with open(path, "rb") as f:
+        return [NewsItem.from_dict(d) for d in loads(f.read())]
+
+
+def iter_items(path):
+    """逐条读取日存档为 NewsItem（大文件，内存占用恒定）"""
+    for data in load_items(path):
+        yield NewsItem.from_dict(data)
+
+
+def write_items(path, items, indent=2):
+    """原子写入 NewsItem / dict 列表"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(dumps(list(items), indent))
+    os.replace(tmp_path, path)
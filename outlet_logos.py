@@ -0,0 +1,104 @@
+import base64
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# === 媒体 Logo 合集 ===
+# 每个媒体域名的 favicon 只抓取一次，内联为 data URI 合并成一个 JSON，
+# 客户端一次请求即可拿到全部 Logo，条目里只保存 logo_key (域名)
+BUNDLE_FILE = os.path.join("cache", "outlet_logos.json")
+BUNDLE_R2_KEY = "logos/outlets.json"
+FAVICON_URL = "https://www.google.com/s2/favicons?domain={domain}&sz=32"
+# 成功的 Logo 每 7 天刷新一次，抓取失败的 1 天后重试
+REFRESH_AGE = 7 * 24 * 3600
+RETRY_AGE = 24 * 3600
+# 超过 30 天没有出现在新闻里的域名从合集中移除；last_seen 按天更新，避免每次运行都重新上传
+PRUNE_AGE = 30 * 24 * 3600
+SEEN_RESOLUTION = 24 * 3600
+MAX_WORKERS = 8
+
+
+def fetch_logo(domain):
+    """抓取单个域名的 favicon，返回 data URI；失败返回空字符串"""
+    try:
+        response = requests.get(FAVICON_URL.format(domain=domain), timeout=10)
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "image/png").split(";")[0]
+        encoded = base64.b64encode(response.content).decode("ascii")
+        return f"data:{content_type};base64,{encoded}"
+    except Exception as e:
+        print(f"  [Logo 抓取失败] {domain}: {e}")
+        return ""
+
+
+class LogoBundle:
+    """{"updated_at": ts, "logos": {域名: {"data": data URI, "fetched_at": ts, "last_seen": ts}}}"""
+
+    def __init__(self, path=BUNDLE_FILE):
+        self.path = path
+        self.logos = {}
+        self.changed = False
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.logos = json.load(f).get("logos", {})
+        except Exception as e:
+            print(f"⚠️ Logo 合集读取失败，将重建: {e}")
+            self.logos = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"updated_at": int(time.time()), "logos": self.logos},
+                      f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def is_stale(self, domain, now):
+        entry = self.logos.get(domain)
+        if not entry:
+            return True
+        max_age = REFRESH_AGE if entry.get("data") else RETRY_AGE
+        return now - entry.get("fetched_at", 0) >= max_age
+
+    def refresh(self, domains, max_workers=MAX_WORKERS):
+        """补齐缺失的 Logo，按计划刷新过期的 Logo，并移除长期未出现的域名"""
+        now = int(time.time())
+        seen = [d for d in dict.fromkeys(domains) if d]
+        self.prune(seen, now)
+        stale = [d for d in seen if self.is_stale(d, now)]
+        if not stale:
+            return
+        print(f"正在刷新 {len(stale)} 个媒体 Logo...")
+        self.changed = True
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for domain, data in zip(stale, pool.map(fetch_logo, stale)):
+                old = self.logos.get(domain, {})
+                if data:
+                    self.logos[domain] = {"data": data, "fetched_at": now, "last_seen": now}
+                elif old.get("data"):
+                    # 刷新失败时保留旧图，1 天后再重试
+                    self.logos[domain] = {"data": old["data"], "fetched_at": now - REFRESH_AGE + RETRY_AGE, "last_seen": now}
+                else:
+                    self.logos[domain] = {"data": "", "fetched_at": now, "last_seen": now}
+
+    def prune(self, seen, now):
+        for domain in seen:
+            entry = self.logos.get(domain)
+            if entry and now - entry.get("last_seen", 0) >= SEEN_RESOLUTION:
+                entry["last_seen"] = now
+                self.changed = True
+        # 旧版本没有 last_seen 的条目以 fetched_at 计
+        expired = [d for d, entry in self.logos.items()
+                   if now - entry.get("last_seen", entry.get("fetched_at", 0)) >= PRUNE_AGE]
+        for domain in expired:
+            del self.logos[domain]
+        if expired:
+            print(f"移除 {len(expired)} 个长期未出现的媒体 Logo")
+            self.changed = True
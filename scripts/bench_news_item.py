@@ -0,0 +1,98 @@
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# 新闻条目基准：dict + 标准库 json vs NewsItem(__slots__) + json_stream 编解码（orjson 可用时）
+# 用法: python scripts/bench_news_item.py [archive 目录] [重复次数]
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import json_stream  # noqa: E402
+from news_item import NewsItem  # noqa: E402
+
+ARCHIVE_DIR = sys.argv[1] if len(sys.argv) > 1 else os.path.join(PROJECT_ROOT, "public", "archive")
+ROUNDS = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+
+def load_raw():
+    blobs = []
+    for path in sorted(glob.glob(os.path.join(ARCHIVE_DIR, "*.json"))):
+        if path.endswith("index.json"):
+            continue
+        with open(path, "rb") as f:
+            blobs.append(f.read())
+    return blobs
+
+
+def dict_decode(blobs):
+    days = []
+    for blob in blobs:
+        items = json.loads(blob.decode("utf-8"))
+        # 原先在各处重复的别名修补
+        for item in items:
+            if not item.get('title_ja') and item.get('original_title'):
+                item['title_ja'] = item['original_title']
+        days.append(items)
+    return days
+
+
+def record_decode(blobs):
+    return [[NewsItem.from_dict(d) for d in json_stream.loads(blob)] for blob in blobs]
+
+
+def dict_encode(days):
+    return [json.dumps(items, ensure_ascii=False, indent=2).encode("utf-8") for items in days]
+
+
+def record_encode(days):
+    return [json_stream.dumps(items) for items in days]
+
+
+def timed(func, arg):
+    best = float("inf")
+    result = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        result = func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def retained_bytes(func, arg):
+    """解码结果常驻内存的大小（tracemalloc 统计）"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func(arg)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    blobs = load_raw()
+    count = sum(len(json.loads(b)) for b in blobs)
+    codec = "orjson" if json_stream.orjson is not None else "stdlib json"
+    print(f"[*] {len(blobs)} 个存档文件，共 {count} 条，编解码后端: {codec}，取 {ROUNDS} 轮最优\n")
+
+    dict_dec, dict_days = timed(dict_decode, blobs)
+    rec_dec, rec_days = timed(record_decode, blobs)
+    dict_enc, dict_out = timed(dict_encode, dict_days)
+    rec_enc, rec_out = timed(record_encode, rec_days)
+    dict_mem = retained_bytes(dict_decode, blobs)
+    rec_mem = retained_bytes(record_decode, blobs)
+
+    assert [json.loads(b) for b in rec_out] == [json.loads(b) for b in dict_out], "两种路径的输出内容不一致"
+
+    print(f"{'':<10}{'dict + json':>16}{'NewsItem':>16}{'提升':>10}")
+    print(f"{'解码':<10}{dict_dec * 1000:>13.1f} ms{rec_dec * 1000:>13.1f} ms{dict_dec / rec_dec:>9.2f}x")
+    print(f"{'编码':<10}{dict_enc * 1000:>13.1f} ms{rec_enc * 1000:>13.1f} ms{dict_enc / rec_enc:>9.2f}x")
+    print(f"{'每条内存':<8}{dict_mem / count:>14.0f} B{rec_mem / count:>14.0f} B{dict_mem / rec_mem:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
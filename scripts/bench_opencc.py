@@ -0,0 +1,55 @@
+import glob
+import json
+import os
+import sys
+import time
+
+import daily_digest
+
+# 简繁转换基准：逐条 convert() vs to_tc_batch()（冷启动 / LRU 命中）
+# 用法: python scripts/bench_opencc.py [archive 目录]
+
+ARCHIVE_DIR = sys.argv[1] if len(sys.argv) > 1 else os.path.join(daily_digest.project_root, "public", "archive")
+
+
+def load_titles():
+    titles = []
+    for path in sorted(glob.glob(os.path.join(ARCHIVE_DIR, "*.json"))):
+        if path.endswith("index.json"):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            titles.extend(item.get('title', '') for item in data)
+    return [t for t in titles if t]
+
+
+def timed(label, func, count):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:>9.1f} ms  ({elapsed / count * 1e6:.1f} µs/条)")
+    return elapsed
+
+
+def main():
+    converter = daily_digest.cc_converter
+    if converter is None:
+        print("[!] 未安装 opencc，无法运行基准")
+        return
+    titles = load_titles()
+    print(f"[*] 共 {len(titles)} 条标题 (去重后 {len(set(titles))} 条)，来自 {ARCHIVE_DIR}\n")
+
+    baseline = timed("逐条 convert()", lambda: [converter.convert(t) for t in titles], len(titles))
+    daily_digest._tc_memo.clear()
+    cold = timed("to_tc_batch (冷启动)", lambda: daily_digest.to_tc_batch(titles), len(titles))
+    warm = timed("to_tc_batch (LRU 命中)", lambda: daily_digest.to_tc_batch(titles), len(titles))
+
+    expected = [converter.convert(t) for t in titles]
+    daily_digest._tc_memo.clear()
+    assert daily_digest.to_tc_batch(titles) == expected, "批量转换结果与逐条转换不一致"
+    print(f"\n冷启动加速 {baseline / cold:.2f}x，缓存命中加速 {baseline / warm:.1f}x，结果一致")
+
+
+if __name__ == "__main__":
+    main()
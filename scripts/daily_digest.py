@@ -6,15 +6,20 @@ import time
 import re
 import subprocess
 import random
+import argparse
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from botocore.exceptions import ClientError
-
-# 兼容搜索库
-try:
-    from ddgs import DDGS
-except ImportError:
-    from duckduckgo_search import DDGS
+from token_budget import estimate_tokens, pack_titles, TokenBucket
+from stage_graph import Stage, run_stages, StageCancelled, check_cancelled, current_cancel
+from llm_cache import LLMCache, make_key
+from web_search import WebSearcher
+from title_ranking import rank_items
+from trending import TrendEngine
 
 # --- [OpenCC 繁体支持] ---
 try:
@@ -32,6 +37,11 @@ load_dotenv(os.path.join(SCRIPT_DIR, '.env'))
 project_root = os.path.dirname(SCRIPT_DIR)
 load_dotenv(os.path.join(project_root, '.env.local'))
 
+# 根目录的共享模块（当天存档分段等）
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+from day_segments import load_day
+
 # R2 配置
 R2_ACCOUNT_ID = os.getenv('R2_ACCOUNT_ID')
 R2_ACCESS_KEY_ID = os.getenv('R2_ACCESS_KEY_ID')
@@ -49,8 +59,30 @@ except ImportError:
     genai = None
     print("[!] Google Generative AI SDK not found. Install with `pip install google-generativeai`")
 
-# 降低单次处理新闻条数上限，从 120 降至 100，进一步防止 TPM 超限
-MAX_NEWS_ITEMS = 100 
+# 各阶段 prompt 中标题流的 token 预算 (按估算值装填，替代固定条数上限)
+TITLES_TOKEN_BUDGET = int(os.getenv('DIGEST_TITLES_TOKEN_BUDGET', '6000'))
+HOT_TOPICS_TOKEN_BUDGET = int(os.getenv('DIGEST_HOT_TOPICS_TOKEN_BUDGET', '6000'))
+SUMMARY_TOKEN_BUDGET = int(os.getenv('DIGEST_SUMMARY_TOKEN_BUDGET', '4500'))
+HIGHLIGHTS_TOKEN_BUDGET = int(os.getenv('DIGEST_HIGHLIGHTS_TOKEN_BUDGET', '5500'))
+# 预留给模型输出的 token 数，用于限流预占
+OUTPUT_TOKEN_RESERVE = 1500
+
+# Gemma 3 (Gemini API) 的每分钟额度，所有 call_ai_model 调用共享
+AI_TPM_LIMIT = int(os.getenv('DIGEST_TPM_LIMIT', '15000'))
+AI_RPM_LIMIT = int(os.getenv('DIGEST_RPM_LIMIT', '30'))
+rate_limiter = TokenBucket(AI_TPM_LIMIT, AI_RPM_LIMIT)
+
+# 各阶段超时 (秒)，超时后使用降级结果继续组装日报
+LLM_STAGE_TIMEOUT = int(os.getenv('DIGEST_LLM_STAGE_TIMEOUT', '180'))
+SEARCH_STAGE_TIMEOUT = int(os.getenv('DIGEST_SEARCH_STAGE_TIMEOUT', '90'))
+
+# LLM 响应缓存，设置 DIGEST_LLM_CACHE=off 可强制重新生成
+llm_cache = LLMCache(enabled=os.getenv('DIGEST_LLM_CACHE', 'on').lower() != 'off')
+
+# 关键词来源：local = 本地热词引擎 (默认)，llm = 旧版模型识别
+KEYWORDS_MODE = os.getenv('DIGEST_KEYWORDS', 'local').lower()
+
+FALLBACK_KEYWORDS = {"hot": ["中日关系", "地区局势", "经贸合作"], "rising": ["东京", "汇率", "签证", "旅游", "企业"]}
 
 # 反爬虫伪装 UA 池
 USER_AGENTS = [
@@ -59,6 +91,9 @@ USER_AGENTS = [
     'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
 ] 
 
+# 网络情报检索 (补跑 / 重跑共享缓存)
+web_searcher = WebSearcher(USER_AGENTS)
+
 # 本地文件路径
 LOCAL_SAVE_DIR = os.path.join(SCRIPT_DIR, "local_summaries")
 
@@ -117,7 +152,7 @@ def get_target_date_str():
     target_date = datetime.now(jst) - timedelta(days=1)
     return target_date.strftime('%Y-%m-%d')
 
-def load_previous_context(current_date_str):
+def load_previous_context(current_date_str, client=None):
     try:
         curr_date = datetime.strptime(current_date_str, '%Y-%m-%d')
         prev_date = curr_date - timedelta(days=1)
@@ -125,10 +160,20 @@ def load_previous_context(current_date_str):
         filename = f"{prev_date_str}_summary.json"
         file_path = os.path.join(LOCAL_SAVE_DIR, filename)
         
+        data = None
         if os.path.exists(file_path):
             print(f"[-] [Memory] 加载昨日记忆: {filename}")
             with open(file_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
+        elif client:
+            # 本地没有（如补跑时由其他机器生成），尝试从 R2 读取
+            try:
+                response = client.get_object(Bucket=R2_BUCKET_NAME, Key=f"{R2_TARGET_PREFIX}{filename}")
+                data = json.loads(response['Body'].read().decode('utf-8'))
+                print(f"[-] [Memory] 从 R2 加载昨日记忆: {filename}")
+            except Exception:
+                data = None
+        if data:
             # 提取 stance 或 summary 作为记忆
             summary = data.get('section_stance') or data.get('summary', '')
             summary_clean = re.sub(r'<[^>]+>', '', summary)[:800]
@@ -143,9 +188,11 @@ def download_json_from_r2(client, date_str):
     key_name = f"{R2_SOURCE_PREFIX}{date_str}.json"
     print(f"[-] 正在从 R2 下载数据: {key_name}")
     try:
-        response = client.get_object(Bucket=R2_BUCKET_NAME, Key=key_name)
-        content = response['Body'].read().decode('utf-8')
-        return json.loads(content)
+        # 日文件 + 尚未合并的当天分段
+        items, manifest = load_day(client, R2_BUCKET_NAME, date_str, R2_SOURCE_PREFIX)
+        if manifest["segments"]:
+            print(f"[-] 已叠加 {len(manifest['segments'])} 个未合并分段")
+        return items or None
     except ClientError as e:
         print(f"[!] R2 下载失败: {e}")
         return None
@@ -201,12 +248,51 @@ def clean_unwanted_dividers(text):
     text = re.sub(r'[（\(]《.*?》[）\)]', '', text)
     return text
 
+# 简繁转换结果的 LRU 缓存，补跑模式下跨日期共享（各日标题、固定文案大量重复）
+TC_MEMO_SIZE = 8192
+_TC_SEPARATOR = "\x1e"
+_tc_memo = OrderedDict()
+_tc_memo_lock = threading.Lock()
+
+def to_tc_batch(texts):
+    """
+    批量简转繁：去重 + 查 LRU 缓存，未命中的拼接后一次性交给 OpenCC 转换
+    返回与 texts 一一对应的列表
+    """
+    texts = ["" if not t else str(t) for t in texts]
+    if not cc_converter:
+        return texts
+
+    # 结果先从本次查到 / 转换的局部表取，LRU 只负责跨调用复用；
+    # 否则单次超过 TC_MEMO_SIZE 条或其他线程同时写入时，刚插入的条目可能已被淘汰
+    result = {}
+    with _tc_memo_lock:
+        missing = []
+        for t in dict.fromkeys(texts):
+            if not t: continue
+            if t in _tc_memo:
+                _tc_memo.move_to_end(t)
+                result[t] = _tc_memo[t]
+            else:
+                missing.append(t)
+
+    if missing:
+        converted = cc_converter.convert(_TC_SEPARATOR.join(missing)).split(_TC_SEPARATOR)
+        if len(converted) != len(missing):
+            # 分隔符被破坏时退回逐条转换
+            converted = [cc_converter.convert(t) for t in missing]
+        fresh = dict(zip(missing, converted))
+        result.update(fresh)
+        with _tc_memo_lock:
+            _tc_memo.update(fresh)
+            while len(_tc_memo) > TC_MEMO_SIZE:
+                _tc_memo.popitem(last=False)
+
+    return [result.get(t, t) if t else "" for t in texts]
+
 def to_tc(text):
     if not text: return ""
-    text = str(text)
-    if cc_converter:
-        return cc_converter.convert(text)
-    return text 
+    return to_tc_batch([text])[0]
 
 def call_ai_model(prompt, system, format_json=False):
     if not genai:
@@ -223,31 +309,69 @@ def call_ai_model(prompt, system, format_json=False):
         
         full_prompt = f"{final_system}\n\n{prompt}" if final_system else prompt
         
+        model_name = "gemma-3-27b-it"
+        generation_config = {
+            "temperature": 0.6
+            # "response_mime_type": "application/json" # Not supported by gemma-3-27b-it
+        }
+        cache_key = make_key(model_name, final_system, prompt, generation_config)
+        text = llm_cache.get(cache_key)
+        if text is not None:
+            print("[-] [Cache] 命中 LLM 响应缓存")
+            if format_json:
+                text = re.sub(r'```json\s*|\s*```', '', text)
+            return text
+
         model = genai.GenerativeModel(
-            model_name="gemma-3-27b-it",
-            generation_config={
-                "temperature": 0.6
-                # "response_mime_type": "application/json" # Not supported by gemma-3-27b-it
-            }
+            model_name=model_name,
+            generation_config=generation_config
         )
-        response = model.generate_content(full_prompt)
+        # 所在阶段已超时则不再请求；限流等待中超时也立即退出
+        check_cancelled()
+        event = rate_limiter.acquire(estimate_tokens(full_prompt) + OUTPUT_TOKEN_RESERVE, cancel=current_cancel())
+        if event is None:
+            raise StageCancelled()
+        try:
+            response = model.generate_content(full_prompt)
+        except Exception as e:
+            # 429 / 配额耗尽：暂停共享限流器后重试一次
+            if "429" not in str(e) and "quota" not in str(e).lower():
+                raise
+            print(f"[!] [Rate Limit] 配额受限，退避后重试: {e}")
+            rate_limiter.settle(event, None)
+            rate_limiter.backoff(60)
+            event = rate_limiter.acquire(estimate_tokens(full_prompt) + OUTPUT_TOKEN_RESERVE, cancel=current_cancel())
+            if event is None:
+                raise StageCancelled()
+            response = model.generate_content(full_prompt)
+        usage = getattr(response, 'usage_metadata', None)
+        rate_limiter.settle(event, getattr(usage, 'total_token_count', None))
         text = response.text
+        # 只缓存可用的响应：空响应、截断或无法解析的 JSON 不写入，重跑时重新请求
+        if text and text.strip() and (not format_json or extract_json_from_text(text) is not None):
+            llm_cache.put(cache_key, text, model_name)
+        else:
+            print("[!] [Cache] AI 响应为空或 JSON 无法解析，不写入缓存")
         if format_json:
              # Clean up markdown code blocks if present
             text = re.sub(r'```json\s*|\s*```', '', text)
         return text
+    except StageCancelled:
+        print("[-] [AI] 所在阶段已超时，跳过本次调用")
+        return None
     except Exception as e:
         print(f"[!] Gemini Error: {e}")
         return None
 
 # --- 3. 核心业务逻辑 ---
 
-def preprocess_data(news_data, limit=MAX_NEWS_ITEMS):
+def preprocess_data(news_data, token_budget=TITLES_TOKEN_BUDGET):
     titles_for_ai = []
     lookup_dict = {}
     if isinstance(news_data, list):
-        # 按照时间戳倒序排列，优先处理最新新闻
+        # 按照时间戳倒序排列，REF_ 编号沿用排序后的下标，保持稳定
         news_sorted = sorted(news_data, key=lambda x: x.get('timestamp', 0), reverse=True)
+        candidates = []
         for idx, item in enumerate(news_sorted):
             title = (item.get('title_cn') or item.get('title') or "").strip()
             origin = item.get('origin', '未知媒体')
@@ -260,22 +384,29 @@ def preprocess_data(news_data, limit=MAX_NEWS_ITEMS):
 
             if title:
                 ref_id = f"REF_{idx}"
-                full_title_str = f"[{ref_id}] {title} (来源: {origin})"
-                titles_for_ai.append(full_title_str)
                 lookup_dict[ref_id] = {
                     "original_title": title,
                     "link": item.get('link', ''),
                     "origin": origin,
                     "id": item.get('id', None)
                 }
-    actual_limit = min(len(titles_for_ai), limit)
-    print(f"[*] 数据加载完成: 共 {len(titles_for_ai)} 条 -> AI处理前 {actual_limit} 条")
-    return titles_for_ai[:actual_limit], lookup_dict
+                candidates.append({"ref_id": ref_id, "title": title, "origin": origin,
+                                   "timestamp": item.get('timestamp', 0)})
+
+        # 本地预排序：近似重复的报道聚为一簇，只保留代表标题，按重要度排列
+        for rep, members, outlets, _ in rank_items(candidates, 'title'):
+            c = candidates[rep]
+            source = c['origin'] if outlets <= 1 else f"{c['origin']} 等{outlets}家"
+            titles_for_ai.append(f"[{c['ref_id']}] {c['title']} (来源: {source})")
+        print(f"[*] 本地预排序: {len(candidates)} 条 -> {len(titles_for_ai)} 个事件簇")
+    packed = pack_titles(titles_for_ai, token_budget)
+    print(f"[*] 数据加载完成: 共 {len(titles_for_ai)} 条 -> AI处理前 {len(packed)} 条 (预算 {token_budget} tokens)")
+    return packed, lookup_dict
 
 def identify_hot_topics(titles):
     print(f"[-] [AI] 正在扫描全量标题以识别核心议题 (Hot & Rising)...")
     # 抽取更多标题用于关键词识别，确保覆盖面
-    sample_titles = titles[:150] 
+    sample_titles = pack_titles(titles, HOT_TOPICS_TOKEN_BUDGET)
     titles_text = "\n".join([f"- {t}" for t in sample_titles])
     
     system = (
@@ -299,7 +430,18 @@ def identify_hot_topics(titles):
         print(f"[!] 关键词解析失败: {e}")
 
     # Fallback
-    return {"hot": ["中日关系", "地区局势", "经贸合作"], "rising": ["东京", "汇率", "签证", "旅游", "企业"]}
+    return FALLBACK_KEYWORDS
+
+def extract_keywords(raw_data, target_date_str, client):
+    """用本地热词引擎从当日原始条目中提取 hot / rising 关键词，不消耗模型调用"""
+    print(f"[-] [Trends] 正在统计当日热词...")
+    engine = TrendEngine(lambda d: download_json_from_r2(client, d), client, R2_BUCKET_NAME)
+    keywords = engine.hot_and_rising(target_date_str, raw_data)
+    if keywords["hot"]:
+        print(f"[-] [Trends] Hot: {keywords['hot']} | Rising: {keywords['rising']}")
+        return keywords
+    print("[!] [Trends] 当日热词为空，使用默认关键词")
+    return FALLBACK_KEYWORDS
 
 def search_web_for_context(keywords, target_date_str):
     # keywords 现在是 dict，只搜索 hot 关键词以节省时间
@@ -309,51 +451,19 @@ def search_web_for_context(keywords, target_date_str):
     print(f"[-] [Network] 正在回溯情报 ({target_date_str}): {hot_keywords} ...")
     context_results = []
     
-    for query in hot_keywords:
-        historical_query = f"{query} {target_date_str}"
-        max_retries = 3
-        success = False
-        
-        for attempt in range(max_retries):
-            try:
-                # 随机选择 User-Agent
-                headers = {"User-Agent": random.choice(USER_AGENTS)}
-                
-                with DDGS(headers=headers) as ddgs:
-                    # 获取结果，加上异常处理
-                    results = list(ddgs.text(historical_query, max_results=2))
-                    
-                    if results:
-                        for res in results:
-                            # 兼容不同版本的字段
-                            body = res.get('body') or res.get('snippet') or ""
-                            context_results.append(f"【情报-{query}】{body}")
-                        success = True
-                        break # 成功则退出重试循环
-                    else:
-                         # 没结果可能是真没结果，也可能是被ban，稍微等一下再试
-                         if attempt < max_retries - 1:
-                             time.sleep(1)
-            except Exception as e:
-                print(f"    [Retry] 关键词 '{query}' 第 {attempt+1} 次失败: {e}")
-                
-            # 指数退避: 1s, 2s, 4s... 加随机抖动
-            if not success and attempt < max_retries - 1:
-                wait_time = (2 ** attempt) + random.uniform(0.1, 1.0)
-                time.sleep(wait_time)
-
-        if not success:
+    # 关键词并发检索，命中 (query, date) 缓存的不再联网
+    for query, bodies in zip(hot_keywords, web_searcher.search_many(hot_keywords, target_date_str)):
+        if not bodies:
             print(f"[!] 关键词 '{query}' 搜索均失败或无结果。")
-            
-        # 关键词之间必须有停顿
-        time.sleep(random.uniform(1.5, 3.0))
+        for body in bodies:
+            context_results.append(f"【情报-{query}】{body}")
 
     return "\n".join(context_results)
 
 def generate_structured_summary(titles, web_context, prev_context_str, keywords, target_date_str):
     print(f"[-] [AI] 正在撰写结构化内参 (JSON Structure Mode)...")
-    # 为了保证摘要质量，选取前 80 条最具代表性的新闻给模型
-    core_titles = titles[:80]
+    # 为了保证摘要质量，只在预算内选取最具代表性的新闻给模型
+    core_titles = pack_titles(titles, SUMMARY_TOKEN_BUDGET)
     titles_text = "\n".join([f"- {t}" for t in core_titles])
     
     # 仅使用 hot 关键词作为 prompt 背景
@@ -398,7 +508,7 @@ def generate_structured_summary(titles, web_context, prev_context_str, keywords,
 def select_highlights_json(titles):
     print(f"[-] [AI] 正在从标题中筛选 Top 5 关键信号...")
     # 筛选时也稍微减少一些条数，避免模型压力过大导致 Ref ID 匹配错误
-    selection_titles = titles[:100]
+    selection_titles = pack_titles(titles, HIGHLIGHTS_TOKEN_BUDGET)
     titles_text = "\n".join([f"- {t}" for t in selection_titles])
     
     system = (
@@ -441,13 +551,16 @@ def construct_final_data(summary_obj, highlights_json, lookup_dict, total_count,
     events_sc = clean_unwanted_dividers(events_sc)
     forecast_sc = clean_unwanted_dividers(forecast_sc)
 
-    combined_summary_sc = (
-        f"<b>态势定调</b>\n{stance_sc}\n\n"
-        f"<b>关键事件</b>\n{events_sc}\n\n"
-        f"<b>风向预测</b>\n{forecast_sc}"
-    )
-    
-    combined_summary_tc = to_tc(combined_summary_sc)
+    def combine_sections(headers, stance, events, forecast):
+        return (
+            f"<b>{headers[0]}</b>\n{stance}\n\n"
+            f"<b>{headers[1]}</b>\n{events}\n\n"
+            f"<b>{headers[2]}</b>\n{forecast}"
+        )
+
+    section_headers = ["态势定调", "关键事件", "风向预测"]
+    combined_summary_sc = combine_sections(section_headers, stance_sc, events_sc, forecast_sc)
+    raw_sections_sc = [stance_sc, events_sc, forecast_sc]
     
     stance_sc = format_markdown_bold_to_html(stance_sc)
     events_sc = format_markdown_bold_to_html(events_sc)
@@ -471,28 +584,47 @@ def construct_final_data(summary_obj, highlights_json, lookup_dict, total_count,
                 if info:
                     final_highlights.append({
                         "title": info['original_title'],
-                        "title_tc": to_tc(info['original_title']),
+                        "title_tc": "",
                         "link": info['link'],
                         "origin": info['origin'],
                         "id": info['id'],
                         "analysis": smart_sanitize(comment_sc, ""),
-                        "analysis_tc": to_tc(smart_sanitize(comment_sc, ""))
+                        "analysis_tc": ""
                     })
 
+    # 一次性转换本期所有需要繁体的文本；分节与合并摘要共用同一份转换结果，
+    # 加粗标记替换只涉及 ASCII，与简繁转换可交换顺序
+    title_sc = f"{date_obj.year}年{date_obj.month}月{date_obj.day}日 态势简报"
+    tc_sources = (
+        [title_sc, editorial_vibe_sc] + section_headers + raw_sections_sc
+        + [h["title"] for h in final_highlights] + [h["analysis"] for h in final_highlights]
+    )
+    tc_results = iter(to_tc_batch(tc_sources))
+    title_tc, editorial_vibe_tc = next(tc_results), next(tc_results)
+    section_headers_tc = [next(tc_results) for _ in section_headers]
+    raw_sections_tc = [next(tc_results) for _ in raw_sections_sc]
+    for h in final_highlights:
+        h["title_tc"] = next(tc_results)
+    for h in final_highlights:
+        h["analysis_tc"] = next(tc_results)
+
+    combined_summary_tc = combine_sections(section_headers_tc, *raw_sections_tc)
+    stance_tc, events_tc, forecast_tc = [format_markdown_bold_to_html(t) for t in raw_sections_tc]
+
     return {
-        "title": f"{date_obj.year}年{date_obj.month}月{date_obj.day}日 态势简报",
-        "title_tc": to_tc(f"{date_obj.year}年{date_obj.month}月{date_obj.day}日 态势简报"),
+        "title": title_sc,
+        "title_tc": title_tc,
         "summary": combined_summary_sc,
         "summary_tc": combined_summary_tc,
         "section_stance": stance_sc,        
-        "section_stance_tc": to_tc(stance_sc),     
+        "section_stance_tc": stance_tc,     
         "section_events": events_sc,        
-        "section_events_tc": to_tc(events_sc),     
+        "section_events_tc": events_tc,     
         "section_forecast": forecast_sc,    
-        "section_forecast_tc": to_tc(forecast_sc), 
+        "section_forecast_tc": forecast_tc, 
         "key_highlights": final_highlights,
         "editorial_vibe": editorial_vibe_sc,
-        "editorial_vibe_tc": to_tc(editorial_vibe_sc),
+        "editorial_vibe_tc": editorial_vibe_tc,
         "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         "id": f"{date_obj.strftime('%Y%m%d')}_DAILY",
         "type": "DAILY",
@@ -501,55 +633,64 @@ def construct_final_data(summary_obj, highlights_json, lookup_dict, total_count,
         "keywords": keywords
     }
 
-def main():
-    target_date = get_target_date_str()
-    print(f"=== 启动智能主编系统 (Enhanced Stability): {target_date} ===")
-
-    # [新增] 尝试从 R2 下载最新的世界基准覆盖本地
+def load_cloud_baseline(r2):
+    """尝试从 R2 下载最新的世界基准覆盖本地"""
+    global WORLD_BASELINE
+    if not r2:
+        return
+    print("[-] [Init] 检查云端世界基准 (config/world_baseline.json)...")
+    bucket = os.getenv("R2_BUCKET_NAME", "cnjp-data")
     try:
-        r2 = get_r2_client()
-        if r2:
-            print("[-] [Init] 检查云端世界基准 (config/world_baseline.json)...")
-            bucket = os.getenv("R2_BUCKET_NAME", "cnjp-data")
-            try:
-                response = r2.get_object(Bucket=bucket, Key="config/world_baseline.json")
-                body = response['Body'].read().decode('utf-8')
-                data = json.loads(body)
-                if data and data.get("content"):
-                    global WORLD_BASELINE
-                    WORLD_BASELINE = data.get("content")
-                    print("[-] [Init] 成功加载云端动态基准！")
-            except Exception as inner_e:
-                print(f"[-] [Init] 云端未找到基准或读取失败: {inner_e}")
-    except Exception as e:
-        print(f"[-] [Init] 云端基准加载逻辑跳过: {e}")
-
-    
-    s3_client = get_r2_client()
-    # 为调试/补发，如果不强制检查，可以注释掉下面这段
-    check_key = f"{R2_TARGET_PREFIX}{target_date}_summary.json"
-    # s3_client.head_object 调用有时可能受 CF 拦截，这里直接尝试下载或继续
-
+        response = r2.get_object(Bucket=bucket, Key="config/world_baseline.json")
+        body = response['Body'].read().decode('utf-8')
+        data = json.loads(body)
+        if data and data.get("content"):
+            WORLD_BASELINE = data.get("content")
+            print("[-] [Init] 成功加载云端动态基准！")
+    except Exception as inner_e:
+        print(f"[-] [Init] 云端未找到基准或读取失败: {inner_e}")
+
+def process_date(target_date, s3_client, wait_for_prev=None, publish_latest=True):
+    """
+    生成并上传单日简报，成功返回 True
+    wait_for_prev: 补跑模式下等待前一日简报完成的 Event，仅阻塞依赖昨日记忆的摘要阶段
+    """
     raw_data = download_json_from_r2(s3_client, target_date)
     if not raw_data: 
         print(f"[!] 未能从 R2 获取日期为 {target_date} 的新闻数据。")
-        return
+        return False
 
-    titles_for_ai, lookup_dict = preprocess_data(raw_data, limit=MAX_NEWS_ITEMS)
+    titles_for_ai, lookup_dict = preprocess_data(raw_data)
     if not titles_for_ai: 
         print("[!] 数据预处理后为空，停止生成。")
-        return
+        return False
+
+    def prev_context():
+        if wait_for_prev is not None:
+            wait_for_prev.wait()
+        return load_previous_context(target_date, s3_client)
+
+    # 按依赖关系并发执行：highlights 只依赖标题，可与关键词/搜索/摘要链路并行
+    stages = [
+        Stage("prev_context", prev_context, fallback=""),
+        Stage("keywords", lambda: (identify_hot_topics(titles_for_ai) if KEYWORDS_MODE == "llm"
+                                   else extract_keywords(raw_data, target_date, s3_client)),
+              timeout=LLM_STAGE_TIMEOUT, fallback=FALLBACK_KEYWORDS),
+        Stage("web_context", lambda keywords: search_web_for_context(keywords, target_date),
+              deps=["keywords"], timeout=SEARCH_STAGE_TIMEOUT, fallback=""),
+        Stage("summary", lambda keywords, web_context, prev_context: generate_structured_summary(
+                  titles_for_ai, web_context, prev_context, keywords, target_date),
+              deps=["keywords", "web_context", "prev_context"], timeout=LLM_STAGE_TIMEOUT, fallback=None),
+        Stage("highlights", lambda: select_highlights_json(titles_for_ai),
+              timeout=LLM_STAGE_TIMEOUT, fallback="{}"),
+    ]
+    results, report = run_stages(stages)
+    for name, info in report.items():
+        print(f"[-] [Stage] {target_date} {name}: {info['status']} ({info['seconds']}s)")
+    keywords = results["keywords"]
+    summary_obj = results["summary"]
+    highlights_json = results["highlights"]
 
-    prev_context_str = load_previous_context(target_date)
-    keywords = identify_hot_topics(titles_for_ai)
-    web_context = search_web_for_context(keywords, target_date)
-    summary_obj = generate_structured_summary(titles_for_ai, web_context, prev_context_str, keywords, target_date)
-    
-    print("[-] [Rate Limit] 暂停 30 秒以释放 TPM 配额...")
-    time.sleep(30)
-    
-    highlights_json = select_highlights_json(titles_for_ai)
-    
     final_data = construct_final_data(
         summary_obj, highlights_json or "{}", 
         lookup_dict, len(raw_data), 
@@ -558,16 +699,129 @@ def main():
     
     json_output_str = json.dumps(final_data, ensure_ascii=False, indent=2)
     local_json_path = os.path.join(LOCAL_SAVE_DIR, f"{target_date}_summary.json")
-    if not os.path.exists(LOCAL_SAVE_DIR): os.makedirs(LOCAL_SAVE_DIR)
+    os.makedirs(LOCAL_SAVE_DIR, exist_ok=True)
     
     with open(local_json_path, 'w', encoding='utf-8') as f:
         f.write(json_output_str)
     
     upload_json_to_r2(s3_client, json_output_str, f"{R2_TARGET_PREFIX}{target_date}_summary.json")
-    upload_json_to_r2(s3_client, json_output_str, f"{R2_TARGET_PREFIX}latest.json")
+    if publish_latest:
+        upload_json_to_r2(s3_client, json_output_str, f"{R2_TARGET_PREFIX}latest.json")
+    return True
+
+# --- 4. 补跑模式 ---
+
+BACKFILL_CHECKPOINT_KEY = f"{R2_TARGET_PREFIX}backfill_checkpoint.json"
+
+class BackfillCheckpoint:
+    """记录已完成的日期，本地与 R2 双写，中断后重跑自动跳过"""
+
+    def __init__(self, client):
+        self.client = client
+        self.path = os.path.join(LOCAL_SAVE_DIR, "backfill_checkpoint.json")
+        self.completed = set()
+        self._lock = threading.Lock()
+
+    def load(self):
+        data = None
+        if self.client:
+            try:
+                response = self.client.get_object(Bucket=R2_BUCKET_NAME, Key=BACKFILL_CHECKPOINT_KEY)
+                data = json.loads(response['Body'].read().decode('utf-8'))
+            except Exception:
+                data = None
+        if data is None and os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        self.completed = set((data or {}).get("completed", []))
+
+    def mark(self, date_str):
+        with self._lock:
+            self.completed.add(date_str)
+            json_str = json.dumps({
+                "completed": sorted(self.completed),
+                "updated_at": datetime.now().isoformat()
+            }, ensure_ascii=False, indent=2)
+            os.makedirs(LOCAL_SAVE_DIR, exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(json_str)
+            upload_json_to_r2(self.client, json_str, BACKFILL_CHECKPOINT_KEY)
+
+def date_range(start_str, end_str):
+    start = datetime.strptime(start_str, '%Y-%m-%d')
+    end = datetime.strptime(end_str, '%Y-%m-%d')
+    return [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range((end - start).days + 1)]
+
+def run_backfill(start_str, end_str, s3_client, workers=2, restart=False):
+    """
+    补跑 [start, end] 区间的日报
+    多个日期并发处理并共享限流器；每日的摘要阶段等待前一日完成（昨日记忆），
+    其余阶段（关键词、搜索、精选）不受前一日阻塞
+    """
+    dates = date_range(start_str, end_str)
+    checkpoint = BackfillCheckpoint(s3_client)
+    checkpoint.load()
+    if restart:
+        checkpoint.completed -= set(dates)
+    todo = [d for d in dates if d not in checkpoint.completed]
+    print(f"=== 补跑模式: {start_str} ~ {end_str}，共 {len(dates)} 天，待处理 {len(todo)} 天 ===")
+
+    # 前一日若也在待处理列表中，则需等待其完成
+    done_events = {d: threading.Event() for d in todo}
+    latest_target = get_target_date_str()
+
+    def worker(date_str):
+        prev_str = (datetime.strptime(date_str, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+        try:
+            ok = process_date(date_str, s3_client,
+                              wait_for_prev=done_events.get(prev_str),
+                              publish_latest=(date_str == latest_target))
+            if ok:
+                checkpoint.mark(date_str)
+            return date_str, ok
+        except Exception as e:
+            print(f"[!] {date_str} 处理失败: {e}")
+            return date_str, False
+        finally:
+            done_events[date_str].set()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(worker, todo))
+
+    failed = [d for d, ok in outcomes if not ok]
+    print(f"[-] [Backfill] 完成 {len(outcomes) - len(failed)} 天，失败 {len(failed)} 天: {failed}")
+
+def main():
+    parser = argparse.ArgumentParser(description="每日态势简报生成")
+    parser.add_argument("--date", help="处理指定日期 (YYYY-MM-DD)，默认昨天 (JST)")
+    parser.add_argument("--backfill", nargs=2, metavar=("START", "END"), help="补跑日期区间 (含首尾)")
+    parser.add_argument("--workers", type=int, default=2, help="补跑并发日期数")
+    parser.add_argument("--restart", action="store_true", help="忽略补跑断点，全部重新生成")
+    args = parser.parse_args()
+
+    target_date = args.date or get_target_date_str()
+    print(f"=== 启动智能主编系统 (Enhanced Stability): {target_date} ===")
+
+    s3_client = get_r2_client()
+    llm_cache.attach_r2(s3_client, R2_BUCKET_NAME)
+    web_searcher.attach_r2(s3_client, R2_BUCKET_NAME)
+    try:
+        load_cloud_baseline(s3_client)
+    except Exception as e:
+        print(f"[-] [Init] 云端基准加载逻辑跳过: {e}")
+
+    if args.backfill:
+        run_backfill(args.backfill[0], args.backfill[1], s3_client, workers=args.workers, restart=args.restart)
+    else:
+        process_date(target_date, s3_client, publish_latest=(target_date == get_target_date_str()))
 
-    time.sleep(10)
     # unload_model() # Removed
+    web_searcher.close()
+    llm_cache.evict()
+    web_searcher.cache.evict()
+    print(f"[-] [Cache] 检索缓存{web_searcher.cache.stats()}")
+    print(f"[-] [Cache] LLM 缓存{llm_cache.stats()}")
+    print(f"[-] [Rate Limit] 共消耗 {rate_limiter.total_tokens} tokens，限流等待 {rate_limiter.total_wait:.1f} 秒")
     print("\n[√] 日报任务处理完毕。")
 
 if __name__ == "__main__":
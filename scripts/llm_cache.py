@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# --- LLM 响应缓存 (内容寻址) ---
+# 键 = hash(模型, system prompt, prompt, 生成参数)，本地磁盘 + R2 两级存储，
+# 同一日期重跑（崩溃恢复、重新上传、clean_tver 清理后）直接命中，不再消耗配额
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(SCRIPT_DIR, "llm_cache")
+R2_CACHE_PREFIX = "cache/llm/"
+DEFAULT_TTL = 14 * 24 * 3600
+MAX_LOCAL_ENTRIES = 2000
+
+
+def make_key(model, system, prompt, config=None):
+    payload = json.dumps(
+        {"model": model, "system": system or "", "prompt": prompt, "config": config or {}},
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, enabled=True, r2_prefix=R2_CACHE_PREFIX):
+        self.cache_dir = cache_dir
+        self.r2_prefix = r2_prefix
+        self.ttl = ttl
+        self.enabled = enabled
+        self.client = None
+        self.bucket = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def attach_r2(self, client, bucket):
+        self.client = client
+        self.bucket = bucket
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _fresh(self, entry):
+        return entry and time.time() - entry.get("created_at", 0) < self.ttl
+
+    def _read_local(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def _write_local(self, key, entry):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _read_r2(self, key):
+        if not self.client:
+            return None
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=f"{self.r2_prefix}{key}.json")
+            return json.loads(obj['Body'].read().decode('utf-8'))
+        except Exception:
+            return None
+
+    def _write_r2(self, key, entry):
+        if not self.client:
+            return
+        try:
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=f"{self.r2_prefix}{key}.json",
+                Body=json.dumps(entry, ensure_ascii=False).encode('utf-8'),
+                ContentType='application/json'
+            )
+        except Exception as e:
+            print(f"[!] [Cache] R2 写入失败: {e}")
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        entry = self._read_local(key)
+        if not self._fresh(entry):
+            entry = self._read_r2(key)
+            if self._fresh(entry):
+                self._write_local(key, entry)
+            else:
+                entry = None
+        with self._lock:
+            if entry:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry["response"] if entry else None
+
+    def put(self, key, response, model=""):
+        if not self.enabled or response is None:
+            return
+        entry = {"created_at": int(time.time()), "model": model, "response": response}
+        self._write_local(key, entry)
+        self._write_r2(key, entry)
+
+    def evict(self):
+        """清理过期条目；本地超出上限时按修改时间淘汰最旧的"""
+        removed = 0
+        now = time.time()
+        if os.path.isdir(self.cache_dir):
+            files = []
+            for root, _, names in os.walk(self.cache_dir):
+                for name in names:
+                    path = os.path.join(root, name)
+                    files.append((os.path.getmtime(path), path))
+            files.sort(reverse=True)
+            for i, (mtime, path) in enumerate(files):
+                if i >= MAX_LOCAL_ENTRIES or now - mtime >= self.ttl:
+                    os.remove(path)
+                    removed += 1
+
+        if self.client:
+            try:
+                paginator = self.client.get_paginator('list_objects_v2')
+                for page in paginator.paginate(Bucket=self.bucket, Prefix=self.r2_prefix):
+                    expired = [
+                        {"Key": obj["Key"]} for obj in page.get("Contents", [])
+                        if now - obj["LastModified"].timestamp() >= self.ttl
+                    ]
+                    if expired:
+                        self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": expired})
+                        removed += len(expired)
+            except Exception as e:
+                print(f"[!] [Cache] R2 过期清理失败: {e}")
+        return removed
+
+    def stats(self):
+        return f"命中 {self.hits} 次，未命中 {self.misses} 次"
@@ -0,0 +1,353 @@
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import daily_digest
+
+# 复用根目录的模块（json_stream、main 中的判定规则）
+if daily_digest.project_root not in sys.path:
+    sys.path.insert(0, daily_digest.project_root)
+from json_stream import ArrayWriter, iter_array
+from archive_stats import ArchiveStats, file_stats, STATS_R2_KEY
+from archive_postings import PostingsIndex, file_postings, STATE_R2_KEY as POSTINGS_STATE_R2_KEY, R2_PREFIX as POSTINGS_R2_PREFIX
+from immutable_publish import ImmutablePublisher
+from day_segments import compact_pending, pending_dates
+
+# --- R2 批量改写引擎 ---
+# 用 list_objects_v2 枚举对象，并发下载、套用可插拔的规则，只回传内容有变化的对象
+# 日存档有未合并的分段（day_segments.py）时先合并回日文件再改写，否则之后的合并会用分段里的旧版本覆盖改写结果
+# 日存档 archive/<日期>.json 改写后，同步刷新这些日期的 archive/index.json 条数、每日统计和二级索引
+# 被改写的对象若已收录在 manifest.json（immutable_publish.py）中，同时发布新的不可变版本
+# 用法: python scripts/r2_rewrite.py tver false_positive [--since 2025-01-01] [--dry-run]
+
+MAX_WORKERS = 16
+# 预览模式下每个对象最多打印的差异条数
+DIFF_PREVIEW = 5
+
+ARCHIVE_PREFIX = "archive/"
+ARCHIVE_KEY_RE = re.compile(r'(\d{4}-\d{2}-\d{2})\.json')
+SUMMARY_KEY_RE = re.compile(r'(\d{4}-\d{2}-\d{2})_summary\.json')
+
+
+class Rewrite:
+    """
+    一条改写规则
+    prefix: 列举的对象前缀；key_re: 需匹配的键（第一个分组为日期）
+    transform(data) -> 新数据，返回原对象或相等的数据视为未变化
+    由 filter_items / map_items 生成的逐条规则可以流式处理，不必把整个对象读入内存
+    """
+
+    def __init__(self, name, prefix, key_re, transform):
+        self.name = name
+        self.prefix = prefix
+        self.key_re = key_re
+        self.transform = transform
+
+    def date_of(self, key):
+        match = self.key_re.fullmatch(key[len(self.prefix):])
+        return match.group(1) if match else None
+
+
+def filter_items(predicate):
+    """存档列表：丢弃 predicate(item) 为真的条目"""
+    return _per_item(lambda item: None if predicate(item) else item)
+
+
+def filter_highlights(predicate):
+    """每日摘要：丢弃 key_highlights 中 predicate(h) 为真的条目"""
+    def transform(data):
+        if not isinstance(data, dict) or 'key_highlights' not in data:
+            return data
+        return dict(data, key_highlights=[h for h in data['key_highlights'] if not predicate(h)])
+    return transform
+
+
+def map_items(func):
+    """存档列表：逐条改写，func 返回新的条目"""
+    return _per_item(func)
+
+
+def _per_item(op):
+    """op(item) -> 新条目，返回 None 表示删除；op 本身保留在 transform.item_op 上供流式处理使用"""
+    def transform(data):
+        if not isinstance(data, list):
+            return data
+        return [new for new in map(op, data) if new is not None]
+    transform.item_op = op
+    return transform
+
+
+def _is_tver(item):
+    return any("TVer" in (item.get(field) or '') for field in ('origin', 'title', 'title_cn'))
+
+
+def _main_module():
+    """规则复用 main.py 的判定逻辑，按需导入"""
+    import main
+    return main
+
+
+def _false_positive(item):
+    title_ja = item.get('title_ja') or item.get('original_title') or item.get('title') or ""
+    return _main_module().is_false_positive(title_ja, item.get('origin') or "")
+
+
+def _reclassify(item):
+    category = _main_module().classify_news(item.get('title') or "")
+    return item if item.get('category') == category else dict(item, category=category)
+
+
+def build_rules():
+    source = daily_digest.R2_SOURCE_PREFIX
+    target = daily_digest.R2_TARGET_PREFIX
+    return {
+        "tver": [
+            Rewrite("tver", source, ARCHIVE_KEY_RE, filter_items(_is_tver)),
+            Rewrite("tver", target, SUMMARY_KEY_RE, filter_highlights(_is_tver)),
+        ],
+        "false_positive": [
+            Rewrite("false_positive", source, ARCHIVE_KEY_RE, filter_items(_false_positive)),
+        ],
+        "reclassify": [
+            Rewrite("reclassify", source, ARCHIVE_KEY_RE, map_items(_reclassify)),
+        ],
+    }
+
+
+def list_keys(client, prefix):
+    paginator = client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=daily_digest.R2_BUCKET_NAME, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            yield obj['Key']
+
+
+def describe_diff(old, new):
+    """返回 (被删除条目的标题, 被修改的条目数)"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        old, new = old.get('key_highlights', []), new.get('key_highlights', [])
+    if not isinstance(old, list) or not isinstance(new, list):
+        return [], 0
+    remaining = {json.dumps(item, sort_keys=True, ensure_ascii=False) for item in new}
+    kept_links = {item.get('link') for item in new if isinstance(item, dict)}
+    removed, modified = [], 0
+    for item in old:
+        if json.dumps(item, sort_keys=True, ensure_ascii=False) in remaining:
+            continue
+        if isinstance(item, dict) and item.get('link') in kept_links:
+            modified += 1
+        else:
+            removed.append(item.get('title', '') if isinstance(item, dict) else str(item))
+    return removed, modified
+
+
+def rewrite_object(client, key, rewrites, dry_run):
+    """下载一个对象，依次套用规则；返回 (是否变化, 删除条目, 修改条数)"""
+    obj = client.get_object(Bucket=daily_digest.R2_BUCKET_NAME, Key=key)
+    item_ops = [getattr(rewrite.transform, 'item_op', None) for rewrite in rewrites]
+    if all(item_ops):
+        return stream_rewrite_object(client, key, obj['Body'], item_ops, dry_run)
+
+    original = json.loads(obj['Body'].read().decode('utf-8'))
+    data = original
+    for rewrite in rewrites:
+        data = rewrite.transform(data)
+    if data == original:
+        return False, [], 0
+    removed, modified = describe_diff(original, data)
+    if not dry_run:
+        daily_digest.upload_json_to_r2(client, json.dumps(data, ensure_ascii=False, indent=2), key)
+    return True, removed, modified
+
+
+def stream_rewrite_object(client, key, body, item_ops, dry_run):
+    """顶层数组逐条读取、逐条写入临时文件，有变化时再从文件上传"""
+    removed, modified = [], 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "rewrite.json")
+        with ArrayWriter(path) as writer:
+            for item in iter_array(body):
+                new = item
+                for op in item_ops:
+                    new = op(new)
+                    if new is None:
+                        break
+                if new is None:
+                    removed.append(item.get('title', '') if isinstance(item, dict) else str(item))
+                    continue
+                if new != item:
+                    modified += 1
+                writer.write(new)
+            if not removed and not modified:
+                writer.discard()
+        if not removed and not modified:
+            return False, [], 0
+        if not dry_run:
+            print(f"[-] 正在上传到 R2: {key} ...")
+            with open(path, 'rb') as f:
+                client.put_object(Bucket=daily_digest.R2_BUCKET_NAME, Key=key, Body=f, ContentType='application/json')
+    return True, removed, modified
+
+
+def refresh_archive_indexes(client, dates):
+    """
+    重新统计被改写日期的条数、每日统计和媒体 / 分类二级索引并上传（与 main.py 每小时更新的内容相同）
+    以 R2 上改写后的日存档为准；下载失败的日期跳过，留给 main.py 按条数不一致补齐
+    """
+    main = _main_module()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_path = os.path.join(tmp_dir, "index.json")
+        stats_path = os.path.join(tmp_dir, "stats.json")
+        postings_path = os.path.join(tmp_dir, "postings_state.json")
+        postings_dir = os.path.join(tmp_dir, "postings")
+        main.download_file_from_r2(client, "archive/index.json", index_path)
+        main.download_file_from_r2(client, STATS_R2_KEY, stats_path)
+        main.download_file_from_r2(client, POSTINGS_STATE_R2_KEY, postings_path)
+
+        archive_index = {}
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                archive_index = json.load(f)
+        stats = ArchiveStats()
+        stats.load(stats_path)
+        postings = PostingsIndex()
+        postings.load(postings_path)
+
+        refreshed = []
+        for date_str in sorted(dates):
+            path = os.path.join(tmp_dir, f"{date_str}.json")
+            if not main.download_file_from_r2(client, f"{ARCHIVE_PREFIX}{date_str}.json", path):
+                continue
+            day = file_stats(path)
+            archive_index[date_str] = day["count"]
+            stats.update(date_str, day)
+            postings.update(date_str, file_postings(path))
+            refreshed.append(date_str)
+        if not refreshed:
+            return []
+
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(archive_index, f, ensure_ascii=False, indent=2)
+        main.upload_to_r2(client, index_path, "archive/index.json")
+        if stats.changed:
+            stats.save(stats_path)
+            main.upload_to_r2(client, stats_path, STATS_R2_KEY)
+
+        written, removed = postings.write(postings_dir)
+        postings.save(postings_path)
+        for rel in written:
+            main.upload_to_r2(client, os.path.join(postings_dir, rel), f"{POSTINGS_R2_PREFIX}{rel}")
+        if removed:
+            client.delete_objects(
+                Bucket=main.R2_BUCKET_NAME,
+                Delete={"Objects": [{"Key": f"{POSTINGS_R2_PREFIX}{rel}"} for rel in removed], "Quiet": True}
+            )
+        main.upload_to_r2(client, postings_path, POSTINGS_STATE_R2_KEY)
+    print(f"[*] Refreshed index / stats / postings for {len(refreshed)} dates")
+    return refreshed
+
+
+def republish_immutable(client, keys):
+    """manifest 收录的固定 key 被改写后，发布新内容的不可变版本并更新 manifest，否则 manifest 仍指向旧内容"""
+    publisher = ImmutablePublisher(client, daily_digest.R2_BUCKET_NAME)
+    publisher.load()
+    tracked = sorted(key for key in keys if key in publisher.files)
+    for key in tracked:
+        body = client.get_object(Bucket=daily_digest.R2_BUCKET_NAME, Key=key)['Body'].read()
+        publisher.publish(key, body)
+    if publisher.commit():
+        print(f"[*] Republished {publisher.uploaded} immutable objects and updated manifest")
+    return tracked
+
+
+def run_rewrites(rewrites, since=None, until=None, dry_run=False, max_workers=MAX_WORKERS):
+    client = daily_digest.get_r2_client()
+    if not client:
+        print("[!] No R2 client available. Cannot rewrite cloud archives.")
+        return None
+
+    if any(r.key_re is ARCHIVE_KEY_RE for r in rewrites):
+        source = daily_digest.R2_SOURCE_PREFIX
+        if dry_run:
+            pending = [d for d in pending_dates(client, daily_digest.R2_BUCKET_NAME)
+                       if not (since and d < since) and not (until and d > until)]
+            if pending:
+                print(f"[*] [DRY RUN] Segmented dates will be compacted before rewriting: {', '.join(pending)}")
+        else:
+            compact_pending(client, daily_digest.R2_BUCKET_NAME, since, until, day_prefix=source)
+
+    # 同一个对象上的多条规则合并为一次下载 / 上传
+    plan = {}
+    for prefix in dict.fromkeys(r.prefix for r in rewrites):
+        for key in list_keys(client, prefix):
+            for rewrite in rewrites:
+                if rewrite.prefix != prefix:
+                    continue
+                date_str = rewrite.date_of(key)
+                if not date_str or (since and date_str < since) or (until and date_str > until):
+                    continue
+                plan.setdefault(key, []).append(rewrite)
+
+    mode = "DRY RUN" if dry_run else "APPLY"
+    print(f"[*] [{mode}] {len(plan)} objects matched rules: {', '.join(dict.fromkeys(r.name for r in rewrites))}")
+
+    stats = {"checked": 0, "changed": 0, "removed": 0, "modified": 0, "errors": 0}
+    changed_archive_dates = set()
+    changed_keys = set()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(rewrite_object, client, key, rules, dry_run): key for key, rules in plan.items()}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                changed, removed, modified = future.result()
+            except Exception as e:
+                print(f"    [!] Error processing {key}: {e}")
+                stats["errors"] += 1
+                continue
+            stats["checked"] += 1
+            if not changed:
+                continue
+            stats["changed"] += 1
+            changed_keys.add(key)
+            if plan[key][0].prefix == ARCHIVE_PREFIX and ARCHIVE_KEY_RE.fullmatch(key[len(ARCHIVE_PREFIX):]):
+                changed_archive_dates.add(plan[key][0].date_of(key))
+            stats["removed"] += len(removed)
+            stats["modified"] += modified
+            print(f"    [!] {key}: -{len(removed)} items, ~{modified} modified")
+            for title in removed[:DIFF_PREVIEW]:
+                print(f"        - {title}")
+            if len(removed) > DIFF_PREVIEW:
+                print(f"        ... {len(removed) - DIFF_PREVIEW} more")
+
+    print(f"[*] [{mode}] checked {stats['checked']}, changed {stats['changed']} "
+          f"(removed {stats['removed']}, modified {stats['modified']}), errors {stats['errors']}")
+    if dry_run or not changed_keys:
+        return stats
+    if changed_archive_dates and refresh_archive_indexes(client, changed_archive_dates):
+        changed_keys.update(("archive/index.json", STATS_R2_KEY))
+    republish_immutable(client, changed_keys)
+    return stats
+
+
+def days_ago(days):
+    return (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+
+
+if __name__ == "__main__":
+    rules = build_rules()
+    parser = argparse.ArgumentParser(description="Bulk-rewrite JSON objects in R2 with pluggable rules")
+    parser.add_argument("rules", nargs="+", choices=sorted(rules), help="rules to apply")
+    parser.add_argument("--since", help="only dates >= YYYY-MM-DD")
+    parser.add_argument("--until", help="only dates <= YYYY-MM-DD")
+    parser.add_argument("--days", type=int, help="only the last N days (overrides --since)")
+    parser.add_argument("--dry-run", action="store_true", help="report diffs without uploading")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    selected = [rewrite for name in args.rules for rewrite in rules[name]]
+    since = days_ago(args.days) if args.days is not None else args.since
+    run_rewrites(selected, since=since, until=args.until, dry_run=args.dry_run, max_workers=args.workers)
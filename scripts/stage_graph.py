@@ -0,0 +1,115 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# --- 日报阶段依赖图执行器 ---
+# 每个阶段声明依赖，依赖就绪即提交到线程池；互不依赖的 LLM 调用并发执行，
+# 总耗时取决于关键路径。阶段超时或异常时使用 fallback，下游照常执行。
+# 线程无法强制中止：超时后置位该阶段的取消事件，阶段内的 LLM 调用在调用前 / 限流等待中
+# 通过 check_cancelled() / current_cancel() 检查并退出，不再消耗配额。
+
+_local = threading.local()
+
+
+class StageCancelled(Exception):
+    """所在阶段已超时并使用了降级结果"""
+
+
+def current_cancel():
+    """当前线程所执行阶段的取消事件；不在阶段中执行时为 None"""
+    return getattr(_local, "cancel", None)
+
+
+def check_cancelled():
+    cancel = current_cancel()
+    if cancel is not None and cancel.is_set():
+        raise StageCancelled()
+
+
+def _run(func, cancel, kwargs):
+    _local.cancel = cancel
+    try:
+        return func(**kwargs)
+    finally:
+        _local.cancel = None
+
+
+class Stage:
+    def __init__(self, name, func, deps=(), timeout=None, fallback=None):
+        """
+        func 以依赖阶段的结果作为关键字参数调用: func(**{dep: result})
+        fallback 可以是值，也可以是无参函数
+        """
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.fallback = fallback
+
+    def fallback_value(self):
+        return self.fallback() if callable(self.fallback) else self.fallback
+
+
+def run_stages(stages, max_workers=4):
+    """
+    执行阶段图，返回 (results, report)
+    report: {阶段名: {"status": ok|timeout|error, "seconds": 耗时}}
+    """
+    by_name = {s.name: s for s in stages}
+    for stage in stages:
+        missing = [d for d in stage.deps if d not in by_name]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {missing}")
+
+    results = {}
+    report = {}
+    running = {}  # future -> (stage, 开始时间, 取消事件)
+    pending = list(stages)
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while pending or running:
+            # 1. 提交所有依赖已就绪的阶段
+            for stage in [s for s in pending if all(d in results for d in s.deps)]:
+                pending.remove(stage)
+                kwargs = {d: results[d] for d in stage.deps}
+                cancel = threading.Event()
+                running[pool.submit(_run, stage.func, cancel, kwargs)] = (stage, time.monotonic(), cancel)
+
+            if not running:
+                raise ValueError(f"Stage graph has a cycle: {[s.name for s in pending]}")
+
+            # 2. 等待任一阶段完成或最近的截止时间到达
+            now = time.monotonic()
+            deadlines = [start + st.timeout - now for st, start, _ in running.values() if st.timeout]
+            done, _ = wait(list(running), timeout=max(0, min(deadlines)) if deadlines else None,
+                           return_when=FIRST_COMPLETED)
+
+            now = time.monotonic()
+            for future in list(running):
+                stage, start, cancel = running[future]
+                elapsed = now - start
+                if future in done:
+                    try:
+                        results[stage.name] = future.result()
+                        report[stage.name] = {"status": "ok", "seconds": round(elapsed, 2)}
+                    except Exception as e:
+                        print(f"[!] [Stage] {stage.name} 失败，使用降级结果: {e}")
+                        results[stage.name] = stage.fallback_value()
+                        report[stage.name] = {"status": "error", "seconds": round(elapsed, 2)}
+                elif stage.timeout and elapsed >= stage.timeout:
+                    # 线程无法强制中止：通知阶段在下一次 LLM 调用前退出，其结果将被忽略
+                    print(f"[!] [Stage] {stage.name} 超时 ({stage.timeout}s)，使用降级结果")
+                    cancel.set()
+                    future.cancel()
+                    results[stage.name] = stage.fallback_value()
+                    report[stage.name] = {"status": "timeout", "seconds": round(elapsed, 2)}
+                else:
+                    continue
+                del running[future]
+    finally:
+        for _, _, cancel in running.values():
+            cancel.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return results, report
@@ -1,8 +1,20 @@
 import os
+import sys
 import urllib.request
+import urllib.error
 import json
-import time
+import shutil
 import ssl
+import argparse
+import threading
+import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from day_segments import manifest_key as segment_manifest_key, merge_items
 
 # Bypass SSL verification if needed (for some local envs)
 ssl._create_default_https_context = ssl._create_unverified_context
@@ -10,51 +22,253 @@ ssl._create_default_https_context = ssl._create_unverified_context
 R2_PUBLIC_URL = "https://pub-cf7a92abc9c3455da9ccb7cea39a6cda.r2.dev"
 PUBLIC_DIR = os.path.join(os.getcwd(), "public")
 ARCHIVE_DIR = os.path.join(PUBLIC_DIR, "archive")
+# 记录每个文件的 ETag / Last-Modified，用于条件请求和中断后续传
+STATE_FILE = os.path.join(os.getcwd(), "cache", "r2_sync_state.json")
+MAX_WORKERS = 8
+JST = datetime.timezone(datetime.timedelta(hours=9))
 
 os.makedirs(ARCHIVE_DIR, exist_ok=True)
 
-def download_file(url_path, local_path):
-    url = f"{R2_PUBLIC_URL}/{url_path}?t={int(time.time())}"
-    print(f"Downloading {url} -> {local_path} ...")
+
+class SyncState:
+    """url_path -> {"etag", "last_modified"}，每个文件下载完成后立即落盘"""
+
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                print(f"⚠️ Sync state unreadable, starting fresh: {e}")
+
+    def get(self, url_path):
+        with self._lock:
+            return dict(self.entries.get(url_path, {}))
+
+    def set(self, url_path, etag, last_modified, key=None):
+        with self._lock:
+            self.entries[url_path] = {"etag": etag, "last_modified": last_modified}
+            if key:
+                self.entries[url_path]["key"] = key
+            write_atomic(self.path, json.dumps(self.entries, indent=2).encode("utf-8"))
+
+
+def write_atomic(local_path, content):
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    tmp_path = f"{local_path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, local_path)
+
+
+def fetch(url_path, validators=None, dest=None):
+    """
+    条件 GET：返回 (状态, 内容, 响应头)
+    状态为 "ok" / "not_modified" / "not_found" / "error"
+    指定 dest 时响应体分块流式写入 dest（原子替换），内容返回字节数
+    """
+    url = f"{R2_PUBLIC_URL}/{url_path}"
+    headers = {"Cache-Control": "no-cache"}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    request = urllib.request.Request(url, headers=headers)
     try:
-        with urllib.request.urlopen(url, timeout=10) as response:
-            if response.status == 200:
-                content = response.read()
-                with open(local_path, "wb") as f:
-                    f.write(content)
-                return True
-            else:
-                print(f"⚠️ Failed to download {url_path}: Status {response.status}")
-                return False
+        with urllib.request.urlopen(request, timeout=10) as response:
+            if dest is None:
+                return "ok", response.read(), response.headers
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            tmp_path = f"{dest}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    shutil.copyfileobj(response, f, 64 * 1024)
+                os.replace(tmp_path, dest)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            return "ok", os.path.getsize(dest), response.headers
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return "not_modified", None, e.headers
+        if e.code == 404:
+            return "not_found", None, None
+        print(f"⚠️ Failed to download {url_path}: Status {e.code}")
     except Exception as e:
         print(f"❌ Error downloading {url_path}: {e}")
-        return False
+    return "error", None, None
+
+
+def download_file(url_path, local_path, state, manifest=None):
+    """
+    manifest 收录的文件按内容哈希对象 key 判断是否变化，未变化时不发请求
+    其余文件本地存在时带上 ETag / Last-Modified，未变化则跳过写入
+    """
+    object_key = (manifest or {}).get(url_path)
+    if object_key:
+        if os.path.exists(local_path) and state.get(url_path).get("key") == object_key:
+            print(f"✔️ {url_path} unchanged")
+            return "not_modified"
+        status, size, headers = fetch(object_key, dest=local_path)
+        if status == "ok":
+            state.set(url_path, headers.get("ETag"), headers.get("Last-Modified"), key=object_key)
+            print(f"⬇️ {url_path} ({size} bytes)")
+        return status
+    validators = state.get(url_path) if os.path.exists(local_path) else None
+    status, size, headers = fetch(url_path, validators, dest=local_path)
+    if status == "ok":
+        state.set(url_path, headers.get("ETag"), headers.get("Last-Modified"))
+        print(f"⬇️ {url_path} ({size} bytes)")
+    elif status == "not_modified":
+        print(f"✔️ {url_path} unchanged")
+    elif status == "not_found":
+        print(f"⚠️ {url_path} not found")
+    return status
+
+
+def fetch_json(url_path):
+    """返回 (状态, 解析后的 JSON)；内容无法解析时视为 error"""
+    status, content, _ = fetch(url_path)
+    if status != "ok":
+        return status, None
+    try:
+        return status, json.loads(content.decode("utf-8"))
+    except Exception as e:
+        print(f"❌ Error parsing {url_path}: {e}")
+        return "error", None
+
+
+def download_segmented_day(date_str, local_path, state, manifest=None):
+    """
+    当天（及尚未合并的前一天）的存档是 日文件 + 分段（见 day_segments.py），固定 key 上可能还没有日文件
+    有分段时下载日文件和各分段，按 merge_items 在本地合并；没有分段时按普通文件下载
+    """
+    url_path = f"archive/{date_str}.json"
+    status, segments = fetch_json(segment_manifest_key(date_str))
+    if status == "error":
+        return "error"
+    if not segments or not segments.get("segments"):
+        return download_file(url_path, local_path, state, manifest)
+
+    object_key = (manifest or {}).get(url_path)
+    status, base = fetch_json(object_key or url_path)
+    if status == "error":
+        return "error"
+    parts = []
+    for seg in segments["segments"]:
+        status, items = fetch_json(seg["key"])
+        if status != "ok":
+            return "error"
+        parts.append(items)
+    merged = merge_items(base or [], parts)
+    write_atomic(local_path, json.dumps(merged, ensure_ascii=False, indent=2).encode("utf-8"))
+    # 合并结果没有对应的 ETag，记录最后一个分段的 key；下次是否同步由条数决定
+    state.set(url_path, None, None, key=segments["segments"][-1]["key"])
+    print(f"⬇️ {url_path} ({len(merged)} items, base + {len(parts)} segments)")
+    return "ok"
+
+
+def download_archive_day(date_str, state, manifest=None, segmented_since=None):
+    local_path = os.path.join(ARCHIVE_DIR, f"{date_str}.json")
+    if segmented_since and date_str >= segmented_since:
+        return download_segmented_day(date_str, local_path, state, manifest)
+    return download_file(f"archive/{date_str}.json", local_path, state, manifest)
+
+
+def load_local_index():
+    path = os.path.join(ARCHIVE_DIR, "index.json")
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def changed_dates(remote_index, local_index, state, verify=False, manifest=None):
+    """
+    条数不同、本地缺失、上次未下载完成或 manifest 中版本已变化的日期需要同步
+    verify=True 时对所有日期发条件请求，由服务端判断是否变化
+    """
+    manifest = manifest or {}
+    dates = []
+    for date_str, count in remote_index.items():
+        url_path = f"archive/{date_str}.json"
+        local_path = os.path.join(ARCHIVE_DIR, f"{date_str}.json")
+        object_key = manifest.get(url_path)
+        if (verify or local_index.get(date_str) != count
+                or not os.path.exists(local_path) or not state.get(url_path)
+                or (object_key and state.get(url_path).get("key") != object_key)):
+            dates.append(date_str)
+    return dates
+
+
+def load_manifest():
+    """内容哈希发布的 manifest.json：{逻辑路径: 不可变对象 key}，不存在时返回空"""
+    status, content, _ = fetch("manifest.json")
+    if status != "ok":
+        return {}
+    try:
+        return json.loads(content.decode("utf-8")).get("files", {})
+    except Exception as e:
+        print(f"⚠️ Manifest unreadable, falling back to fixed keys: {e}")
+        return {}
+
+
+def sync(max_workers=MAX_WORKERS, verify=False):
+    state = SyncState()
+    manifest = load_manifest()
 
-def sync():
     # 1. Download data.json
-    download_file("data.json", os.path.join(PUBLIC_DIR, "data.json"))
-    
+    download_file("data.json", os.path.join(PUBLIC_DIR, "data.json"), state, manifest)
+
     # 2. Download live_data.json
-    download_file("live_data.json", os.path.join(PUBLIC_DIR, "live_data.json"))
-
-    # 3. Download archive/index.json
-    index_success = download_file("archive/index.json", os.path.join(ARCHIVE_DIR, "index.json"))
-
-    # 4. Download all archives in index
-    if index_success:
-        try:
-            with open(os.path.join(ARCHIVE_DIR, "index.json"), "r", encoding="utf-8") as f:
-                index_data = json.load(f)
-            
-            dates = list(index_data.keys())
-            print(f"Found {len(dates)} archive dates in index.")
-            
-            for date_str in dates:
-                filename = f"{date_str}.json"
-                download_file(f"archive/{filename}", os.path.join(ARCHIVE_DIR, filename))
-                
-        except Exception as e:
-            print(f"❌ Error processing index: {e}")
+    download_file("live_data.json", os.path.join(PUBLIC_DIR, "live_data.json"), state)
+
+    # 3. 每日统计 archive/stats.json（可选，旧数据源可能没有）
+    download_file("archive/stats.json", os.path.join(ARCHIVE_DIR, "stats.json"), state, manifest)
+
+    # 4. Fetch archive/index.json（先只放在内存里，全部日期同步成功后再写入本地）
+    index_key = manifest.get("archive/index.json")
+    status, content, headers = fetch(index_key or "archive/index.json")
+    if status != "ok":
+        return
+    try:
+        remote_index = json.loads(content.decode("utf-8"))
+    except Exception as e:
+        print(f"❌ Error processing index: {e}")
+        return
+
+    # 5. Download changed archives concurrently
+    local_index = load_local_index()
+    dates = changed_dates(remote_index, local_index, state, verify, manifest)
+    print(f"Found {len(remote_index)} archive dates in index, {len(dates)} to sync.")
+
+    # 只有最近两天（JST）可能存在未合并的分段
+    segmented_since = (datetime.datetime.now(JST) - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(download_archive_day, d, state, manifest, segmented_since): d for d in dates}
+        for future in as_completed(futures):
+            if future.result() in ("error", "not_found"):
+                failed.append(futures[future])
+
+    if failed:
+        # 不更新本地 index.json，下次运行会重试这些日期
+        print(f"⚠️ {len(failed)} dates failed, rerun to resume: {', '.join(sorted(failed))}")
+        return
+    write_atomic(os.path.join(ARCHIVE_DIR, "index.json"), content)
+    state.set("archive/index.json", headers.get("ETag"), headers.get("Last-Modified"), key=index_key)
+    print("✅ Sync complete.")
 
 if __name__ == "__main__":
-    sync()
+    parser = argparse.ArgumentParser(description="Mirror public R2 data into ./public")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="concurrent downloads")
+    parser.add_argument("--verify", action="store_true", help="revalidate every archive date with conditional requests")
+    args = parser.parse_args()
+    sync(max_workers=args.workers, verify=args.verify)
@@ -0,0 +1,113 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+# --- 标题本地预排序 ---
+# 在调用 LLM 前对当日标题做抽取式排序：TF-IDF 显著度 + 报道媒体数 + 时效性，
+# 近似重复的标题聚为一簇，只把每簇的代表标题送给模型
+
+_CJK_RUN_RE = re.compile(r'[一-鿿぀-ヿ]+')
+_WORD_RE = re.compile(r'[A-Za-z][A-Za-z0-9\-]+|\d{2,}')
+# 标题末尾的 "(来源)" / " - 媒体名" 等不参与相似度计算
+_SUFFIX_RE = re.compile(r'(\s+-\s+[^-]+$)|([（(][^（()）]*[)）]\s*$)')
+
+SIMILARITY_THRESHOLD = 0.5
+RECENCY_HALF_LIFE = 12 * 3600
+WEIGHT_SALIENCE = 1.0
+WEIGHT_COVERAGE = 0.6
+WEIGHT_RECENCY = 0.3
+
+
+def strip_source_suffix(title):
+    """去掉标题末尾的媒体名后缀，如 "（共同社） - 雅虎！消息" """
+    title = (title or '').strip()
+    for _ in range(2):
+        title = _SUFFIX_RE.sub('', title).strip()
+    return title
+
+
+def title_terms(title):
+    """中日文按字二元组切分，英文 / 数字按词切分（无需分词库）"""
+    title = strip_source_suffix(title)
+    terms = []
+    for run in _CJK_RUN_RE.findall(title):
+        if len(run) == 1:
+            terms.append(run)
+        terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    terms.extend(w.lower() for w in _WORD_RE.findall(title))
+    return terms
+
+
+def _jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def cluster_titles(term_sets, threshold=SIMILARITY_THRESHOLD):
+    """
+    贪心聚类：按输入顺序，每条标题并入第一个足够相似的簇
+    用倒排索引只比较共享词项的簇首，避免全量两两比较
+    返回 簇列表 [[下标, ...], ...]
+    """
+    clusters = []
+    leaders = []  # 簇首的词项集合
+    postings = defaultdict(set)  # 词项 -> 簇编号
+    for idx, terms in enumerate(term_sets):
+        candidates = set()
+        for term in terms:
+            candidates |= postings[term]
+        best, best_sim = None, threshold
+        for c in candidates:
+            sim = _jaccard(terms, leaders[c])
+            if sim >= best_sim:
+                best, best_sim = c, sim
+        if best is None:
+            best = len(clusters)
+            clusters.append([])
+            leaders.append(terms)
+            for term in terms:
+                postings[term].add(best)
+        clusters[best].append(idx)
+    return clusters
+
+
+def rank_items(items, title_key, origin_key='origin', ts_key='timestamp'):
+    """
+    对条目排序并去重，返回 [(代表条目下标, 簇内下标列表, 媒体数, 分数), ...]，按分数降序
+    """
+    if not items:
+        return []
+    docs = [title_terms(item.get(title_key, '')) for item in items]
+    term_sets = [set(d) for d in docs]
+
+    # TF-IDF 显著度：以当日全部标题为语料
+    n_docs = len(docs)
+    df = Counter(term for terms in term_sets for term in terms)
+    salience = []
+    for doc in docs:
+        if not doc:
+            salience.append(0.0)
+            continue
+        tf = Counter(doc)
+        weights = sorted((count * math.log(n_docs / df[t]) for t, count in tf.items()), reverse=True)
+        # 取权重最高的几个词项的均值，避免长标题占优
+        top = weights[:8]
+        salience.append(sum(top) / len(top))
+    max_salience = max(salience) or 1.0
+
+    latest = max((item.get(ts_key) or 0) for item in items)
+    ranked = []
+    for members in cluster_titles(term_sets):
+        rep = max(members, key=lambda i: (salience[i], items[i].get(ts_key) or 0))
+        outlets = len({items[i].get(origin_key) or '' for i in members})
+        newest = max((items[i].get(ts_key) or 0) for i in members)
+        recency = 0.5 ** ((latest - newest) / RECENCY_HALF_LIFE) if latest else 0.0
+        score = (
+            WEIGHT_SALIENCE * salience[rep] / max_salience
+            + WEIGHT_COVERAGE * math.log1p(outlets - 1)
+            + WEIGHT_RECENCY * recency
+        )
+        ranked.append((rep, members, outlets, score))
+    ranked.sort(key=lambda r: r[3], reverse=True)
+    return ranked
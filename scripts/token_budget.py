@@ -0,0 +1,115 @@
+import math
+import re
+import threading
+import time
+from collections import deque
+
+# --- Token 预算与限流 ---
+# 无需加载分词器：中日韩字符约 1 token/字，其余约 4 字符/token，
+# 对 Gemma/Gemini 的中文标题流估算偏保守
+
+_CJK_RE = re.compile(r'[぀-ヿ㐀-䶿一-鿿豈-﫿＀-￯]')
+
+
+def estimate_tokens(text):
+    if not text:
+        return 0
+    text = str(text)
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def pack_titles(titles, token_budget, line_overhead=2):
+    """
+    按顺序装入标题，直到达到 token 预算
+    line_overhead 为每行的 "- " 前缀和换行开销
+    """
+    packed = []
+    used = 0
+    for title in titles:
+        cost = estimate_tokens(title) + line_overhead
+        if used + cost > token_budget:
+            break
+        packed.append(title)
+        used += cost
+    return packed
+
+
+class TokenBucket:
+    """
+    按滑动 60 秒窗口统计实际 token 消耗 (TPM) 与请求数 (RPM)
+    acquire() 只在窗口额度不足时等待，调用结束后用 settle() 写入实际用量
+    """
+
+    WINDOW = 60.0
+    # 带取消事件等待时的检查间隔
+    CANCEL_POLL = 1.0
+
+    def __init__(self, tokens_per_minute, requests_per_minute=None):
+        self.tpm = tokens_per_minute
+        self.rpm = requests_per_minute
+        self._events = deque()  # [时间戳, token 数]
+        self._cond = threading.Condition()
+        self._blocked_until = 0.0
+        self.total_tokens = 0
+        self.total_wait = 0.0
+
+    def _expire(self, now):
+        while self._events and now - self._events[0][0] >= self.WINDOW:
+            self._events.popleft()
+
+    def _wait_time(self, tokens, now):
+        self._expire(now)
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        used = sum(e[1] for e in self._events)
+        over_tpm = used + tokens > self.tpm and self._events
+        over_rpm = self.rpm and len(self._events) >= self.rpm
+        if not over_tpm and not over_rpm:
+            return 0.0
+        # 逐个等待最早的记录滑出窗口，直到额度足够
+        freed = 0
+        for i, (ts, n) in enumerate(self._events):
+            freed += n
+            enough_tokens = used - freed + tokens <= self.tpm
+            enough_requests = not self.rpm or len(self._events) - (i + 1) < self.rpm
+            if enough_tokens and enough_requests:
+                return ts + self.WINDOW - now
+        return self._events[-1][0] + self.WINDOW - now
+
+    def acquire(self, tokens, cancel=None):
+        """
+        预占 tokens，返回用于 settle() 的记录
+        cancel (threading.Event) 在等待期间被置位时放弃预占，返回 None
+        """
+        tokens = min(tokens, self.tpm)
+        with self._cond:
+            announced = False
+            while True:
+                if cancel is not None and cancel.is_set():
+                    return None
+                now = time.monotonic()
+                wait = self._wait_time(tokens, now)
+                if wait <= 0:
+                    event = [now, tokens]
+                    self._events.append(event)
+                    return event
+                if not announced:
+                    print(f"[-] [Rate Limit] TPM 额度不足，等待 {wait:.1f} 秒...")
+                    announced = True
+                # settle() 释放额度时会提前唤醒，只累计实际等待的时间；可取消时分段等待以便及时退出
+                self._cond.wait(min(wait, self.CANCEL_POLL) if cancel is not None else wait)
+                self.total_wait += time.monotonic() - now
+
+    def settle(self, event, actual_tokens):
+        """用接口返回的实际用量替换预估值"""
+        with self._cond:
+            if actual_tokens:
+                event[1] = actual_tokens
+            self.total_tokens += event[1]
+            self._cond.notify_all()
+
+    def backoff(self, seconds):
+        """服务端返回限流错误时，暂停所有调用一段时间"""
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
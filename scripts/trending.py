@@ -0,0 +1,364 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from llm_cache import SCRIPT_DIR
+from title_ranking import strip_source_suffix
+
+# --- 本地热词引擎 ---
+# 每天只统计当天标题的 n-gram 文档频次（增量文件），
+# 与前 N 天的滚动基线做对数似然比 (G²) 比较，毫秒级给出 hot / rising 关键词
+
+TREND_COUNTS_DIR = os.path.join(SCRIPT_DIR, "trend_counts")
+TREND_COUNTS_R2_PREFIX = "cache/trends/"
+BASELINE_DAYS = 28
+NGRAM_SIZES = range(2, 9)
+# 增量文件只保存出现 >= 2 次的词项，控制体积
+MIN_STORED_COUNT = 2
+# 一个较长 n-gram 的频次达到其子串的该比例时，子串视为其片段而丢弃
+SUBSUME_RATIO = 0.7
+# 某词项左 / 右邻字中，单一字符占比超过该值时视为不完整的词（如 "西国际机场"）
+BOUNDARY_DOMINANCE = 0.75
+# 至少该比例的出现切在词中间时视为跨词片段（见 straddling_terms）
+BOUNDARY_CUT_RATIO = 0.5
+# 基线中缺失的日期（R2 上没有存档）记入负缓存，该时间内不再重复请求
+MISSING_FILE = os.path.join(TREND_COUNTS_DIR, "missing.json")
+MISSING_R2_KEY = f"{TREND_COUNTS_R2_PREFIX}missing.json"
+MISSING_RECHECK = 7 * 24 * 3600
+
+# 抓取查询词本身、媒体名及翻译腔虚词，不作为热词
+STOP_TERMS = {
+    "中国", "日本", "中方", "日方", "雅虎", "消息", "新闻", "报道", "表示", "认为", "可能", "问题",
+    "共同社", "时事通讯社", "每日新闻", "朝日新闻", "读卖新闻", "产经新闻", "日经", "电视台",
+    "什么", "如何", "为什么", "这个", "一个", "我们", "他们", "没有", "已经", "进行", "关于",
+}
+# 以虚词开头 / 结尾的 n-gram 多为跨词片段，如 "国的"、"在中"
+EDGE_CHARS_LEAD = set("的了在是和与将对为被把向从等及或也都就又之其这那")
+EDGE_CHARS_TRAIL = set("的了在是和与将对为被把向从及或也都就又之其这那")
+_CJK_RUN_RE = re.compile(r'[一-鿿぀-ヿ]+')
+_WORD_RE = re.compile(r'[A-Za-z][A-Za-z0-9\-]{1,}')
+
+
+def extract_terms(title):
+    """返回标题中的候选词项集合（按文档计数，同一标题内不重复）"""
+    title = strip_source_suffix(title)
+    terms = set()
+    for run in _CJK_RUN_RE.findall(title):
+        for n in NGRAM_SIZES:
+            for i in range(len(run) - n + 1):
+                terms.add(run[i:i + n])
+    terms = {
+        t for t in terms
+        if t[0] not in EDGE_CHARS_LEAD and t[-1] not in EDGE_CHARS_TRAIL and t not in STOP_TERMS
+        and not (len(t) <= 3 and ("中国" in t or "日本" in t))
+    }
+    terms.update(w for w in _WORD_RE.findall(title) if len(w) >= 2)
+    return terms
+
+
+def count_day(items):
+    """统计一天的词项文档频次，返回 (标题数, Counter)"""
+    counts = Counter()
+    docs = 0
+    for item in items:
+        title = (item.get('title_cn') or item.get('title') or "").strip()
+        if not title or "TVer" in (item.get('origin') or ""):
+            continue
+        docs += 1
+        counts.update(extract_terms(title))
+    return docs, counts
+
+
+def log_likelihood(a, n1, b, n2):
+    """Dunning 对数似然比：a/n1 为当天频次，b/n2 为基线频次"""
+    total = a + b
+    e1 = n1 * total / (n1 + n2)
+    e2 = n2 * total / (n1 + n2)
+    g2 = 0.0
+    if a > 0:
+        g2 += a * math.log(a / e1)
+    if b > 0:
+        g2 += b * math.log(b / e2)
+    return 2 * g2
+
+
+def incomplete_terms(items, terms):
+    """
+    邻接字分析：若词项几乎总是紧跟 / 紧接同一个字，说明它只是更长短语的片段
+    标题边界不计入单一邻字，视为多样
+    """
+    left = {t: Counter() for t in terms}
+    right = {t: Counter() for t in terms}
+    totals = Counter()
+    for item in items:
+        title = strip_source_suffix((item.get('title_cn') or item.get('title') or ""))
+        for run in _CJK_RUN_RE.findall(title):
+            for n in NGRAM_SIZES:
+                for i in range(len(run) - n + 1):
+                    term = run[i:i + n]
+                    if term not in left:
+                        continue
+                    totals[term] += 1
+                    if i > 0:
+                        left[term][run[i - 1]] += 1
+                    if i + n < len(run):
+                        right[term][run[i + n]] += 1
+    incomplete = set()
+    for term, total in totals.items():
+        for side in (left[term], right[term]):
+            if side and side.most_common(1)[0][1] / total >= BOUNDARY_DOMINANCE:
+                incomplete.add(term)
+                break
+    return incomplete
+
+
+def title_bigrams(items):
+    """当天标题中相邻两字的出现次数"""
+    bigrams = Counter()
+    for item in items:
+        title = strip_source_suffix((item.get('title_cn') or item.get('title') or ""))
+        for run in _CJK_RUN_RE.findall(title):
+            bigrams.update(run[i:i + 2] for i in range(len(run) - 1))
+    return bigrams
+
+
+def straddling_terms(items, terms, bigrams):
+    """
+    词边界检查：某次出现中，左邻字与首字组成的二字组比词项开头两字更常见（右侧同理），
+    说明词项在这里从一个词的中间切开，如 "国媒体"（中国 / 媒体）、"次致"（再次 / 致函）
+    bigrams 为二字组频次（当天标题 + 基线），多数出现都切在词中间的词项视为跨词片段
+    """
+    totals = Counter()
+    cuts = Counter()
+    terms = {t for t in terms if _CJK_RUN_RE.fullmatch(t)}
+    for item in items:
+        title = strip_source_suffix((item.get('title_cn') or item.get('title') or ""))
+        for run in _CJK_RUN_RE.findall(title):
+            for n in NGRAM_SIZES:
+                for i in range(len(run) - n + 1):
+                    term = run[i:i + n]
+                    if term not in terms:
+                        continue
+                    totals[term] += 1
+                    j = i + n
+                    if (i > 0 and bigrams[run[i - 1:i + 1]] > bigrams[term[:2]]) or \
+                            (j < len(run) and bigrams[run[j - 1:j + 1]] > bigrams[term[-2:]]):
+                        cuts[term] += 1
+    return {t for t, total in totals.items() if cuts[t] / total >= BOUNDARY_CUT_RATIO}
+
+
+def subsumed_by_score(scores):
+    """
+    返回被更长词项包含、且该更长词项得分不低于自己的词项（如 "事长" 之于 "董事长"）
+    同 drop_fragments，用子串 -> 包含它的最高得分 的索引
+    """
+    best = {}
+    for term, score in scores.items():
+        for n in range(1, len(term)):
+            for i in range(len(term) - n + 1):
+                sub = term[i:i + n]
+                if sub not in best or score > best[sub]:
+                    best[sub] = score
+    return {t for t, score in scores.items() if t in best and best[t] >= score}
+
+
+def drop_fragments(terms, counts):
+    """
+    丢弃被更长词项覆盖的片段，如 "市早苗" 之于 "高市早苗"
+    用子串 -> 覆盖它的最长词项频次 的索引，避免两两比较
+    """
+    kept = []
+    cover = {}
+    for term in sorted(terms, key=len, reverse=True):
+        if cover.get(term, 0) >= SUBSUME_RATIO * counts[term]:
+            continue
+        kept.append(term)
+        for n in range(1, len(term)):
+            for i in range(len(term) - n + 1):
+                sub = term[i:i + n]
+                cover[sub] = max(cover.get(sub, 0), counts[term])
+    return kept
+
+
+def candidate_terms(items, counts=None):
+    """当天的候选词：出现在 >= 2 个标题中，剔除不完整的片段并合并子串"""
+    if counts is None:
+        _, counts = count_day(items)
+    frequent = {t for t, c in counts.items() if c >= 2}
+    frequent -= incomplete_terms(items, frequent)
+    return drop_fragments(frequent, counts)
+
+
+class TrendEngine:
+    """
+    load_day(date_str) -> 当天原始条目列表或 None，用于补算缺失的增量文件
+    """
+
+    def __init__(self, load_day, client=None, bucket=None, baseline_days=BASELINE_DAYS):
+        self.load_day = load_day
+        self.client = client
+        self.bucket = bucket
+        self.baseline_days = baseline_days
+        self._missing = None
+        self._missing_dirty = False
+        self._lock = threading.Lock()
+
+    def _path(self, date_str):
+        return os.path.join(TREND_COUNTS_DIR, f"{date_str}.json")
+
+    def _read(self, date_str):
+        path = self._path(date_str)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        if self.client:
+            try:
+                obj = self.client.get_object(Bucket=self.bucket, Key=f"{TREND_COUNTS_R2_PREFIX}{date_str}.json")
+                data = json.loads(obj['Body'].read().decode('utf-8'))
+                self._write_local(date_str, data)
+                return data
+            except Exception:
+                return None
+        return None
+
+    def _write_local(self, date_str, data):
+        os.makedirs(TREND_COUNTS_DIR, exist_ok=True)
+        tmp_path = f"{self._path(date_str)}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self._path(date_str))
+
+    def record_day(self, date_str, items):
+        """写入当天的增量统计（本地 + R2），返回 (标题数, Counter)"""
+        docs, counts = count_day(items)
+        data = {
+            "date": date_str,
+            "docs": docs,
+            "counts": {t: c for t, c in counts.items() if c >= MIN_STORED_COUNT}
+        }
+        self._write_local(date_str, data)
+        if self.client:
+            try:
+                self.client.put_object(
+                    Bucket=self.bucket,
+                    Key=f"{TREND_COUNTS_R2_PREFIX}{date_str}.json",
+                    Body=json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+                    ContentType='application/json'
+                )
+            except Exception as e:
+                print(f"[!] [Trends] 增量统计上传失败: {e}")
+        return docs, counts
+
+    def _load_missing(self):
+        """负缓存 {日期: 上次确认缺失的时间戳}，本地优先，其次 R2"""
+        if self._missing is not None:
+            return self._missing
+        data = None
+        if os.path.exists(MISSING_FILE):
+            try:
+                with open(MISSING_FILE, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                print(f"[!] [Trends] 缺失日期记录读取失败，将重建: {e}")
+        if data is None and self.client:
+            try:
+                obj = self.client.get_object(Bucket=self.bucket, Key=MISSING_R2_KEY)
+                data = json.loads(obj['Body'].read().decode('utf-8'))
+            except Exception:
+                data = None
+        now = time.time()
+        self._missing = {d: t for d, t in (data or {}).items() if now - t < MISSING_RECHECK}
+        return self._missing
+
+    def _save_missing(self):
+        with self._lock:
+            if not self._missing_dirty:
+                return
+            self._missing_dirty = False
+            data = dict(self._missing)
+        os.makedirs(os.path.dirname(MISSING_FILE), exist_ok=True)
+        tmp_path = f"{MISSING_FILE}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, sort_keys=True)
+        os.replace(tmp_path, MISSING_FILE)
+        if self.client:
+            try:
+                self.client.put_object(
+                    Bucket=self.bucket,
+                    Key=MISSING_R2_KEY,
+                    Body=json.dumps(data, sort_keys=True).encode('utf-8'),
+                    ContentType='application/json'
+                )
+            except Exception as e:
+                print(f"[!] [Trends] 缺失日期记录上传失败: {e}")
+
+    def day_counts(self, date_str):
+        """读取某天的增量统计，缺失时从原始存档补算；存档也不存在的日期记入负缓存"""
+        with self._lock:
+            if date_str in self._load_missing():
+                return 0, Counter()
+        data = self._read(date_str)
+        if data is None:
+            items = self.load_day(date_str)
+            if not items:
+                with self._lock:
+                    self._missing[date_str] = int(time.time())
+                    self._missing_dirty = True
+                return 0, Counter()
+            return self.record_day(date_str, items)
+        return data.get("docs", 0), Counter(data.get("counts", {}))
+
+    def baseline(self, date_str):
+        """前 baseline_days 天的累计文档数与词频"""
+        day = datetime.strptime(date_str, '%Y-%m-%d')
+        total_docs = 0
+        total = Counter()
+        for i in range(1, self.baseline_days + 1):
+            docs, counts = self.day_counts((day - timedelta(days=i)).strftime('%Y-%m-%d'))
+            total_docs += docs
+            total.update(counts)
+        self._save_missing()
+        return total_docs, total
+
+    def hot_and_rising(self, date_str, items, hot_n=3, rising_n=15):
+        docs, counts = self.record_day(date_str, items)
+        if not docs:
+            return {"hot": [], "rising": []}
+        base_docs, base_counts = self.baseline(date_str)
+
+        all_frequent = {t for t, c in counts.items() if c >= 2}
+        terms = candidate_terms(items, counts)
+
+        # Hot：当天覆盖标题最多的词项
+        hot = sorted(terms, key=lambda t: (counts[t], len(t)), reverse=True)[:hot_n]
+
+        # Rising：相对基线显著上升的词项 (G²)，基线为空时退化为按频次
+        def score(term):
+            a = counts[term]
+            b = base_counts.get(term, 0)
+            if base_docs and a / docs <= b / base_docs:
+                return None
+            return log_likelihood(a, docs, b, base_docs) if base_docs else float(a)
+
+        scores = {}
+        for term in terms:
+            if any(term in h or h in term for h in hot):
+                continue
+            s = score(term)
+            if s is not None:
+                scores[term] = s
+
+        # 去掉跨词片段：切在词中间的 n-gram，以及被得分不低于自己的更长 n-gram 包含的 n-gram
+        # 更长 n-gram 取全部当天高频词（含上面剔除的不完整词，如 "董事长" 之于 "事长"）
+        bigrams = title_bigrams(items)
+        bigrams.update({t: c for t, c in base_counts.items() if len(t) == 2})
+        all_scores = {t: s for t, s in ((t, score(t)) for t in all_frequent) if s is not None}
+        all_scores.update(scores)
+        dropped = straddling_terms(items, scores, bigrams) | (subsumed_by_score(all_scores) & scores.keys())
+        scored = sorted(((s, len(t), t) for t, s in scores.items() if t not in dropped), reverse=True)
+        return {"hot": hot, "rising": [t for _, _, t in scored[:rising_n]]}
@@ -6,6 +6,7 @@ import google.generativeai as genai
 import boto3
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
+from llm_cache import LLMCache, make_key
 
 # 加载环境变量 (兼顾本地运行和 GitHub Actions)
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -21,6 +22,9 @@ R2_SECRET_ACCESS_KEY = os.getenv("R2_SECRET_ACCESS_KEY")
 R2_BUCKET_NAME = os.getenv("R2_BUCKET_NAME", "cnjp-data")
 JST = datetime.timezone(datetime.timedelta(hours=9))
 
+# 同一周内重跑（如上传失败后手动触发）直接复用已获取的情报
+BASELINE_CACHE_TTL = 3 * 24 * 3600
+
 def get_r2_client():
     if not R2_ACCOUNT_ID or not R2_ACCESS_KEY_ID or not R2_SECRET_ACCESS_KEY:
         print("[!] R2 凭证缺失")
@@ -45,6 +49,9 @@ def fetch_latest_intel():
         print("[!] GOOGLE_API_KEY 缺失")
         return None
 
+    cache = LLMCache(ttl=BASELINE_CACHE_TTL)
+    cache.attach_r2(get_r2_client(), R2_BUCKET_NAME)
+
     print(f"[-] [AI] 正在调用 Gemini 2.5 Flash 进行全网搜索... (SDK Version: {genai.__version__})")
     genai.configure(api_key=GOOGLE_API_KEY)
     
@@ -83,9 +90,15 @@ def fetch_latest_intel():
     ...
     """
 
+    cache_key = make_key('gemini-2.5-flash', "", prompt, {"tools": "google_search"})
     try:
-        response = model.generate_content(prompt)
-        text = response.text
+        text = cache.get(cache_key)
+        from_cache = text is not None
+        if from_cache:
+            print("[-] [Cache] 命中情报缓存，跳过模型调用")
+        else:
+            response = model.generate_content(prompt)
+            text = response.text
         if not text:
             print("[!] AI 未返回内容")
             return None
@@ -93,6 +106,10 @@ def fetch_latest_intel():
         # 清理 JSON 格式
         text = text.replace("```json", "").replace("```", "").strip()
         data = json.loads(text)
+        # 只缓存能成功解析的响应
+        if not from_cache:
+            cache.put(cache_key, text, 'gemini-2.5-flash')
+        print(f"[-] [Cache] 情报缓存{cache.stats()}")
         
         print(f"[-] [AI] 情报获取成功，全量长度: {len(data.get('content', ''))}, 精简长度: {len(data.get('content_lite', ''))}")
         return data
@@ -1,5 +1,9 @@
 import os
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import httplib2
 from googleapiclient.discovery import build
 import datetime
 import boto3
@@ -11,6 +15,24 @@ from botocore.config import Config
 yt_token = os.environ.get("YOUTUBE_" + "API_KEY")
 CONFIG_FILE = "scripts/stream_config.json"
 OUTPUT_FILE = "public/live_data.json"
+R2_KEY = "live_data.json"
+# 各频道上次调用 search.list 的时间，用于离线频道的检索退避
+SEARCH_STATE_FILE = "cache/stream_search_state.json"
+SEARCH_STATE_R2_KEY = "cache/stream_search_state.json"
+
+# YouTube Data API 配额：search.list 每次 100 单位，videos.list 每次 1 单位（最多 50 个 ID）
+SEARCH_COST = 100
+VIDEOS_COST = 1
+VIDEOS_BATCH = 50
+# 上次离线的频道每隔这么多小时才重新 search.list；每小时运行时 6 个频道全部离线约 4800 单位/天（每日配额 10000）
+OFFLINE_SEARCH_HOURS = float(os.environ.get("STREAM_OFFLINE_SEARCH_HOURS", "3"))
+
+# 并发检索：线程池大小、单次 HTTP 请求超时、整轮检索的截止时间（秒）
+MAX_WORKERS = int(os.environ.get("STREAM_WORKERS", "4"))
+REQUEST_TIMEOUT = 15
+RUN_DEADLINE = 60
+
+_thread_local = threading.local()
 
 # === R2 配置 ===
 R2_ACCOUNT_ID = os.environ.get("CLOUDFLARE_ACCOUNT_ID", "")
@@ -69,69 +91,213 @@ def calculate_match_score(title, keywords):
     
     return score
 
-def get_live_stream_for_channel(youtube, channel_id, keywords, channel_name):
+def build_youtube(api_key):
+    """httplib2 连接不是线程安全的，每个线程各自创建带超时的客户端"""
+    return build(
+        "youtube", "v3",
+        developerKey=api_key,
+        http=httplib2.Http(timeout=REQUEST_TIMEOUT),
+        cache_discovery=False
+    )
+
+def get_thread_youtube(api_key):
+    if not hasattr(_thread_local, "youtube"):
+        _thread_local.youtube = build_youtube(api_key)
+    return _thread_local.youtube
+
+def get_live_stream_for_channel(youtube, channel_id, keywords, channel_name, log=print):
     """
     获取指定频道的直播源
+    没有直播时返回 None；请求失败时抛出异常，由调用方保留上次的状态
     """
-    try:
-        print(f"\n🔍 Searching channel: {channel_name} ({channel_id})")
-        print(f"   Keywords: {keywords}")
-        
-        # 搜索该频道的所有直播
-        request = youtube.search().list(
-            part="id,snippet",
-            channelId=channel_id,
-            eventType="live",
-            type="video",
-            maxResults=50
-        )
-        response = request.execute()
-        items = response.get("items", [])
+    log(f"\n🔍 Searching channel: {channel_name} ({channel_id})")
+    log(f"   Keywords: {keywords}")
+    
+    # 搜索该频道的所有直播
+    request = youtube.search().list(
+        part="id,snippet",
+        channelId=channel_id,
+        eventType="live",
+        type="video",
+        maxResults=50
+    )
+    response = request.execute()
+    items = response.get("items", [])
 
-        if not items:
-            print(f"   ⚠️ No live streams found")
-            return None
+    if not items:
+        log(f"   ⚠️ No live streams found")
+        return None
 
-        print(f"   📺 Found {len(items)} active streams")
-        
-        # 为每个视频计算匹配分数
-        scored_videos = []
-        for video in items:
-            title = video["snippet"]["title"]
-            video_id = video["id"]["videoId"]
-            score = calculate_match_score(title, keywords)
-            
-            scored_videos.append({
-                "title": title,
-                "video_id": video_id,
-                "score": score
-            })
-
-        # 按分数排序
-        scored_videos.sort(key=lambda x: x["score"], reverse=True)
-        best_match = scored_videos[0]
-        
-        if best_match["score"] > 0:
-            print(f"   ✅ Best match (score {best_match['score']}): {best_match['title'][:60]}...")
-        else:
-            print(f"   ⚠️ No keyword match, using first available: {best_match['title'][:60]}...")
+    log(f"   📺 Found {len(items)} active streams")
         
-        return {
-            "videoId": best_match["video_id"],
-            "title": best_match["title"],
-            "matchScore": best_match["score"]
-        }
+    # 为每个视频计算匹配分数
+    scored_videos = []
+    for video in items:
+        title = video["snippet"]["title"]
+        video_id = video["id"]["videoId"]
+        score = calculate_match_score(title, keywords)
         
+        scored_videos.append({
+            "title": title,
+            "video_id": video_id,
+            "score": score
+        })
+
+    # 按分数排序
+    scored_videos.sort(key=lambda x: x["score"], reverse=True)
+    best_match = scored_videos[0]
+    
+    if best_match["score"] > 0:
+        log(f"   ✅ Best match (score {best_match['score']}): {best_match['title'][:60]}...")
+    else:
+        log(f"   ⚠️ No keyword match, using first available: {best_match['title'][:60]}...")
+    
+    return {
+        "videoId": best_match["video_id"],
+        "title": best_match["title"],
+        "matchScore": best_match["score"]
+    }
+
+def search_channel(api_key, stream_config):
+    """线程池任务：检索单个频道，返回 (结果, 日志行, 耗时秒)"""
+    lines = []
+    start = time.monotonic()
+    try:
+        stream_data = get_live_stream_for_channel(
+            get_thread_youtube(api_key),
+            stream_config["channelId"],
+            stream_config["keywords"],
+            stream_config["channelName"],
+            log=lines.append
+        )
     except Exception as e:
-        print(f"   ❌ Error: {e}")
+        lines.append(f"\n❌ {stream_config['channelName']}: {e}")
+        raise RuntimeError("\n".join(lines)) from e
+    return stream_data, lines, time.monotonic() - start
+
+def load_previous_data(client):
+    """读取上一次发布的 live_data.json（优先 R2，其次本地），用于复用 videoId 并判断是否有变化"""
+    if client is not None:
+        try:
+            obj = client.get_object(Bucket=R2_BUCKET_NAME, Key=R2_KEY)
+            return json.loads(obj["Body"].read().decode("utf-8"))
+        except Exception as e:
+            print(f"⚠️ Could not load previous {R2_KEY} from R2: {e}")
+    if os.path.exists(OUTPUT_FILE):
+        try:
+            with open(OUTPUT_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Could not read {OUTPUT_FILE}: {e}")
+    return None
+
+def load_search_state(client):
+    """读取 {频道 id: 上次 search.list 的时间戳}（优先 R2，其次本地）"""
+    if client is not None:
+        try:
+            obj = client.get_object(Bucket=R2_BUCKET_NAME, Key=SEARCH_STATE_R2_KEY)
+            return json.loads(obj["Body"].read().decode("utf-8"))
+        except Exception as e:
+            print(f"⚠️ Could not load {SEARCH_STATE_R2_KEY} from R2: {e}")
+    if os.path.exists(SEARCH_STATE_FILE):
+        try:
+            with open(SEARCH_STATE_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Could not read {SEARCH_STATE_FILE}: {e}")
+    return {}
+
+def save_search_state(state, r2_client=None):
+    os.makedirs(os.path.dirname(SEARCH_STATE_FILE), exist_ok=True)
+    tmp_path = f"{SEARCH_STATE_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, SEARCH_STATE_FILE)
+    if r2_client:
+        upload_to_r2(r2_client, SEARCH_STATE_FILE, SEARCH_STATE_R2_KEY)
+
+def search_backoff(previous, last_searched, now):
+    """上次离线且距上次检索不足 OFFLINE_SEARCH_HOURS 的频道跳过 search.list，返回剩余秒数，否则返回 None"""
+    if not previous or previous.get("isLive") or not last_searched:
+        return None
+    remaining = last_searched + OFFLINE_SEARCH_HOURS * 3600 - now
+    return remaining if remaining > 0 else None
+
+def check_cached_videos(youtube, video_ids):
+    """
+    用 videos.list 批量检查上次的直播是否仍在播
+    返回 ({videoId: {"title", "channelId", "isLive"}}, 消耗的配额)
+    """
+    status = {}
+    cost = 0
+    video_ids = list(dict.fromkeys(v for v in video_ids if v))
+    for i in range(0, len(video_ids), VIDEOS_BATCH):
+        batch = video_ids[i:i + VIDEOS_BATCH]
+        cost += VIDEOS_COST
+        try:
+            response = youtube.videos().list(part="snippet", id=",".join(batch)).execute()
+        except Exception as e:
+            print(f"⚠️ videos.list failed, falling back to search: {e}")
+            continue
+        for video in response.get("items", []):
+            snippet = video.get("snippet", {})
+            status[video["id"]] = {
+                "title": snippet.get("title", ""),
+                "channelId": snippet.get("channelId"),
+                "isLive": snippet.get("liveBroadcastContent") == "live"
+            }
+    return status, cost
+
+def reuse_cached_stream(previous, video_status, channel_id, keywords):
+    """上次的直播仍在播、属于该频道且标题命中关键词时直接复用，否则返回 None"""
+    if not previous or not previous.get("isLive") or not previous.get("videoId"):
         return None
+    video = video_status.get(previous["videoId"])
+    if not video or not video["isLive"] or video["channelId"] != channel_id:
+        return None
+    score = calculate_match_score(video["title"], keywords)
+    if score <= 0:
+        return None
+    return {
+        "videoId": previous["videoId"],
+        "title": video["title"],
+        "matchScore": score
+    }
+
+def make_stream_entry(stream_config, stream_data):
+    if stream_data:
+        return {
+            "id": stream_config["id"],
+            "displayName": stream_config["displayName"],
+            "channelName": stream_config["channelName"],
+            "isLive": True,
+            "videoId": stream_data["videoId"],
+            "title": stream_data["title"],
+            "matchScore": stream_data["matchScore"]
+        }
+    # 没有找到直播，标记为离线
+    return {
+        "id": stream_config["id"],
+        "displayName": stream_config["displayName"],
+        "channelName": stream_config["channelName"],
+        "isLive": False,
+        "videoId": None,
+        "title": None,
+        "matchScore": 0
+    }
 
-def update_all_streams(api_key):
+def update_all_streams(api_key, previous_data=None, search_state=None):
     """
     更新所有直播源
+    先用一次 videos.list 批量确认上次的 videoId，只有已结束或不匹配的频道才调用 search.list，
+    这些频道在线程池中并发检索；超时或失败的频道保留上次的状态
+    上次已离线的频道按 OFFLINE_SEARCH_HOURS 退避，search_state 记录每个频道的检索时间（原地更新）
     """
+    if search_state is None:
+        search_state = {}
+    now = time.time()
     config = load_stream_config()
-    youtube = build("youtube", "v3", developerKey=api_key)
+    youtube = build_youtube(api_key)
     
     results = {
         "lastUpdated": datetime.datetime.now().isoformat(),
@@ -141,47 +307,83 @@ def update_all_streams(api_key):
     print("=" * 80)
     print("🚀 Updating all live streams...")
     print("=" * 80)
-    
+
+    previous_streams = {s["id"]: s for s in (previous_data or {}).get("streams", [])}
+    video_status, quota_used = check_cached_videos(
+        youtube, [s.get("videoId") for s in previous_streams.values() if s.get("isLive")]
+    )
+
+    entries = {}
+    report = []  # (频道, 来源, 耗时秒)
+    to_search = []
+    backed_off = 0
     for stream_config in config["streams"]:
-        stream_id = stream_config["id"]
-        display_name = stream_config["displayName"]
-        channel_id = stream_config["channelId"]
-        channel_name = stream_config["channelName"]
-        keywords = stream_config["keywords"]
-        
-        stream_data = get_live_stream_for_channel(
-            youtube, 
-            channel_id, 
-            keywords, 
-            channel_name
+        previous = previous_streams.get(stream_config["id"])
+        stream_data = reuse_cached_stream(
+            previous, video_status,
+            stream_config["channelId"], stream_config["keywords"]
         )
-        
+        remaining = search_backoff(previous, search_state.get(stream_config["id"]), now)
         if stream_data:
-            results["streams"].append({
-                "id": stream_id,
-                "displayName": display_name,
-                "channelName": channel_name,
-                "isLive": True,
-                "videoId": stream_data["videoId"],
-                "title": stream_data["title"],
-                "matchScore": stream_data["matchScore"]
-            })
+            print(f"\n♻️ {stream_config['channelName']}: cached stream still live ({stream_data['videoId']})")
+            entries[stream_config["id"]] = make_stream_entry(stream_config, stream_data)
+            report.append((stream_config["displayName"], "cached", 0.0))
+        elif remaining is not None:
+            print(f"\n💤 {stream_config['channelName']}: offline, next search in {remaining / 60:.0f} min")
+            entries[stream_config["id"]] = previous
+            report.append((stream_config["displayName"], "backoff", 0.0))
+            backed_off += 1
         else:
-            # 没有找到直播，标记为离线
-            results["streams"].append({
-                "id": stream_id,
-                "displayName": display_name,
-                "channelName": channel_name,
-                "isLive": False,
-                "videoId": None,
-                "title": None,
-                "matchScore": 0
-            })
-    
+            to_search.append(stream_config)
+
+    if to_search:
+        quota_used += SEARCH_COST * len(to_search)
+        pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        futures = [(sc, pool.submit(search_channel, api_key, sc)) for sc in to_search]
+        deadline = time.monotonic() + RUN_DEADLINE
+        for stream_config, future in futures:
+            stream_id = stream_config["id"]
+            try:
+                stream_data, lines, elapsed = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                print("\n".join(lines))
+                entries[stream_id] = make_stream_entry(stream_config, stream_data)
+                search_state[stream_id] = int(now)
+                report.append((stream_config["displayName"], "search", elapsed))
+            except Exception as e:
+                timed_out = isinstance(e, FutureTimeoutError)
+                if timed_out:
+                    future.cancel()
+                    print(f"\n⏱️ {stream_config['channelName']}: no response within {RUN_DEADLINE}s")
+                else:
+                    print(e)
+                # 保留上次的状态，而不是标记为离线
+                if stream_id in previous_streams:
+                    entries[stream_id] = previous_streams[stream_id]
+                    print(f"   ↩️ Keeping last known state for {stream_config['displayName']}")
+                else:
+                    entries[stream_id] = make_stream_entry(stream_config, None)
+                report.append((stream_config["displayName"], "timeout" if timed_out else "error", None))
+        # 不等待仍在进行的请求，它们会在 REQUEST_TIMEOUT 内自行结束
+        pool.shutdown(wait=False)
+
+    results["streams"] = [entries[sc["id"]] for sc in config["streams"]]
+
+    print(f"\n📈 Quota used: {quota_used} units ({len(to_search)} search.list calls, "
+          f"{len(config['streams']) - len(to_search) - backed_off} streams reused, {backed_off} offline backed off)")
+    print("\n⏱️ Per-channel latency:")
+    for name, source, elapsed in report:
+        latency = f"{elapsed * 1000:.0f} ms" if elapsed is not None else "-"
+        print(f"  {source:<8} {latency:>9}  {name}")
     return results
 
-def save_to_json(data, filename):
-    """保存数据到 JSON 文件并上传到 R2"""
+def streams_changed(old_data, new_data):
+    """忽略 lastUpdated，只比较直播列表本身"""
+    if not old_data:
+        return True
+    return old_data.get("streams") != new_data.get("streams")
+
+def save_to_json(data, filename, r2_client=None, previous_data=None):
+    """保存数据到 JSON 文件，内容有变化时才上传到 R2"""
     os.makedirs(os.path.dirname(filename), exist_ok=True)
     with open(filename, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
@@ -190,9 +392,11 @@ def save_to_json(data, filename):
     print(f"💾 Data saved to {filename}")
     
     # 上传到 R2
-    r2_client = get_r2_client()
     if r2_client:
-        upload_to_r2(r2_client, filename, "live_data.json")
+        if streams_changed(previous_data, data):
+            upload_to_r2(r2_client, filename, R2_KEY)
+        else:
+            print(f"⏭️ No stream changes, skipping upload of {R2_KEY}")
     
     print("=" * 80)
     print("\n📊 Summary:")
@@ -208,8 +412,12 @@ if __name__ == "__main__":
         raise ValueError("❌ Error: Missing YouTube API key!")
     
     try:
-        data = update_all_streams(yt_token)
-        save_to_json(data, OUTPUT_FILE)
+        r2_client = get_r2_client()
+        previous = load_previous_data(r2_client)
+        search_state = load_search_state(r2_client)
+        data = update_all_streams(yt_token, previous, search_state)
+        save_to_json(data, OUTPUT_FILE, r2_client, previous)
+        save_search_state(search_state, r2_client)
         print("\n✨ Done.")
     except Exception as e:
         print(f"\n❌ Fatal error: {e}")
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_cache import LLMCache, SCRIPT_DIR
+
+# 兼容搜索库
+try:
+    from ddgs import DDGS
+except ImportError:
+    from duckduckgo_search import DDGS
+
+# --- 网络情报检索层 ---
+# 多个关键词并发检索，共享一个礼貌性限流器；结果按 (query, date) 缓存到磁盘和 R2
+
+SEARCH_CACHE_DIR = os.path.join(SCRIPT_DIR, "search_cache")
+SEARCH_CACHE_R2_PREFIX = "cache/search/"
+# 历史日期的检索结果基本不变，缓存 30 天
+SEARCH_CACHE_TTL = 30 * 24 * 3600
+MAX_CONCURRENCY = 3
+MAX_RETRIES = 3
+
+
+class AdaptiveLimiter:
+    """
+    请求间隔自适应：平时不等待，服务端限流 / 报错时间隔翻倍，成功后逐步恢复
+    所有线程共享同一个发送节奏
+    """
+
+    def __init__(self, min_interval=0.0, max_interval=30.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pushback(self):
+        with self._lock:
+            self.interval = min(self.max_interval, max(1.0, self.interval * 2))
+            print(f"    [Search] 触发限流，请求间隔调整为 {self.interval:.1f}s")
+
+    def success(self):
+        with self._lock:
+            self.interval = max(self.min_interval, self.interval / 2 if self.interval > 1.0 else self.min_interval)
+
+
+class WebSearcher:
+    """
+    检索器在整个进程内只持有一个线程池，每个工作线程一个 DDGS 会话，
+    补跑多个日期时复用同一批连接；用完调用 close()，或用作上下文管理器
+    """
+
+    def __init__(self, user_agents, max_concurrency=MAX_CONCURRENCY):
+        self.user_agents = user_agents
+        self.max_concurrency = max_concurrency
+        self.limiter = AdaptiveLimiter()
+        self.cache = LLMCache(cache_dir=SEARCH_CACHE_DIR, ttl=SEARCH_CACHE_TTL, r2_prefix=SEARCH_CACHE_R2_PREFIX)
+        self._local = threading.local()
+        self._pool = None
+        self._sessions = set()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def attach_r2(self, client, bucket):
+        self.cache.attach_r2(client, bucket)
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="ddgs")
+            return self._pool
+
+    def _ddgs(self):
+        """每个工作线程复用一个 DDGS 会话"""
+        if not hasattr(self._local, "ddgs"):
+            self._local.ddgs = DDGS(headers={"User-Agent": random.choice(self.user_agents)})
+            with self._lock:
+                self._sessions.add(self._local.ddgs)
+        return self._local.ddgs
+
+    @staticmethod
+    def _close_session(ddgs):
+        try:
+            if hasattr(ddgs, "close"):
+                ddgs.close()
+            elif hasattr(ddgs, "__exit__"):
+                ddgs.__exit__(None, None, None)
+        except Exception:
+            pass
+
+    def _reset_session(self):
+        if hasattr(self._local, "ddgs"):
+            ddgs = self._local.ddgs
+            del self._local.ddgs
+            with self._lock:
+                self._sessions.discard(ddgs)
+            self._close_session(ddgs)
+
+    def close(self):
+        """关闭线程池和所有 DDGS 会话；之后再检索会重新创建"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            sessions, self._sessions = self._sessions, set()
+        if pool is not None:
+            pool.shutdown(wait=True)
+        for ddgs in sessions:
+            self._close_session(ddgs)
+        # 调用 close() 的线程自己也可能持有会话（直接调用 search 时）
+        if hasattr(self._local, "ddgs"):
+            del self._local.ddgs
+
+    def search(self, query, date_str, max_results=2):
+        """返回摘要文本列表；失败或无结果返回空列表（空结果不缓存）"""
+        key = hashlib.sha256(f"{query}\n{date_str}\n{max_results}".encode('utf-8')).hexdigest()
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        historical_query = f"{query} {date_str}"
+        for attempt in range(MAX_RETRIES):
+            self.limiter.wait()
+            try:
+                results = list(self._ddgs().text(historical_query, max_results=max_results))
+                self.limiter.success()
+                # 兼容不同版本的字段
+                bodies = [res.get('body') or res.get('snippet') or "" for res in results]
+                bodies = [b for b in bodies if b]
+                if bodies:
+                    self.cache.put(key, bodies, "ddgs")
+                    return bodies
+                return []
+            except Exception as e:
+                print(f"    [Retry] 关键词 '{query}' 第 {attempt+1} 次失败: {e}")
+                self.limiter.pushback()
+                self._reset_session()
+        return []
+
+    def search_many(self, queries, date_str, max_results=2):
+        """并发检索多个关键词，结果顺序与 queries 一致"""
+        pool = self._executor()
+        return list(pool.map(lambda q: self.search(q, date_str, max_results), queries))
@@ -28,6 +28,9 @@ import PWAInstallPrompt from "@/components/PWAInstallPrompt";
 import { Search, Loader2, X, Flame, Calendar, ArrowUpDown, Sparkles, CloudRain } from "lucide-react";
 import { useTheme } from "@/components/ThemeContext";
 import { CATEGORY_MAP } from "@/lib/constants";
+import { fetchArchiveDay } from "@/lib/archive";
+import { resolveDataUrl } from "@/lib/manifest";
+import { fetchListFeed, RawDataFile } from "@/lib/feed";
 import { motion, AnimatePresence } from "framer-motion";
 import { DailyBriefingData } from "@/components/DailyBriefingCard";
 
@@ -279,28 +282,21 @@ export default function Home() {
 
     setIsSearchingAll(true);
     try {
-      const archiveUrl = R2_PUBLIC_URL
-        ? `${R2_PUBLIC_URL}/archive/${nextDate}.json`
-        : `/archive/${nextDate}.json`;
+      const items: NewsItem[] = await fetchArchiveDay(R2_PUBLIC_URL, nextDate);
 
-      const r = await fetch(archiveUrl);
-      if (r.ok) {
-        const items: NewsItem[] = await r.json();
-
-        // 合并数据并去重
-        setAllNewsData(prev => {
-          const combined = [...prev, ...items];
-          const seen = new Set();
-          return combined.filter(item => {
-            if (!item.link || seen.has(item.link)) return false;
-            seen.add(item.link);
-            return true;
-          }).sort((a, b) => (b.timestamp || 0) - (a.timestamp || 0));
-        });
+      // 合并数据并去重
+      setAllNewsData(prev => {
+        const combined = [...prev, ...items];
+        const seen = new Set();
+        return combined.filter(item => {
+          if (!item.link || seen.has(item.link)) return false;
+          seen.add(item.link);
+          return true;
+        }).sort((a, b) => (b.timestamp || 0) - (a.timestamp || 0));
+      });
 
-        setLoadedDates(prev => new Set([...prev, nextDate]));
-        console.log(`📚 已加载历史归档: ${nextDate} (${items.length} 条)`);
-      }
+      setLoadedDates(prev => new Set([...prev, nextDate]));
+      console.log(`📚 已加载历史归档: ${nextDate} (${items.length} 条)`);
     } catch (e) {
       console.error(`Failed to load archive ${nextDate}`, e);
     } finally {
@@ -334,14 +330,7 @@ export default function Home() {
 
       for (let i = 0; i < unloadedDates.length; i += BATCH_SIZE) {
         const batchDates = unloadedDates.slice(i, i + BATCH_SIZE);
-        const promises = batchDates.map(date =>
-          fetch(R2_PUBLIC_URL ? `${R2_PUBLIC_URL}/archive/${date}.json` : `/archive/${date}.json`)
-            .then(r => r.ok ? r.json() : [])
-            .catch(e => {
-              console.warn(`Failed to load ${date}`, e);
-              return [];
-            })
-        );
+        const promises = batchDates.map(date => fetchArchiveDay(R2_PUBLIC_URL, date));
 
         const results = await Promise.all(promises);
         results.forEach(items => allNewItems.push(...items));
@@ -379,33 +368,31 @@ export default function Home() {
     let capturedRawData: NewsItem[] = [];
 
     try {
-      // 1. 获取最新 data.json
-      const dataUrl = R2_PUBLIC_URL
-        ? `${R2_PUBLIC_URL}/data.json?t=${Date.now()}`
-        : `/data.json?t=${Date.now()}`;
-
-      let data;
-      try {
-        const r = await fetch(dataUrl);
-        if (!r.ok) throw new Error("Network response was not ok");
-        data = await r.json();
-      } catch (e) {
-        console.warn("Primary data fetch failed, trying local fallback...", e);
-        // Fallback to local
-        const rFallback = await fetch(`/data.json?t=${Date.now()}`);
-        data = await rFallback.json();
+      // 1. 优先获取精简列表 feed/list.json，不存在时退回完整 data.json
+      let data: RawDataFile | NewsItem[] | null = await fetchListFeed(R2_PUBLIC_URL, true);
+      if (!data) {
+        try {
+          const r = await fetch(await resolveDataUrl(R2_PUBLIC_URL, "data.json"));
+          if (!r.ok) throw new Error("Network response was not ok");
+          data = (await r.json()) as RawDataFile | NewsItem[];
+        } catch (e) {
+          console.warn("Primary data fetch failed, trying local fallback...", e);
+          // Fallback to local
+          const rFallback = await fetch(`/data.json?t=${Date.now()}`);
+          data = (await rFallback.json()) as RawDataFile | NewsItem[];
+        }
       }
 
-      if (data && data.news) {
+      if (Array.isArray(data)) {
+        setRawNewsData(data);
+        capturedRawData = data;
+      } else if (data && data.news) {
         setRawNewsData(data.news);
         capturedRawData = data.news;
         setLastUpdated(data.last_updated || "");
         setNewContentCount(0);
         setPendingNewsData(null);
         setPendingLastUpdated("");
-      } else if (Array.isArray(data)) {
-        setRawNewsData(data);
-        capturedRawData = data;
       }
 
       // 1.5 获取每日简报 (ollama/latest.json)
@@ -422,9 +409,7 @@ export default function Home() {
 
       // 2. 获取归档索引 并 预加载最近 3 天
       try {
-        const indexUrl = R2_PUBLIC_URL
-          ? `${R2_PUBLIC_URL}/archive/index.json?t=${Date.now()}`
-          : `/archive/index.json?t=${Date.now()}`;
+        const indexUrl = await resolveDataUrl(R2_PUBLIC_URL, "archive/index.json");
 
         let indexData;
         try {
@@ -449,11 +434,7 @@ export default function Home() {
 
           console.log(`🚀 正在预加载最近 ${PREFETCH_DAYS} 天归档:`, prefetchDates);
 
-          const prefetchPromises = prefetchDates.map(date =>
-            fetch(R2_PUBLIC_URL ? `${R2_PUBLIC_URL}/archive/${date}.json` : `/archive/${date}.json`)
-              .then(r => r.ok ? r.json() : [])
-              .catch(() => [])
-          );
+          const prefetchPromises = prefetchDates.map(date => fetchArchiveDay(R2_PUBLIC_URL, date));
 
           const prefetchResults = await Promise.all(prefetchPromises);
           const prefetchedItems = prefetchResults.flat();
@@ -493,11 +474,9 @@ export default function Home() {
   // 轮询检查新内容
   const checkForNewContent = useCallback(async () => {
     try {
-      const dataUrl = R2_PUBLIC_URL
-        ? `${R2_PUBLIC_URL}/data.json?t=${Date.now()}`
-        : `/data.json?t=${Date.now()}`;
-      const r = await fetch(dataUrl);
-      const data = await r.json();
+      // manifest 未变化时得到同一个不可变 URL，直接命中浏览器缓存
+      const data = (await fetchListFeed(R2_PUBLIC_URL, true))
+        || await fetch(await resolveDataUrl(R2_PUBLIC_URL, "data.json")).then(r => r.json() as Promise<RawDataFile>);
 
       if (data && data.news && data.last_updated !== lastUpdated) {
         const currentLinks = new Set(rawNewsData.map(item => item.link));
@@ -888,12 +867,8 @@ export default function Home() {
     setShowArchiveDrawer(false);
     if (!archiveData[dateStr]) {
       try {
-        const archiveUrl = R2_PUBLIC_URL
-          ? `${R2_PUBLIC_URL}/archive/${dateStr}.json`
-          : `/archive/${dateStr}.json`;
-        const r = await fetch(archiveUrl);
-        if (r.ok) {
-          const items = await r.json();
+        const items = await fetchArchiveDay(R2_PUBLIC_URL, dateStr);
+        if (items.length > 0) {
           setArchiveData(prev => ({ ...prev, [dateStr]: items }));
         }
       } catch (e) {
@@ -8,6 +8,7 @@ import { formatDistanceToNow } from "date-fns";
 import { zhCN, zhTW } from "date-fns/locale";
 import Modal from "./Modal";
 import { CATEGORY_MAP, CATEGORY_DOT_COLORS } from "@/lib/constants";
+import { useOutletLogo } from "@/lib/logos";
 import { Heart, ExternalLink, Tag, Sparkles, Loader2, AlertCircle, Clock, Zap, Users, WifiOff, RefreshCcw } from "lucide-react";
 
 export interface NewsItem {
@@ -20,6 +21,7 @@ export interface NewsItem {
     origin: string;
     category?: string;
     logo?: string;
+    logo_key?: string;
     description?: string;
 }
 
@@ -51,6 +53,9 @@ const SC_TO_TC_CATEGORY: Record<string, string> = {
 };
 
 const AI_ANALYZE_API = "/api";
+const R2_PUBLIC_URL = process.env.NODE_ENV === "development"
+    ? "/r2-proxy"
+    : "https://r2.cn.saaaai.com";
 
 function NewsCardComponent({
     item,
@@ -61,6 +66,11 @@ function NewsCardComponent({
     const { settings } = useTheme();
     const [isModalOpen, setIsModalOpen] = useState(false);
     const [logoError, setLogoError] = useState(false);
+    // 有 logo_key 时从 Logo 合集取（一次请求覆盖全部媒体），合集中没有时才退回条目自带的 favicon URL
+    const bundledLogo = useOutletLogo(R2_PUBLIC_URL, item.logo_key);
+    const logoSrc = item.logo_key
+        ? (bundledLogo === undefined ? "" : bundledLogo || item.logo)
+        : item.logo;
 
     // AI 解读状态
     const [aiAnalysis, setAiAnalysis] = useState<AnalysisResult | null>(null);
@@ -324,8 +334,8 @@ function NewsCardComponent({
 
                         {/* 来源 */}
                         <div className="flex items-center gap-1.5">
-                            {item.logo && !logoError && (
-                                <Image src={item.logo} alt="" width={12} height={12}
+                            {logoSrc && !logoError && (
+                                <Image src={logoSrc} alt="" width={12} height={12}
                                     className="object-contain opacity-60 grayscale"
                                     onError={() => setLogoError(true)} loading="lazy" unoptimized />
                             )}
@@ -2,6 +2,8 @@
 
 import { useState, useEffect, useCallback, useRef } from "react";
 import { NewsItem } from "@/components/NewsCard";
+import { fetchArchiveDay } from "@/lib/archive";
+import { resolveDataUrl } from "@/lib/manifest";
 
 const R2_PUBLIC_URL = "https://r2.cn.saaaai.com";
 
@@ -55,16 +57,7 @@ export function useNewsData(options: UseNewsDataOptions = {}) {
             });
 
             // Load all archives in parallel
-            const promises = allDates.map(async (dateStr) => {
-                try {
-                    const archiveUrl = `${R2_PUBLIC_URL}/archive/${dateStr}.json`;
-                    const r = await fetch(archiveUrl);
-                    if (r.ok) return await r.json();
-                } catch (e) {
-                    console.error(`Failed to load archive ${dateStr}`, e);
-                }
-                return [];
-            });
+            const promises = allDates.map(dateStr => fetchArchiveDay(R2_PUBLIC_URL, dateStr));
 
             const results = await Promise.all(promises);
 
@@ -98,7 +91,7 @@ export function useNewsData(options: UseNewsDataOptions = {}) {
 
         try {
             // Fetch latest data.json
-            const dataUrl = `${R2_PUBLIC_URL}/data.json?t=${Date.now()}`;
+            const dataUrl = await resolveDataUrl(R2_PUBLIC_URL, "data.json", true);
             let data;
             try {
                 const r = await fetch(dataUrl);
@@ -124,7 +117,7 @@ export function useNewsData(options: UseNewsDataOptions = {}) {
 
             // Fetch archive index
             try {
-                const indexUrl = `${R2_PUBLIC_URL}/archive/index.json?t=${Date.now()}`;
+                const indexUrl = await resolveDataUrl(R2_PUBLIC_URL, "archive/index.json");
                 let indexData;
                 try {
                     const rIndex = await fetch(indexUrl);
@@ -155,7 +148,7 @@ export function useNewsData(options: UseNewsDataOptions = {}) {
     // Check for new content (polling)
     const checkForNewContent = useCallback(async () => {
         try {
-            const dataUrl = `${R2_PUBLIC_URL}/data.json?t=${Date.now()}`;
+            const dataUrl = await resolveDataUrl(R2_PUBLIC_URL, "data.json", true);
             const r = await fetch(dataUrl);
             const data = await r.json();
 
@@ -211,10 +204,8 @@ export function useNewsData(options: UseNewsDataOptions = {}) {
         if (archiveData[dateStr]) return archiveData[dateStr];
 
         try {
-            const archiveUrl = `${R2_PUBLIC_URL}/archive/${dateStr}.json`;
-            const r = await fetch(archiveUrl);
-            if (r.ok) {
-                const items = await r.json();
+            const items = await fetchArchiveDay(R2_PUBLIC_URL, dateStr);
+            if (items.length > 0) {
                 setArchiveData(prev => ({ ...prev, [dateStr]: items }));
                 return items;
             }
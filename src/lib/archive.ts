@@ -0,0 +1,52 @@
+import { NewsItem } from "@/components/NewsCard";
+import { resolveDataUrl } from "@/lib/manifest";
+
+// 当天（及刚结束、尚未合并的前一天）的存档以追加分段形式发布：
+//   archive/segments/YYYY-MM-DD/manifest.json -> { segments: [{ key }] }
+// 完整内容 = archive/YYYY-MM-DD.json 叠加各分段（同一 link 取 fetched_at / timestamp 较新的版本，相同时以后写入的为准，与 day_segments.py 一致）
+
+interface SegmentManifest {
+    segments: { key: string }[];
+}
+
+function jstDateString(offsetDays = 0): string {
+    return new Date(Date.now() + 9 * 3600 * 1000 + offsetDays * 86400 * 1000).toISOString().slice(0, 10);
+}
+
+async function fetchJson<T>(url: string, init?: RequestInit): Promise<T | null> {
+    try {
+        const r = await fetch(url, init);
+        return r.ok ? ((await r.json()) as T) : null;
+    } catch {
+        return null;
+    }
+}
+
+export async function fetchArchiveDay(baseUrl: string, dateStr: string): Promise<NewsItem[]> {
+    // 已按内容哈希发布的日期直接取不可变版本（可被浏览器长期缓存）
+    const dayPromise = resolveDataUrl(baseUrl, `archive/${dateStr}.json`).then(url => fetchJson<NewsItem[]>(url));
+    // 只有最近两天可能存在未合并的分段
+    if (dateStr < jstDateString(-1)) {
+        return (await dayPromise) || [];
+    }
+
+    const [base, manifest] = await Promise.all([
+        dayPromise,
+        fetchJson<SegmentManifest>(`${baseUrl}/archive/segments/${dateStr}/manifest.json`, { cache: "no-cache" }),
+    ]);
+    if (!manifest || manifest.segments.length === 0) {
+        return base || [];
+    }
+
+    const segments = await Promise.all(
+        manifest.segments.map(seg => fetchJson<NewsItem[]>(`${baseUrl}/${seg.key}`).then(items => items || []))
+    );
+    const version = (item: NewsItem & { fetched_at?: number }) => [item.fetched_at || 0, item.timestamp || 0];
+    const newer = (a: number[], b: number[]) => a[0] !== b[0] ? a[0] > b[0] : a[1] >= b[1];
+    const merged = new Map<string, NewsItem>();
+    [base || [], ...segments].forEach(items => items.forEach(item => {
+        const current = merged.get(item.link);
+        if (!current || newer(version(item), version(current))) merged.set(item.link, item);
+    }));
+    return Array.from(merged.values()).sort((a, b) => (b.timestamp || 0) - (a.timestamp || 0));
+}
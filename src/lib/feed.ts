@@ -0,0 +1,73 @@
+import { NewsItem } from "@/components/NewsCard";
+import { resolveDataUrl } from "@/lib/manifest";
+
+// 首页精简列表 feed/list.json（list_feed.py 生成）：每条一行数组，重复字符串放在 strings 查找表中
+//   列: title, title_suffix, title_tc, title_tc_suffix, title_ja, title_ja_suffix,
+//       link_prefix, link_path, link_query, timestamp, fetched_delta, origin, category, logo_key
+// time_str 不单独存储，按 timestamp 还原为 JST "MM-DD HH:MM"（与 main.py 的 strftime("%m-%d %H:%M") 相同）
+
+type Cell = string | number | null;
+
+interface ListFeed {
+    version: number;
+    last_updated: string;
+    strings: string[];
+    rows: Cell[][];
+}
+
+/** data.json 的结构；fetchListFeed 解码后也返回此结构 */
+export interface RawDataFile {
+    news: NewsItem[];
+    last_updated?: string;
+}
+
+const FEED_VERSION = 3;
+const TITLE_SEPARATOR = " - ";
+const JST_OFFSET_MS = 9 * 3600 * 1000;
+
+/** timestamp（秒）-> JST "MM-DD HH:MM" */
+export function jstTimeString(timestamp: number): string {
+    // 2025-12-03T14:05:00.000Z -> "12-03 14:05"
+    return new Date(timestamp * 1000 + JST_OFFSET_MS).toISOString().slice(5, 16).replace("T", " ");
+}
+
+export function decodeListFeed(feed: ListFeed): NewsItem[] {
+    const lookup = (i: Cell) => (typeof i === "number" && i >= 0 ? feed.strings[i] : "");
+    const withSuffix = (text: Cell, suffix: Cell) => {
+        const tail = lookup(suffix);
+        return tail ? `${text}${TITLE_SEPARATOR}${tail}` : String(text ?? "");
+    };
+    return feed.rows.map(row => {
+        const [title, titleSuffix, titleTc, titleTcSuffix, titleJa, titleJaSuffix,
+            linkPrefix, linkPath, linkQuery, timestamp, fetchedDelta, origin, category, logoKey] = row;
+        const ts = Number(timestamp) || 0;
+        const item: NewsItem & { fetched_at?: number } = {
+            title: withSuffix(title, titleSuffix),
+            title_tc: withSuffix(titleTc, titleTcSuffix),
+            title_ja: withSuffix(titleJa, titleJaSuffix) || undefined,
+            link: `${lookup(linkPrefix)}${linkPath ?? ""}${lookup(linkQuery)}`,
+            timestamp: ts,
+            time_str: ts ? jstTimeString(ts) : undefined,
+            origin: lookup(origin),
+            category: lookup(category) || undefined,
+            logo_key: lookup(logoKey) || undefined,
+        };
+        if (typeof fetchedDelta === "number") {
+            item.fetched_at = ts + fetchedDelta;
+        }
+        return item;
+    });
+}
+
+/** 读取精简列表，返回与 data.json 相同的 { news, last_updated }；不存在或版本不符时返回 null */
+export async function fetchListFeed(baseUrl: string, fresh = false): Promise<RawDataFile | null> {
+    try {
+        const r = await fetch(await resolveDataUrl(baseUrl, "feed/list.json", fresh));
+        if (!r.ok) return null;
+        const feed = (await r.json()) as ListFeed;
+        if (feed.version !== FEED_VERSION) return null;
+        return { news: decodeListFeed(feed), last_updated: feed.last_updated };
+    } catch {
+        return null;
+    }
+}
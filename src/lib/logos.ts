@@ -0,0 +1,42 @@
+import { useEffect, useState } from "react";
+
+// 媒体 Logo 合集 logos/outlets.json（outlet_logos.py 生成）：{ logos: { 域名: { data: data URI } } }
+// 整个页面只请求一次，条目按 logo_key（域名）取图
+
+interface LogoBundleFile {
+    logos?: Record<string, { data?: string }>;
+}
+
+const bundles = new Map<string, Promise<Record<string, string>>>();
+
+export function loadOutletLogos(baseUrl: string): Promise<Record<string, string>> {
+    let promise = bundles.get(baseUrl);
+    if (!promise) {
+        promise = fetch(`${baseUrl}/logos/outlets.json`)
+            .then(r => (r.ok ? (r.json() as Promise<LogoBundleFile>) : {}))
+            .then((bundle: LogoBundleFile) => {
+                const logos: Record<string, string> = {};
+                Object.entries(bundle.logos || {}).forEach(([domain, entry]) => {
+                    if (entry.data) logos[domain] = entry.data;
+                });
+                return logos;
+            })
+            .catch(() => ({}));
+        bundles.set(baseUrl, promise);
+    }
+    return promise;
+}
+
+/** 返回 logoKey 对应的 data URI；合集加载中为 undefined，合集中没有为 "" */
+export function useOutletLogo(baseUrl: string, logoKey?: string): string | undefined {
+    const [logo, setLogo] = useState<string | undefined>(undefined);
+    useEffect(() => {
+        if (!logoKey) return;
+        let cancelled = false;
+        loadOutletLogos(baseUrl).then(logos => {
+            if (!cancelled) setLogo(logos[logoKey] || "");
+        });
+        return () => { cancelled = true; };
+    }, [baseUrl, logoKey]);
+    return logo;
+}
@@ -0,0 +1,33 @@
+// 内容哈希发布（immutable_publish.py）：manifest.json 指向各文件当前的不可变版本
+//   { files: { "data.json": "v/data.<hash>.json", "archive/2025-12-03.json": "v/archive/2025-12-03.<hash>.json" } }
+// 不可变对象可长期缓存，只有内容变化时才会下载新版本；manifest 缺失或未收录时退回固定路径 + ?t=
+
+interface PublishManifest {
+    files: Record<string, string>;
+}
+
+// manifest 本身 60 秒过期，这里再做同样时长的内存缓存，避免一次加载内重复请求
+const MANIFEST_TTL_MS = 60 * 1000;
+const manifestCache = new Map<string, { at: number; promise: Promise<PublishManifest | null> }>();
+
+function loadManifest(baseUrl: string, fresh = false): Promise<PublishManifest | null> {
+    const cached = manifestCache.get(baseUrl);
+    if (cached && !fresh && Date.now() - cached.at < MANIFEST_TTL_MS) {
+        return cached.promise;
+    }
+    const promise = fetch(`${baseUrl}/manifest.json`, { cache: "no-cache" })
+        .then(r => (r.ok ? (r.json() as Promise<PublishManifest>) : null))
+        .catch(() => null);
+    manifestCache.set(baseUrl, { at: Date.now(), promise });
+    return promise;
+}
+
+/**
+ * 返回 path（如 "data.json"、"archive/index.json"）当前版本的 URL
+ * fresh=true 时重新获取 manifest（用于轮询新内容）
+ */
+export async function resolveDataUrl(baseUrl: string, path: string, fresh = false): Promise<string> {
+    const manifest = await loadManifest(baseUrl, fresh);
+    const key = manifest?.files?.[path];
+    return key ? `${baseUrl}/${key}` : `${baseUrl}/${path}?t=${Date.now()}`;
+}
@@ -0,0 +1,137 @@
+import io
+import json
+import os
+import sys
+import types
+
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+
+import daily_digest
+import r2_rewrite
+from day_segments import append_segment, compact_day, load_day, manifest_key, merge_items
+
+# 当天存档分段与 R2 改写的交互：改写日文件后再合并分段，不能用分段里的旧版本覆盖改写结果
+# 用内存中的 R2 替身运行：python -m pytest test_day_segments.py
+
+BUCKET = "test-bucket"
+DATE = "2025-12-03"
+
+
+class NoSuchKey(Exception):
+    pass
+
+
+class MemoryR2:
+    """只实现 day_segments / r2_rewrite / main 用到的 S3 接口"""
+
+    def __init__(self):
+        self.store = {}
+        self.exceptions = types.SimpleNamespace(NoSuchKey=NoSuchKey)
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.store:
+            raise NoSuchKey(Key)
+        return {"Body": io.BytesIO(self.store[Key])}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.store[Key] = Body if isinstance(Body, bytes) else Body.read()
+
+    def delete_objects(self, Bucket, Delete):
+        for obj in Delete["Objects"]:
+            self.store.pop(obj["Key"], None)
+
+    def download_file(self, Bucket, Key, Filename):
+        if Key not in self.store:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        with open(Filename, "wb") as f:
+            f.write(self.store[Key])
+
+    def get_paginator(self, name):
+        def paginate(Bucket, Prefix, Delimiter=None):
+            keys = sorted(k for k in self.store if k.startswith(Prefix))
+            if not Delimiter:
+                return [{"Contents": [{"Key": k} for k in keys]}]
+            prefixes = sorted({Prefix + k[len(Prefix):].split(Delimiter)[0] + Delimiter
+                               for k in keys if Delimiter in k[len(Prefix):]})
+            return [{"CommonPrefixes": [{"Prefix": p} for p in prefixes]}]
+        return types.SimpleNamespace(paginate=paginate)
+
+    def put_json(self, key, data):
+        self.store[key] = json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+    def json(self, key):
+        return json.loads(self.store[key].decode("utf-8"))
+
+
+def news(link, title, timestamp, origin="NHK", fetched_at=None):
+    return {"title": title, "link": link, "timestamp": timestamp, "fetched_at": fetched_at or timestamp, "origin": origin}
+
+
+def segmented_day(client):
+    """日文件 + 一个分段：分段里有 b 的新版本和一条 TVer 条目"""
+    client.put_json(f"archive/{DATE}.json", [news("a", "A", 100), news("b", "B", 200)])
+    manifest = {"date": DATE, "segments": []}
+    append_segment(client, BUCKET, DATE, [news("b", "B v2", 200), news("tver", "番組", 300, origin="TVer")], manifest)
+    return manifest
+
+
+def test_rewrite_base_then_compact(monkeypatch, tmp_path):
+    client = MemoryR2()
+    segmented_day(client)
+    monkeypatch.setattr(daily_digest, "get_r2_client", lambda: client)
+    monkeypatch.setattr(daily_digest, "R2_BUCKET_NAME", BUCKET)
+    monkeypatch.setattr(r2_rewrite._main_module(), "R2_BUCKET_NAME", BUCKET)
+    monkeypatch.chdir(tmp_path)
+
+    stats = r2_rewrite.run_rewrites(r2_rewrite.build_rules()["tver"], since=DATE, until=DATE, max_workers=1)
+    assert stats["removed"] == 1
+
+    # 改写前已合并：分段和 manifest 都已删除，日文件即完整内容
+    assert not [k for k in client.store if k.startswith("archive/segments/")]
+    items, manifest = load_day(client, BUCKET, DATE)
+    assert manifest["segments"] == []
+    assert {item["link"]: item["title"] for item in items} == {"a": "A", "b": "B v2"}
+
+    # 下一次运行合并 / 追加分段时，被删除的条目不会回来
+    compact_day(client, BUCKET, DATE)
+    assert [item["link"] for item in client.json(f"archive/{DATE}.json")] == ["b", "a"]
+    assert client.json("archive/index.json") == {DATE: 2}
+
+
+def test_dry_run_leaves_segments(monkeypatch):
+    client = MemoryR2()
+    segmented_day(client)
+    monkeypatch.setattr(daily_digest, "get_r2_client", lambda: client)
+    monkeypatch.setattr(daily_digest, "R2_BUCKET_NAME", BUCKET)
+
+    r2_rewrite.run_rewrites(r2_rewrite.build_rules()["tver"], since=DATE, until=DATE, dry_run=True, max_workers=1)
+    assert manifest_key(DATE) in client.store
+
+
+def test_merge_prefers_fresher_version():
+    base = [news("a", "A fresh", 100, fetched_at=500)]
+    segment = [news("a", "A stale", 100, fetched_at=400), news("b", "B", 200)]
+    merged = {item["link"]: item["title"] for item in merge_items(base, [segment])}
+    assert merged == {"a": "A fresh", "b": "B"}
+
+    # fetched_at 相同（main.py 更新条目时保留原值）时以后写入的分段为准
+    assert merge_items([news("a", "A", 100)], [[news("a", "A v2", 100)]])[0]["title"] == "A v2"
+
+
+def test_compact_after_interrupted_delete():
+    client = MemoryR2()
+    manifest = segmented_day(client)
+    segment_key = manifest["segments"][0]["key"]
+    # 上次合并上传了日文件、删除了 manifest，但没来得及删除分段
+    client.put_json(f"archive/{DATE}.json", merge_items(
+        [news("a", "A", 100), news("b", "B", 200)],
+        [[news("b", "B v2", 200), news("tver", "番組", 300, origin="TVer")]]
+    ))
+    del client.store[manifest_key(DATE)]
+
+    items, manifest = load_day(client, BUCKET, DATE)
+    assert manifest["segments"] == [] and len(items) == 3
+    compact_day(client, BUCKET, DATE)
+    assert segment_key not in client.store
@@ -0,0 +1,188 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# === 新闻配图缩略图 (WebP) ===
+# 每张原图只下载一次，生成多档宽度的 WebP，按内容哈希上传到 R2
+# 与前端一致走 CDN 自定义域名，immutable 缓存才能在 CDN 上生效（r2.dev 域名有限流且不经 CDN 缓存）
+R2_PUBLIC_URL = os.environ.get("R2_PUBLIC_URL", "https://r2.cn.saaaai.com")
+# 早期写入存档的缩略图 URL 使用的域名，仍视为已处理的缩略图
+LEGACY_PUBLIC_URLS = ("https://pub-cf7a92abc9c3455da9ccb7cea39a6cda.r2.dev",)
+THUMB_PREFIX = "thumbs/"
+THUMB_WIDTHS = (160, 320)
+WEBP_QUALITY = 75
+MAX_IMAGE_BYTES = 8 * 1024 * 1024
+MAX_WORKERS = 6
+
+CACHE_FILE = os.path.join("cache", "thumbs.json")
+CACHE_R2_KEY = "cache/thumbs.json"
+# 下载或转码失败的原图 24 小时内不再重试
+NEGATIVE_TTL = 24 * 3600
+# 超过 30 天未再出现的原图记录会被清理（R2 上的缩略图保留）
+POSITIVE_TTL = 30 * 24 * 3600
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
+_local = threading.local()
+
+
+def _session():
+    """每个工作线程复用一个 HTTP 会话"""
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+        _local.session.headers.update(HEADERS)
+    return _local.session
+
+
+def thumb_key(digest, width):
+    return f"{THUMB_PREFIX}{digest[:2]}/{digest}_{width}.webp"
+
+
+def thumb_url(digest, width):
+    return f"{R2_PUBLIC_URL}/{thumb_key(digest, width)}"
+
+
+def is_thumbnail_url(url):
+    return bool(url) and any(url.startswith(f"{base}/{THUMB_PREFIX}") for base in (R2_PUBLIC_URL,) + LEGACY_PUBLIC_URLS)
+
+
+class ThumbCache:
+    """原图 URL -> [内容哈希, 最近确认时间]，哈希为空表示处理失败（负缓存）"""
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except Exception as e:
+            print(f"⚠️ 缩略图缓存读取失败，将重建: {e}")
+            self.entries = {}
+
+    def save(self):
+        now = int(time.time())
+        self.entries = {
+            k: v for k, v in self.entries.items()
+            if now - v[1] < (POSITIVE_TTL if v[0] else NEGATIVE_TTL)
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, src):
+        """返回 (是否命中, 内容哈希)"""
+        now = int(time.time())
+        with self._lock:
+            entry = self.entries.get(src)
+            if not entry:
+                return False, ""
+            digest, checked_at = entry
+            if digest:
+                entry[1] = now
+                return True, digest
+            if now - checked_at < NEGATIVE_TTL:
+                return True, ""
+            return False, ""
+
+    def store(self, src, digest):
+        with self._lock:
+            self.entries[src] = [digest or "", int(time.time())]
+
+
+def render_thumbnails(raw):
+    """将原图字节转为各档宽度的 WebP 字节，返回 {宽度: bytes}"""
+    with Image.open(io.BytesIO(raw)) as img:
+        img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+        results = {}
+        for width in THUMB_WIDTHS:
+            thumb = img.copy()
+            if thumb.width > width:
+                height = max(1, round(thumb.height * width / thumb.width))
+                thumb = thumb.resize((width, height), Image.LANCZOS)
+            buf = io.BytesIO()
+            thumb.save(buf, format="WEBP", quality=WEBP_QUALITY, method=4)
+            results[width] = buf.getvalue()
+        return results
+
+
+def build_thumbnail(src, upload):
+    """
+    下载原图并上传缩略图，返回内容哈希；失败返回空字符串
+    upload(body, key) 负责写入 R2
+    """
+    try:
+        with _session().get(src, timeout=10, stream=True) as response:
+            response.raise_for_status()
+            raw = response.raw.read(MAX_IMAGE_BYTES + 1, decode_content=True)
+        if len(raw) > MAX_IMAGE_BYTES:
+            raise ValueError("image too large")
+        digest = hashlib.sha256(raw).hexdigest()[:32]
+        for width, body in render_thumbnails(raw).items():
+            if not upload(body, thumb_key(digest, width)):
+                return ""
+        return digest
+    except Exception as e:
+        print(f"  [缩略图失败] {src[:60]}...: {e}")
+        return ""
+
+
+def apply_thumbnail(item, digest):
+    """把条目的 image 指向缩略图，原图地址保留在 image_src"""
+    item["image"] = thumb_url(digest, THUMB_WIDTHS[-1])
+    item["image_srcset"] = ", ".join(f"{thumb_url(digest, w)} {w}w" for w in THUMB_WIDTHS)
+
+
+def process_images(items, cache, upload, max_workers=MAX_WORKERS):
+    """
+    为新条目生成缩略图：已缓存的原图直接复用，其余并发下载处理
+    未能生成缩略图的条目保留原始 image
+    """
+    if Image is None:
+        print("⚠️ 未安装 Pillow，跳过缩略图生成")
+        return
+
+    pending = {}
+    for item in items:
+        src = item.get("image") or ""
+        if not src or is_thumbnail_url(src):
+            continue
+        item["image_src"] = src
+        hit, digest = cache.lookup(src)
+        if hit:
+            if digest:
+                apply_thumbnail(item, digest)
+        else:
+            pending.setdefault(src, []).append(item)
+
+    if not pending:
+        return
+
+    print(f"正在生成 {len(pending)} 张新配图的缩略图...")
+    sources = list(pending.keys())
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        digests = pool.map(lambda s: build_thumbnail(s, upload), sources)
+        for src, digest in zip(sources, digests):
+            cache.store(src, digest)
+            if digest:
+                for item in pending[src]:
+                    apply_thumbnail(item, digest)
@@ -0,0 +1,267 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# === 标题批量翻译客户端 ===
+# - 复用一个带连接池的 requests.Session，不再每次调用新建连接
+# - 记录每次请求的耗时，持久化最近 LATENCY_SAMPLES 次（本地 + R2 镜像），计算 p50 / p95
+# - 对冲请求：主请求超过历史 p95 仍未返回时，再发一个相同的请求，取先成功的那个
+# - 主服务两次请求都失败时，切换到可插拔的备用服务（TRANSLATE_SECONDARY）
+# - StubProvider 不访问网络，供本地测试使用（TRANSLATE_PRIMARY=stub）
+
+CACHE_DIR = "cache"
+LATENCY_FILE = os.path.join(CACHE_DIR, "translate_latency.json")
+LATENCY_R2_KEY = "cache/translate_latency.json"
+LATENCY_SAMPLES = 200
+# 样本不足时的对冲等待时间
+MIN_SAMPLES = 5
+DEFAULT_HEDGE_AFTER = 3.0
+# 对冲等待时间的上下限，避免异常样本导致过早 / 过晚对冲
+MIN_HEDGE_AFTER = 0.5
+MAX_HEDGE_AFTER = 8.0
+REQUEST_TIMEOUT = 15
+
+
+class TranslateError(Exception):
+    pass
+
+
+class LatencyTracker:
+    def __init__(self, path=LATENCY_FILE, size=LATENCY_SAMPLES):
+        self.path = path
+        self.size = size
+        self.samples = []
+        self.run_samples = []
+        self._lock = threading.Lock()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.samples = [float(x) for x in json.load(f).get("samples", [])][-self.size:]
+        except Exception as e:
+            print(f"⚠️ 翻译耗时记录读取失败，将重建: {e}")
+            self.samples = []
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"samples": [round(x, 3) for x in self.samples]}, f)
+        os.replace(tmp_path, self.path)
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+            self.samples = self.samples[-self.size:]
+            self.run_samples.append(seconds)
+
+    def percentile(self, p):
+        with self._lock:
+            data = sorted(self.samples)
+        if not data:
+            return None
+        return data[min(len(data) - 1, int(round(p / 100 * (len(data) - 1))))]
+
+    def hedge_after(self):
+        if len(self.samples) < MIN_SAMPLES:
+            return DEFAULT_HEDGE_AFTER
+        return min(MAX_HEDGE_AFTER, max(MIN_HEDGE_AFTER, self.percentile(95)))
+
+
+class GoogleGtxProvider:
+    """Google Translate gtx 接口：多行文本合并为一次 POST，按换行拆回"""
+
+    name = "google"
+    URL = "https://translate.googleapis.com/translate_a/single"
+
+    def translate(self, session, texts, target_lang, source_lang):
+        response = session.post(
+            self.URL,
+            params={"client": "gtx", "sl": source_lang, "tl": target_lang, "dt": "t"},
+            data={"q": "\n".join(texts)},
+            timeout=REQUEST_TIMEOUT
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        # 谷歌翻译返回的结构中，data[0] 是翻译片段列表
+        full_translation = ""
+        if data and data[0]:
+            for segment in data[0]:
+                if segment[0]:
+                    full_translation += segment[0]
+
+        translated_lines = full_translation.strip().split('\n')
+        # 数量不匹配无法一一对应，视为失败
+        if len(translated_lines) != len(texts):
+            raise TranslateError(f"Batch mismatch: {len(translated_lines)} vs {len(texts)}")
+        return [line.strip() for line in translated_lines]
+
+
+class LibreTranslateProvider:
+    """自建 LibreTranslate 服务（LIBRETRANSLATE_URL / LIBRETRANSLATE_API_KEY），逐条数组请求"""
+
+    name = "libretranslate"
+    LANG_CODES = {"zh-CN": "zh", "zh-TW": "zt"}
+
+    def __init__(self, url=None, api_key=None):
+        self.url = (url or os.environ.get("LIBRETRANSLATE_URL", "")).rstrip("/")
+        self.api_key = api_key or os.environ.get("LIBRETRANSLATE_API_KEY", "")
+        if not self.url:
+            raise TranslateError("LIBRETRANSLATE_URL 未配置")
+
+    def translate(self, session, texts, target_lang, source_lang):
+        payload = {
+            "q": texts,
+            "source": source_lang,
+            "target": self.LANG_CODES.get(target_lang, target_lang),
+            "format": "text"
+        }
+        if self.api_key:
+            payload["api_key"] = self.api_key
+        response = session.post(f"{self.url}/translate", json=payload, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        translated = response.json().get("translatedText")
+        if not isinstance(translated, list) or len(translated) != len(texts):
+            raise TranslateError("LibreTranslate 返回条数不一致")
+        return [t.strip() for t in translated]
+
+
+class StubProvider:
+    """
+    本地桩：不访问网络，返回 "[目标语言] 原文"
+    delays 依次作为每次调用的耗时（秒），fail_times 次调用先抛出异常，用于测试对冲与切换
+    """
+
+    name = "stub"
+
+    def __init__(self, delays=None, fail_times=0):
+        self.delays = list(delays or [])
+        self.fail_times = fail_times
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def translate(self, session, texts, target_lang, source_lang):
+        with self._lock:
+            self.calls += 1
+            delay = self.delays.pop(0) if self.delays else 0
+            fail = self.fail_times > 0
+            if fail:
+                self.fail_times -= 1
+        time.sleep(delay)
+        if fail:
+            raise TranslateError("stub failure")
+        return [f"[{target_lang}] {t}" for t in texts]
+
+
+PROVIDERS = {
+    "google": GoogleGtxProvider,
+    "libretranslate": LibreTranslateProvider,
+    "stub": StubProvider,
+}
+
+
+def make_provider(name):
+    if not name:
+        return None
+    try:
+        return PROVIDERS[name]()
+    except KeyError:
+        raise TranslateError(f"未知的翻译服务: {name}")
+
+
+def make_session(pool_size=4):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class HedgedTranslator:
+    def __init__(self, primary, secondary=None, tracker=None, session=None):
+        self.primary = primary
+        self.secondary = secondary
+        self.tracker = tracker or LatencyTracker()
+        self.session = session or make_session()
+        self.pool = ThreadPoolExecutor(max_workers=4)
+        self.stats = {"calls": 0, "hedged": 0, "retried": 0, "second_won": 0, "failover": 0}
+
+    def _timed(self, provider, texts, target_lang, source_lang):
+        start = time.perf_counter()
+        result = provider.translate(self.session, texts, target_lang, source_lang)
+        self.tracker.record(time.perf_counter() - start)
+        return result
+
+    def _primary(self, texts, target_lang, source_lang):
+        """
+        主请求超过 p95 仍未返回时发出对冲请求，返回先成功的结果
+        主请求在 p95 之前就失败时立即重发一次；都失败则抛出最后的异常
+        """
+        args = (self.primary, texts, target_lang, source_lang)
+        first = self.pool.submit(self._timed, *args)
+        done, _ = wait([first], timeout=self.tracker.hedge_after())
+        error = None
+        if done:
+            try:
+                return first.result()
+            except Exception as e:
+                error = e
+            self.stats["retried"] += 1
+            pending = {self.pool.submit(self._timed, *args)}
+        else:
+            self.stats["hedged"] += 1
+            pending = {first, self.pool.submit(self._timed, *args)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if future is not first:
+                    self.stats["second_won"] += 1
+                # 落后的请求在后台结束，结果丢弃
+                return result
+        raise error
+
+    def translate(self, texts, target_lang, source_lang='ja'):
+        self.stats["calls"] += 1
+        try:
+            return self._primary(texts, target_lang, source_lang)
+        except Exception as e:
+            if self.secondary is None:
+                raise
+            print(f"⚠️ {self.primary.name} 翻译失败（{e}），切换到 {self.secondary.name}")
+        self.stats["failover"] += 1
+        return self.secondary.translate(self.session, texts, target_lang, source_lang)
+
+    def report(self):
+        stats = self.stats
+        line = (f"翻译请求 {stats['calls']} 次：对冲 {stats['hedged']} 次，失败重发 {stats['retried']} 次，"
+                f"第二个请求胜出 {stats['second_won']} 次，切换备用 {stats['failover']} 次")
+        if self.tracker.run_samples:
+            line += f"；本次最慢 {max(self.tracker.run_samples):.2f}s"
+        p50, p95 = self.tracker.percentile(50), self.tracker.percentile(95)
+        if p50 is not None:
+            line += f"；近 {len(self.tracker.samples)} 次 p50 {p50:.2f}s / p95 {p95:.2f}s"
+        return line
+
+
+def translator_from_env():
+    """TRANSLATE_PRIMARY（默认 google）/ TRANSLATE_SECONDARY（默认无）"""
+    primary = make_provider(os.environ.get("TRANSLATE_PRIMARY", "google"))
+    secondary = None
+    try:
+        secondary = make_provider(os.environ.get("TRANSLATE_SECONDARY", ""))
+    except TranslateError as e:
+        print(f"⚠️ 备用翻译服务不可用: {e}")
+    return HedgedTranslator(primary, secondary)
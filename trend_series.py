@@ -0,0 +1,129 @@
+import json
+import os
+import time
+from array import array
+
+# === 每小时趋势时间序列 ===
+# 按发布时间的小时桶统计 分类 / 媒体 / 关键词 的新增条数，
+# 每个键对应一个定长 array 环形窗口，每小时只累加本次新增的条目
+
+STATE_FILE = os.path.join("cache", "trend_series.json")
+STATE_R2_KEY = "cache/trend_series.json"
+PUBLIC_FILE = os.path.join("public", "trends", "hourly.json")
+PUBLIC_R2_KEY = "trends/hourly.json"
+
+# 内部保留 14 天，对外发布最近 7 天
+WINDOW_HOURS = 14 * 24
+PUBLISH_HOURS = 7 * 24
+PUBLISH_TOP_OUTLETS = 20
+PUBLISH_TOP_TERMS = 30
+# 关键词来自标题 n-gram，键数随时间增长；状态文件只保留窗口内累计最多的这些词
+STATE_TOP_TERMS = 2000
+DIMENSIONS = ("category", "outlet", "term")
+
+
+def hour_of(ts):
+    return int(ts) // 3600
+
+
+def _zeros(n):
+    """长度 n 的全零计数序列（'I' 的字节宽度因平台而异，不按字节数构造）"""
+    return array('I', [0]) * n
+
+
+class HourlySeries:
+    """
+    series[维度][键] = array('I')，长度 WINDOW_HOURS
+    最后一个元素对应 end_hour 这一小时
+    """
+
+    def __init__(self, window=WINDOW_HOURS):
+        self.window = window
+        self.end_hour = hour_of(time.time())
+        self.series = {dim: {} for dim in DIMENSIONS}
+
+    def load(self, path=STATE_FILE):
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️ 趋势序列读取失败，将重建: {e}")
+            return
+        end_hour = data.get("end_hour", self.end_hour)
+        for dim in DIMENSIONS:
+            for key, counts in data.get("series", {}).get(dim, {}).items():
+                arr = array('I', counts[-self.window:])
+                if len(arr) < self.window:
+                    arr = _zeros(self.window - len(arr)) + arr
+                self.series[dim][key] = arr
+        # 存档时刻到现在之间的小时补零
+        now_hour = self.end_hour
+        self.end_hour = end_hour
+        self.advance(now_hour)
+
+    def save(self, path=STATE_FILE):
+        self._drop_empty()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        payload = {
+            "end_hour": self.end_hour,
+            "series": {dim: {k: arr.tolist() for k, arr in keys.items()} for dim, keys in self.series.items()}
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def advance(self, hour):
+        """把窗口右移到 hour，移出的小时丢弃"""
+        shift = hour - self.end_hour
+        if shift <= 0:
+            return
+        shift = min(shift, self.window)
+        zeros = _zeros(shift)
+        for keys in self.series.values():
+            for key, arr in keys.items():
+                keys[key] = arr[shift:] + zeros
+        self.end_hour = hour
+
+    def _drop_empty(self):
+        for dim in DIMENSIONS:
+            self.series[dim] = {k: arr for k, arr in self.series[dim].items() if any(arr)}
+        terms = self.series["term"]
+        if len(terms) > STATE_TOP_TERMS:
+            keep = sorted(terms, key=lambda k: sum(terms[k]), reverse=True)[:STATE_TOP_TERMS]
+            self.series["term"] = {k: terms[k] for k in keep}
+
+    def add(self, ts, category=None, outlet=None, terms=()):
+        hour = hour_of(ts)
+        if hour > self.end_hour:
+            self.advance(hour)
+        offset = self.window - 1 - (self.end_hour - hour)
+        if offset < 0:
+            return
+        for dim, keys in (("category", [category]), ("outlet", [outlet]), ("term", terms)):
+            for key in keys:
+                if not key:
+                    continue
+                arr = self.series[dim].get(key)
+                if arr is None:
+                    arr = self.series[dim][key] = _zeros(self.window)
+                arr[offset] += 1
+
+    def export(self, hours=PUBLISH_HOURS):
+        """前端使用的精简时间序列：最近 hours 小时，媒体 / 关键词只保留 Top N"""
+        limits = {"category": None, "outlet": PUBLISH_TOP_OUTLETS, "term": PUBLISH_TOP_TERMS}
+        out = {}
+        for dim, keys in self.series.items():
+            recent = {k: arr[-hours:] for k, arr in keys.items()}
+            ranked = sorted(recent.items(), key=lambda kv: sum(kv[1]), reverse=True)
+            if limits[dim]:
+                ranked = ranked[:limits[dim]]
+            out[dim] = {k: arr.tolist() for k, arr in ranked if any(arr)}
+        return {
+            "start": (self.end_hour - hours + 1) * 3600,
+            "step": 3600,
+            "hours": hours,
+            "series": out
+        }